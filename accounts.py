@@ -0,0 +1,55 @@
+"""User accounts for sign-in and sign-up.
+
+Users are cached in memory by username, so a lookup is one dict access.
+Misses fall through to the indexed ``users`` table to pick up accounts that
+another process created. User ids are allocated by the database on insert,
+so concurrent sign-ups can't collide. bcrypt runs on a small bounded pool
+so many simultaneous logins can't saturate the CPU or stall the script
+threads beyond one hash each.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from sqlalchemy.exc import IntegrityError
+
+import storage
+
+
+class Accounts:
+    def __init__(self, engine=None, hash_workers=2):
+        self.engine = engine
+        self._pool = ThreadPoolExecutor(max_workers=hash_workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._users = {user["username"]: user for user in storage.all_users(engine)}
+
+    def get(self, username):
+        """The user record (``user_id``, ``username``, ``password``) or None."""
+        user = self._users.get(username)
+        if user is None:
+            user = storage.get_user(username, self.engine)
+            if user is not None:
+                with self._lock:
+                    self._users[username] = user
+        return user
+
+    def authenticate(self, username, password):
+        """The user record if ``password`` matches, else None."""
+        user = self.get(username)
+        if user is None:
+            return None
+        matches = self._pool.submit(bcrypt.checkpw, password.encode(), user["password"].encode()).result()
+        return user if matches else None
+
+    def register(self, username, password):
+        """Create a user and return its new id, or None if the username is taken."""
+        if self.get(username) is not None:
+            return None
+        hashed = self._pool.submit(bcrypt.hashpw, password.encode(), bcrypt.gensalt()).result().decode()
+        try:
+            user_id = storage.add_user(username, hashed, self.engine)
+        except IntegrityError:
+            return None
+        with self._lock:
+            self._users[username] = {"user_id": user_id, "username": username, "password": hashed}
+        return user_id
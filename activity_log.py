@@ -0,0 +1,180 @@
+"""Segmented activity log.
+
+New events land in the ``activity`` table (the hot segment, indexed on
+``(user_id, timestamp)``). ``compact`` moves events older than
+``HOT_DAYS`` into one Parquet file per month under ``ARCHIVE_DIR``, sorted
+by user so a per-user read only touches the row groups holding that user,
+and records in ``activity_segments`` which months hold each user's events.
+``user_events`` reads the hot segment first and only opens older segments,
+newest first, until it has enough rows. Compacted segments are immutable,
+so ``archive`` can move old months out of ``ARCHIVE_DIR`` without touching
+the hot path.
+
+Run ``python activity_log.py compact`` (the app also compacts in the
+background) or ``python activity_log.py archive 2024-01`` to move segments
+before that month to ``ARCHIVE_DIR/cold``.
+"""
+import glob
+import os
+import shutil
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import delete, insert, select
+
+import storage
+
+try:
+    import fcntl
+except ImportError:  # Windows: compaction is not guarded across processes
+    fcntl = None
+
+ARCHIVE_DIR = "activity_archive"
+HOT_DAYS = 30
+ROW_GROUP_SIZE = 20_000
+COLUMNS = ["id", "user_id", "action", "title", "movie_id", "rating", "timestamp"]
+
+SCHEMA = pa.schema([
+    ("id", pa.int64()), ("user_id", pa.int32()), ("action", pa.dictionary(pa.int8(), pa.string())),
+    ("title", pa.string()), ("movie_id", pa.int32()), ("rating", pa.float32()), ("timestamp", pa.string()),
+])
+
+_compact_lock = threading.Lock()
+
+
+def segment_path(segment, directory=ARCHIVE_DIR):
+    return os.path.join(directory, f"activity-{segment}.parquet")
+
+
+def segments(directory=ARCHIVE_DIR):
+    """Compacted month segments present on disk, oldest first."""
+    names = (os.path.basename(p) for p in glob.glob(os.path.join(directory, "activity-*.parquet")))
+    return sorted(name[len("activity-"):-len(".parquet")] for name in names)
+
+
+def _read_segment(segment, directory, filters=None):
+    table = pq.read_table(segment_path(segment, directory), filters=filters)
+    return table.to_pandas().astype({"action": str})
+
+
+def _write_segment(df, segment, directory):
+    """Atomically replace one segment file with ``df`` sorted by user."""
+    df = df.sort_values(["user_id", "timestamp", "id"], kind="stable")
+    table = pa.Table.from_pandas(df[COLUMNS], schema=SCHEMA, preserve_index=False)
+    path = segment_path(segment, directory)
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE, compression="zstd")
+    os.replace(tmp, path)
+
+
+class _FileLock:
+    def __init__(self, directory):
+        self.path = os.path.join(directory, ".compact.lock")
+
+    def __enter__(self):
+        self._file = open(self.path, "w")
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def compact(hot_days=HOT_DAYS, directory=ARCHIVE_DIR, engine=None):
+    """Move events older than ``hot_days`` into month segments; returns the number moved."""
+    engine = engine or storage.get_engine()
+    cutoff = (datetime.now() - timedelta(days=hot_days)).strftime("%Y-%m-%d %H:%M:%S")
+    os.makedirs(directory, exist_ok=True)
+    activity = storage.activity
+    with _compact_lock, _FileLock(directory):
+        with engine.connect() as conn:
+            cold = pd.read_sql(select(*[activity.c[c] for c in COLUMNS]).where(activity.c.timestamp < cutoff), conn)
+        if cold.empty:
+            return 0
+        cold["segment"] = cold["timestamp"].str.slice(0, 7)
+        index_rows = []
+        for segment, rows in cold.groupby("segment"):
+            rows = rows.drop(columns="segment")
+            if os.path.exists(segment_path(segment, directory)):
+                # A crash between writing a segment and deleting its rows leaves duplicates. Match whole rows:
+                # SQLite hands a compacted event's id to the next insert once the hot table is emptied
+                rows = pd.concat([_read_segment(segment, directory), rows]).drop_duplicates(COLUMNS, keep="last")
+            _write_segment(rows, segment, directory)
+            per_user = rows.groupby("user_id")["timestamp"].agg(["count", "max"])
+            index_rows.append((segment, [{"user_id": int(uid), "segment": segment, "events": int(count), "newest": newest}
+                                         for uid, (count, newest) in per_user.iterrows()]))
+        with engine.begin() as conn:
+            for segment, rows in index_rows:
+                conn.execute(delete(storage.activity_segments).where(storage.activity_segments.c.segment == segment))
+                conn.execute(insert(storage.activity_segments), rows)
+            conn.execute(delete(activity).where(activity.c.timestamp < cutoff, activity.c.id <= int(cold["id"].max())))
+    return len(cold)
+
+
+def user_events(user_id, limit=None, directory=ARCHIVE_DIR, engine=None):
+    """One user's newest events across the hot table and compacted segments, newest first."""
+    engine = engine or storage.get_engine()
+    frames = [storage.user_activity(user_id, limit=limit, engine=engine)]
+    have = len(frames[0])
+    if limit is None or have < limit:
+        query = (select(storage.activity_segments.c.segment)
+                 .where(storage.activity_segments.c.user_id == int(user_id))
+                 .order_by(storage.activity_segments.c.segment.desc()))
+        with engine.connect() as conn:
+            user_segments = [row[0] for row in conn.execute(query)]
+        for segment in user_segments:
+            if not os.path.exists(segment_path(segment, directory)):
+                continue  # archived
+            frames.append(_read_segment(segment, directory, filters=[("user_id", "=", int(user_id))]))
+            have += len(frames[-1])
+            if limit is not None and have >= limit:
+                break
+    events = pd.concat([f for f in frames if not f.empty], ignore_index=True) if have else frames[0]
+    if "id" in events:
+        events = events.drop_duplicates(COLUMNS).drop(columns="id")
+    events = events.sort_values("timestamp", ascending=False, kind="stable").reset_index(drop=True)
+    return events.head(limit) if limit is not None else events
+
+
+def archive(before_segment, directory=ARCHIVE_DIR, dest=None):
+    """Move segments older than ``before_segment`` (``YYYY-MM``) to ``dest``; returns the moved months."""
+    dest = dest or os.path.join(directory, "cold")
+    os.makedirs(dest, exist_ok=True)
+    moved = []
+    with _compact_lock, _FileLock(directory):
+        for segment in segments(directory):
+            if segment < before_segment:
+                shutil.move(segment_path(segment, directory), segment_path(segment, dest))
+                moved.append(segment)
+    return moved
+
+
+def start_compactor(interval=3600.0, engine=None):
+    """Compact once now and then every ``interval`` seconds on a daemon thread."""
+    def loop():
+        while True:
+            try:
+                compact(engine=engine)
+            except Exception as e:
+                print(f"Activity compaction failed: {e}")
+            stop.wait(interval)
+    stop = threading.Event()
+    thread = threading.Thread(target=loop, name="activity-compactor", daemon=True)
+    thread.start()
+    return stop
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["compact"]:
+        print(f"Compacted {compact()} events.")
+    elif sys.argv[1:2] == ["archive"] and len(sys.argv) == 3:
+        print(f"Archived segments: {archive(sys.argv[2])}")
+    else:
+        print(__doc__)
@@ -0,0 +1,113 @@
+"""Time-windowed analytics over the activity log.
+
+``events`` streams the ``user_id, action, timestamp`` columns of every
+event in ``[start, end)`` as DataFrame chunks: only the compacted month
+segments that overlap the window are opened (read batch by batch), then
+the hot ``activity`` table is read in chunks through its timestamp index.
+``daily`` and ``funnel`` reduce each chunk as it arrives and keep only
+per-window state (distinct ``(day, user)`` pairs, first time per user and
+action), so memory grows with the window, not with the log.
+
+    python activity_stats.py 30    # daily table and funnel for the last 30 days
+"""
+import sys
+from datetime import date, timedelta
+
+import pandas as pd
+import pyarrow.parquet as pq
+from sqlalchemy import select
+
+import activity_log
+import storage
+
+CHUNK_SIZE = 50_000
+COLUMNS = ["user_id", "action", "timestamp"]
+ACTIONS = ["watched", "added_to_watchlist", "rated"]
+FUNNEL = ("watched", "added_to_watchlist", "rated")
+
+
+def window(days, today=None):
+    """``(start, end)`` timestamps covering the last ``days`` days including today."""
+    today = today or date.today()
+    start = today - timedelta(days=days - 1)
+    return f"{start:%Y-%m-%d} 00:00:00", f"{today + timedelta(days=1):%Y-%m-%d} 00:00:00"
+
+
+def events(start, end, chunk_size=CHUNK_SIZE, directory=activity_log.ARCHIVE_DIR, engine=None):
+    """Chunks of ``user_id, action, timestamp`` for events with ``start <= timestamp < end``."""
+    first, last = start[:7], end[:7]
+    for segment in activity_log.segments(directory):
+        if not first <= segment <= last:
+            continue
+        parquet = pq.ParquetFile(activity_log.segment_path(segment, directory))
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=COLUMNS):
+            chunk = batch.to_pandas().astype({"action": str})
+            chunk = chunk[(chunk["timestamp"] >= start) & (chunk["timestamp"] < end)]
+            if not chunk.empty:
+                yield chunk
+    activity = storage.activity
+    query = (select(*[activity.c[c] for c in COLUMNS])
+             .where(activity.c.timestamp >= start, activity.c.timestamp < end))
+    with (engine or storage.get_engine()).connect() as conn:
+        for chunk in pd.read_sql(query, conn, chunksize=chunk_size):
+            yield chunk
+
+
+def daily(start, end, rolling_days=7, **kwargs):
+    """Per-day active users, events per action and trailing ``rolling_days`` active users."""
+    days = pd.date_range(start[:10], end[:10], inclusive="left")
+    # Read the days before the window too, so its first days get full trailing counts
+    lead_in = f"{days[0] - pd.Timedelta(days=rolling_days - 1):%Y-%m-%d} 00:00:00" if len(days) else start
+    counts = []
+    pairs = []
+    for chunk in events(min(start, lead_in), end, **kwargs):
+        day = pd.to_datetime(chunk["timestamp"].str.slice(0, 10))
+        counts.append(chunk.groupby([day, "action"]).size())
+        pairs.append(pd.DataFrame({"day": day, "user_id": chunk["user_id"]}))
+        if len(pairs) > 1:
+            # Fold as we go so only one copy of the window's pairs and counts is held
+            counts = [pd.concat(counts).groupby(level=[0, 1]).sum()]
+        pairs = [pd.concat(pairs).drop_duplicates()]
+    result = pd.DataFrame(index=days)
+    result.index.name = "day"
+    per_action = counts[0].unstack(fill_value=0) if counts else pd.DataFrame(index=days)
+    for action in ACTIONS:
+        result[action] = per_action[action].reindex(days, fill_value=0) if action in per_action else 0
+    pairs = pairs[0] if pairs else pd.DataFrame({"day": pd.Series(dtype="datetime64[ns]"),
+                                                 "user_id": pd.Series(dtype="int64")})
+    result["active_users"] = pairs.groupby("day").size().reindex(days, fill_value=0)
+    # A user counts as active on day d if they were active on any of the ``rolling_days`` days up to d
+    spread = pd.concat([pairs.assign(day=pairs["day"] + pd.Timedelta(days=shift))
+                        for shift in range(rolling_days)])
+    result[f"active_users_{rolling_days}d"] = (spread.drop_duplicates().groupby("day").size()
+                                               .reindex(days, fill_value=0))
+    return result.astype(int)
+
+
+def funnel(start, end, steps=FUNNEL, **kwargs):
+    """Users reaching each of ``steps`` in order within the window, as a Series indexed by step."""
+    first_seen = []
+    for chunk in events(start, end, **kwargs):
+        chunk = chunk[chunk["action"].isin(steps)]
+        first_seen.append(chunk.groupby(["user_id", "action"])["timestamp"].min())
+        if len(first_seen) > 1:
+            first_seen = [pd.concat(first_seen).groupby(level=[0, 1]).min()]
+    times = first_seen[0].unstack() if first_seen else pd.DataFrame()
+    reached = pd.Series(True, index=times.index)
+    previous = None
+    counts = {}
+    for step in steps:
+        current = times[step] if step in times else pd.Series(pd.NA, index=times.index, dtype=object)
+        reached &= current.notna()
+        if previous is not None:
+            reached &= current.fillna("") >= previous.fillna("")
+        counts[step] = int(reached.sum())
+        previous = current
+    return pd.Series(counts, name="users")
+
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    start, end = window(days)
+    print(daily(start, end).to_string())
+    print(funnel(start, end).to_string())
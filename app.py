@@ -1,97 +1,320 @@
 import os
-import requests
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
-def download_from_gdrive(gdrive_url, dest_path):
-    """Download either from Google Drive (handles confirm token) or a direct URL (S3).
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import accounts
+import activity_log
+import activity_stats
+import artifacts
+import bundle
+import catalog
+import charts
+import events
+import genres
+import models
+import notifications
+import pipeline
+import precompute
+import recommenders
+import rerun_profile
+import review_index
+import storage
+import tmdb
+import warmup
+
+# Streamlit runs this whole script on every interaction. Each section below
+# ends with a lap of the rerun timer and the page content closes it, so the
+# Analytics page can show what every rerun pays before the page itself.
+# Work that only needs doing once lives behind st.cache_resource or in
+# imported modules (tmdb.py holds the cached TMDB calls for that reason).
+rerun = rerun_profile.RerunTimer()
 
-    If the URL contains 'drive.google.com' or 'docs.google.com' the Drive flow is used,
-    otherwise a simple requests.get streaming download is performed.
-    """
-    import re
-    session = requests.Session()
-    # If it's not a Google Drive URL, do a normal GET (works for S3/public URLs)
-    if "drive.google.com" not in gdrive_url and "docs.google.com" not in gdrive_url:
-        resp = session.get(gdrive_url, stream=True)
-        resp.raise_for_status()
-        with open(dest_path, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=32768):
-                if chunk:
-                    f.write(chunk)
-        return
+# -----------------------------
+# Storage and user helper functions (defined early so UI can use them)
+# -----------------------------
+# Model artifacts come from the pickle-free bundle (see bundle.py) when one has
+# been built; the pickles listed in artifacts.json remain the fallback for the
+# sections the bundle lacks. The catalog loads eagerly, the models on first
+# use (or by the warm-up threads). A pickle is downloaded by the loader that
+# needs it, so first paint never waits on the largest files.
+# The registry watches these files and swaps in a fully loaded new version
+# when they change; each rerun takes one ModelSet up front and uses it
+# throughout, so a swap never mixes versions within a rerun.
+MODEL_FILES = [artifacts.MANIFEST, os.path.join(bundle.BUNDLE_DIR, bundle.METADATA),
+               "movie_list.pkl", "similarity.pkl", "svd_model.pkl"]
+
+
+def record_load_error(message):
+    # Server log plus session_state for diagnostics (not shown to users); the
+    # loader threads have no session, so only the log sees their errors
+    print(message)
+    try:
+        st.session_state.setdefault('model_load_errors', []).append(message)
+    except Exception:
+        pass
 
-    # Google Drive URL flow
-    file_id_match = re.search(r'/d/([\w-]+)', gdrive_url)
-    if not file_id_match:
-        raise ValueError(f"Invalid Google Drive URL: {gdrive_url}")
-    file_id = file_id_match.group(1)
-    base_url = "https://drive.google.com/uc?export=download"
-    response = session.get(base_url, params={"id": file_id}, stream=True)
-    token = None
-    for key, value in response.cookies.items():
-        if key.startswith('download_warning'):
-            token = value
-    if token:
-        response = session.get(base_url, params={"id": file_id, "confirm": token}, stream=True)
-    with open(dest_path, "wb") as f:
-        for chunk in response.iter_content(chunk_size=32768):
-            if chunk:
-                f.write(chunk)
-
-# Download required .pkl files if not present
-files_to_download = [
-    ("https://movie-recommendation-files.s3.us-east-1.amazonaws.com/movie_list.pkl", "movie_list.pkl"),
-    ("https://movie-recommendation-files.s3.us-east-1.amazonaws.com/similarity.pkl", "similarity.pkl"),
-    ("https://movie-recommendation-files.s3.us-east-1.amazonaws.com/svd_model.pkl", "svd_model.pkl"),
-]
-for url, filename in files_to_download:
-    if not os.path.exists(filename):
-        print(f"Downloading {filename} from {url}...")
+
+def open_model_bundle():
+    """The validated model bundle, or None to use the legacy pickles."""
+    if not os.path.exists(bundle.BUNDLE_DIR):
+        return None
+    try:
+        return bundle.open_bundle()
+    except bundle.BundleError as e:
+        record_load_error(f"Ignoring model bundle: {e}")
+        return None
+
+
+def load_legacy_pickle(filename, manifest):
+    # Retry the download if the file doesn't match the manifest (missing, damaged or a new version);
+    # fetch refuses entries without a sha256, so nothing unverified is ever downloaded and unpickled
+    artifact = manifest.get(filename)
+    if artifact is not None and artifacts.verify(artifact, filename) is not None:
         try:
-            download_from_gdrive(url, filename)
+            artifacts.fetch(artifact)
         except Exception as e:
-            print(f"Failed to download {filename}: {e}")
+            record_load_error(str(e))
+            return None
+    try:
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        record_load_error(f"Failed to load {filename}: {e}")
+        return None
 
-import streamlit as st
 
-# -----------------------------
-# CSV user helper functions (defined early so UI can use them)
-# -----------------------------
-def save_user_to_csv(username, password, user_id):
-    import os, csv, bcrypt, pandas as pd
+def load_catalog(load):
+    movies = load("catalog", "movie_list.pkl")
+    # keep silent on missing model files; errors collected in st.session_state['model_load_errors']
+    if isinstance(movies, pd.DataFrame):
+        raw = movies
+        movies = catalog.optimize(raw)
+        report = catalog.memory_report(raw, movies)
+        print(f"Catalog memory: {report.loc['total', 'bytes_before'] / 1e6:.2f} MB -> "
+              f"{report.loc['total', 'bytes_after'] / 1e6:.2f} MB")
+    return movies
+
+
+def build_models():
+    """The catalog and lazy similarity / SVD handles for the artifacts as they are on disk now."""
     try:
-        file_exists = os.path.exists("users.csv")
-        hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-        user_data = pd.DataFrame([{
-            "username": str(username),
-            "password": hashed_password,
-            "user_id": int(user_id)
-        }])
-        user_data.to_csv("users.csv", mode='a', index=False, header=not file_exists, quoting=csv.QUOTE_NONNUMERIC)
+        manifest = {artifact.name: artifact for artifact in artifacts.load_manifest()}
     except Exception as e:
-        st.error(f"Error saving user to CSV: {e}")
+        record_load_error(f"Could not read {artifacts.MANIFEST}: {e}")
+        manifest = {}
+    opened = open_model_bundle()
+
+    def load(section, filename):
+        # The bundle's section if it has one, else the pickle
+        if opened is not None and opened.has(section):
+            return getattr(opened, section)()
+        return load_legacy_pickle(filename, manifest)
+
+    handles = {
+        "similarity": models.LazyArtifact("similarity", lambda: load("neighbors", "similarity.pkl")),
+        "svd_model": models.LazyArtifact("svd_model", lambda: load("factors", "svd_model.pkl")),
+    }
+    return load_catalog(load), handles
 
 
-def load_users_from_csv():
-    import os, csv, pandas as pd
-    if os.path.exists("users.csv"):
-        try:
-            users_df = pd.read_csv(
-                "users.csv",
-                dtype={"username": str, "password": str, "user_id": int},
-                quoting=csv.QUOTE_NONNUMERIC
-            )
-            users = {}
-            for _, row in users_df.iterrows():
-                users[row['username']] = {"password": row['password'], "user_id": row['user_id']}
-            return users
-        except Exception as e:
-            st.warning(f"Error loading users: {e}. Starting with empty user list.")
-            return {}
-    return {}
+@st.cache_resource
+def get_model_registry():
+    """Process-wide model registry, hot-reloading when the artifact files change."""
+    return models.ModelRegistry(build_models, MODEL_FILES)
+
+
+model_set = get_model_registry().current()
+
+
+def get_similarity():
+    return model_set.get("similarity")
 
 
+def get_svd_model():
+    return model_set.get("svd_model")
+
+
+@st.cache_resource(max_entries=2)
+def catalog_index(_movies, version):
+    return _movies.drop_duplicates('id').set_index('id')
+
+
+def catalog_by_id():
+    return catalog_index(model_set.movies, model_set.version)
+
+
+@st.cache_resource
+def init_storage():
+    """Create the schema and import the legacy CSV files on first start."""
+    engine = storage.get_engine()
+    try:
+        migrated = storage.migrate_from_csv(engine=engine)
+        if migrated:
+            print(f"Imported CSV data into the database: {migrated}")
+    except Exception as e:
+        print(f"CSV migration failed: {e}")
+    return engine
+
+
+init_storage()
+
+
+@st.cache_resource
+def get_event_writer():
+    """Process-wide batched writer for reviews, activity and watchlist entries."""
+    return events.EventWriter(init_storage())
+
+
+@st.cache_resource
+def get_review_index():
+    """Process-wide review index shared by every session."""
+    return review_index.ReviewIndex(init_storage(), writer=get_event_writer())
+
+
+@st.cache_resource
+def get_movie_genres():
+    """``(movie_id, genre)`` rows from movies.csv, parsed once per process and mirrored to the database."""
+    movie_genres = genres.load_movie_genres()
+    try:
+        storage.sync_movie_genres(movie_genres, init_storage())
+    except Exception as e:
+        print(f"Genre table sync failed: {e}")
+    return movie_genres
+
+
+@st.cache_resource
+def get_chart_cache():
+    """Rendered Analytics charts shared by every session, refreshed in the background."""
+    return charts.ChartCache(init_storage())
+
+
+@st.cache_resource
+def get_precompute_store():
+    """Process-wide connection to the precomputed store (recommendations.db) and the lock that serializes it."""
+    return precompute.open_store(check_same_thread=False), threading.Lock()
+
+
+@contextmanager
+def precompute_store():
+    conn, lock = get_precompute_store()
+    with lock:
+        yield conn
+
+
+@st.cache_resource
+def get_rerun_profile():
+    """Per-section rerun timings of every session in this process."""
+    return rerun_profile.RerunProfile()
 
 
+@st.cache_resource
+def get_warmup():
+    """Process-wide cache warm-up (see start_warmup)."""
+    return warmup.Warmup()
+
+
+@st.cache_data(ttl=300)
+def activity_summary(days):
+    """Daily activity table and funnel for the last ``days`` days (recomputed at most every 5 minutes)."""
+    start, end = activity_stats.window(days)
+    return activity_stats.daily(start, end), activity_stats.funnel(start, end)
+
+
+@st.cache_resource
+def start_activity_compaction():
+    """Background compaction of old activity into month segments (once per process)."""
+    return activity_log.start_compactor(engine=init_storage())
+
+
+start_activity_compaction()
+
+
+# Genre buttons on the Discover page
+DISCOVER_GENRES = ["Action", "Comedy", "Drama", "Sci-Fi", "Horror", "Romance", "Thriller", "Adventure"]
+
+
+# Warm the caches the first Home and Discover reruns would otherwise fill
+# inline (TMDB lists and the trailers of their first grid, the poster, trailer
+# and details of the catalog grid, models, indexes). Started before any page
+# runs so every entry point triggers it, including pages that stop early.
+def warmup_steps():
+    def trailers(movies_list):
+        return [warmup.Step(f"trailer {m['id']}", lambda movie_id=m['id']: tmdb.fetch_trailer(movie_id))
+                for m in movies_list[:3]]
+
+    def discover_genres():
+        return [warmup.Step(f"genre {name}", lambda genre_id=gid: trailers(tmdb.fetch_movies_by_genre(genre_id)))
+                for gid, name in tmdb.fetch_genres().items() if name in DISCOVER_GENRES]
+
+    def catalog_grid():
+        # Same ids, same types as the Discover default grid, so the same cache entries
+        movies = model_set.movies
+        if not isinstance(movies, pd.DataFrame):
+            return []
+        return [warmup.Step(f"{kind} {movie.id}", lambda fetch=fetch, movie_id=movie.id: fetch(movie_id))
+                for movie in movies.head(3).itertuples()
+                for kind, fetch in (("poster", tmdb.fetch_poster), ("trailer", tmdb.fetch_trailer),
+                                    ("details", tmdb.fetch_movie_details))]
+
+    def load_models():
+        for handle in model_set.handles.values():
+            handle.get()
+        catalog_by_id()
+
+    return [
+        warmup.Step("popular movies", lambda: trailers(tmdb.fetch_popular_movies())),
+        warmup.Step("genres", discover_genres),
+        warmup.Step("catalog grid", catalog_grid),
+        warmup.Step("models", load_models),
+        warmup.Step("review index", lambda: get_review_index().frame()),
+        warmup.Step("movie genres", get_movie_genres),
+    ]
+
+
+@st.cache_resource
+def start_warmup():
+    """Run the warm-up in the background (once per process)."""
+    return get_warmup().start(warmup_steps())
+
+
+start_warmup()
+
+
+@st.cache_resource
+def get_accounts():
+    """Process-wide user cache and bcrypt pool."""
+    return accounts.Accounts(init_storage())
+
+
+def sign_in(username, password):
+    try:
+        with st.spinner("Signing in..."):
+            return get_accounts().authenticate(username, password)
+    except Exception as e:
+        st.warning(f"Error loading user: {e}")
+        return None
+
+
+def sign_up(username, password):
+    """New user id, None if the username is taken (False on error)."""
+    try:
+        with st.spinner("Creating account..."):
+            return get_accounts().register(username, password)
+    except Exception as e:
+        st.error(f"Error saving user: {e}")
+        return False
+
+
+rerun.lap("startup")
+
 # Sidebar navigation
 with st.sidebar:
     nav = st.radio("Navigation", ["Home", "Discover", "Mood-Based", "Watchlist", "History", "Analytics", "Profile", "Sign In"], key="nav_radio")
@@ -100,6 +323,7 @@ with st.sidebar:
             st.session_state.current_user = None
             st.session_state.current_username = None
             st.session_state.page = "Home"      
+rerun.lap("sidebar")
 
 # Main page routing
 if nav == "Profile":
@@ -109,15 +333,7 @@ if nav == "Profile":
         username = st.session_state.get("current_username", str(user_id))
         st.markdown(f"**Username:** {username}")
         st.markdown(f"**User ID:** {user_id}")
-        import pandas as pd, os
-        ratings_count = 0
-        avg_rating = None
-        if os.path.exists("user_reviews.csv"):
-            reviews_df = pd.read_csv("user_reviews.csv", header=0)
-            user_reviews = reviews_df[reviews_df["user"].astype(str) == str(user_id)]
-            ratings_count = len(user_reviews)
-            if ratings_count > 0:
-                avg_rating = user_reviews["rating"].astype(float).mean()
+        ratings_count, avg_rating = storage.user_review_stats(user_id)
         st.markdown(f"**Number of Ratings:** {ratings_count}")
         if avg_rating is not None:
             st.markdown(f"**Average Rating:** {avg_rating:.2f}")
@@ -125,85 +341,96 @@ if nav == "Profile":
             st.info("Feature coming soon: Edit profile info.")
     else:
         st.warning("Please sign in to view your profile.")
+    rerun.finish("page: Profile", get_rerun_profile())
     st.stop()
 elif nav == "Analytics":
     st.title("Analytics & Insights")
-    import pandas as pd
-    import matplotlib.pyplot as plt
-    import seaborn as sns
-    import os
-    # Rating histogram
-    if os.path.exists("user_reviews.csv"):
-        reviews_df = pd.read_csv("user_reviews.csv", header=0)
-        st.subheader("Rating Distribution")
-        fig, ax = plt.subplots()
-        sns.histplot(reviews_df["rating"].astype(float), bins=5, kde=True, ax=ax)
-        ax.set_xlabel("Rating")
-        ax.set_ylabel("Count")
-        st.pyplot(fig)
-
-        # Ratings per user (top raters)
-        st.subheader("Ratings per User (Top Raters)")
-        user_counts = reviews_df["user"].value_counts().head(10)
-        fig_user, ax_user = plt.subplots()
-        ax_user.bar(user_counts.index.astype(str), user_counts.values)
-        ax_user.set_xlabel("User")
-        ax_user.set_ylabel("Number of Ratings")
-        plt.xticks(rotation=45)
-        st.pyplot(fig_user)
-
-        # Number of reviews per movie (top reviewed movies)
-        st.subheader("Number of Reviews per Movie (Top Reviewed)")
-        movie_counts = reviews_df["title"].value_counts().head(10)
-        fig_movie, ax_movie = plt.subplots()
-        ax_movie.bar(movie_counts.index.astype(str), movie_counts.values)
-        ax_movie.set_xlabel("Movie Title")
-        ax_movie.set_ylabel("Number of Reviews")
-        plt.xticks(rotation=45)
-        st.pyplot(fig_movie)
-
-        # Top genres bar chart & average rating per genre
-        if os.path.exists("movies.csv") and "movie_id" in reviews_df:
-            movies_df = pd.read_csv("movies.csv")
-            # Map movie_id to genres
-            genre_counts = {}
-            genre_ratings = {}
-            for _, row in reviews_df.iterrows():
-                mid = int(row["movie_id"])
-                genres = []
-                if "genres" in movies_df.columns:
-                    genres_str = movies_df[movies_df["id"] == mid]["genres"].values
-                    if len(genres_str) > 0:
-                        import ast #Abstract Syntax Trees.
-                        try:
-                            genres = [g["name"] for g in ast.literal_eval(genres_str[0]) if "name" in g]
-                        except Exception:
-                            pass
-                for g in genres:
-                    genre_counts[g] = genre_counts.get(g, 0) + 1
-                    genre_ratings.setdefault(g, []).append(float(row["rating"]))
-            if genre_counts:
-                st.subheader("Top Genres by Ratings")
-                fig2, ax2 = plt.subplots()
-                genres_sorted = sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)
-                ax2.bar([g for g, _ in genres_sorted], [c for _, c in genres_sorted])
-                ax2.set_xlabel("Genre")
-                ax2.set_ylabel("Number of Ratings")
-                plt.xticks(rotation=45)
-                st.pyplot(fig2)
-            if genre_ratings:
-                st.subheader("Average Rating per Genre")
-                avg_ratings = {g: sum(r)/len(r) for g, r in genre_ratings.items() if len(r) > 0}
-                genres_sorted = sorted(avg_ratings.items(), key=lambda x: x[1], reverse=True)
-                fig3, ax3 = plt.subplots()
-                ax3.bar([g for g, _ in genres_sorted], [r for _, r in genres_sorted])
-                ax3.set_xlabel("Genre")
-                ax3.set_ylabel("Average Rating")
-                plt.xticks(rotation=45)
-                st.pyplot(fig3)
-
+    # Charts are rendered from the rating aggregate tables and cached until they change;
+    # the genre ones need the movie_genres table synced from movies.csv first
+    get_movie_genres()
+    rendered = get_chart_cache().charts()
+    if rendered:
+        for name, title in (("ratings", "Rating Distribution"),
+                            ("top_users", "Ratings per User (Top Raters)"),
+                            ("top_movies", "Number of Reviews per Movie (Top Reviewed)"),
+                            ("genre_counts", "Top Genres by Ratings"),
+                            ("genre_means", "Average Rating per Genre")):
+            if name in rendered:
+                st.subheader(title)
+                st.image(rendered[name])
     else:
         st.info("No ratings data found. Please rate some movies first.")
+
+    # Activity over time
+    st.subheader("Activity Over Time")
+    window_days = st.selectbox("Window", [7, 30, 90], index=1, format_func=lambda d: f"Last {d} days",
+                               key="activity_window")
+    try:
+        daily_activity, activity_funnel = activity_summary(window_days)
+        st.line_chart(daily_activity[["active_users", "active_users_7d"]])
+        st.bar_chart(daily_activity[activity_stats.ACTIONS])
+        funnel_cols = st.columns(len(activity_funnel))
+        for col, (step, users) in zip(funnel_cols, activity_funnel.items()):
+            col.metric(step.replace("_", " ").capitalize(), users)
+        st.caption("Funnel: users who watched, then added to a watchlist, then rated within the window.")
+    except Exception as e:
+        st.warning(f"Error computing activity analytics: {e}")
+
+    # Write queue health
+    st.subheader("Write Queue")
+    writer_stats = get_event_writer().stats()
+    col_depth, col_last, col_avg, col_max = st.columns(4)
+    col_depth.metric("Queued events", writer_stats.queue_depth)
+    col_last.metric("Last flush", f"{writer_stats.last_flush_ms:.1f} ms")
+    col_avg.metric("Avg flush", f"{writer_stats.avg_flush_ms:.1f} ms")
+    col_max.metric("Max flush", f"{writer_stats.max_flush_ms:.1f} ms")
+    st.caption(f"{writer_stats.events} events written in {writer_stats.batches} batches, {writer_stats.errors} failed.")
+
+    # Model artifact loading
+    st.subheader("Model Artifacts")
+    st.dataframe(pd.DataFrame([
+        {"artifact": s.name, "state": s.state,
+         "load (s)": None if s.seconds is None else round(s.seconds, 2),
+         "memory (MB)": None if s.nbytes is None else round(s.nbytes / 1e6, 1),
+         "error": s.error}
+        for s in (handle.stats() for handle in model_set.handles.values())
+    ]), hide_index=True)
+    model_swaps = get_model_registry().swaps()
+    if model_swaps:
+        last_swap = model_swaps[-1]
+        st.caption(f"Last reload {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_swap.at))}: "
+                   f"{last_swap.seconds:.2f} s, {last_swap.nbytes / 1e6:.1f} MB alongside the previous "
+                   f"{last_swap.previous_nbytes / 1e6:.1f} MB"
+                   + (f" (rejected: {last_swap.error})" if last_swap.error else ""))
+
+    # Startup cache warm-up
+    st.subheader("Cache Warm-up")
+    warmup_progress = get_warmup().progress()
+    if warmup_progress.total:
+        st.progress(warmup_progress.done / warmup_progress.total,
+                    text=f"Cache warm-up: {warmup_progress.done}/{warmup_progress.total} steps in "
+                         f"{warmup_progress.seconds:.1f} s"
+                         + (f", {warmup_progress.failed} failed" if warmup_progress.failed else "")
+                         + ("" if warmup_progress.finished else " (running)"))
+        if warmup_progress.slowest:
+            st.caption(f"Slowest step: {warmup_progress.slowest}")
+    else:
+        st.caption("Starting...")
+
+    # What every rerun pays before the page content
+    st.subheader("Rerun Cost")
+    profile = get_rerun_profile()
+    baseline_ms = profile.baseline_ms()
+    if baseline_ms is None:
+        st.caption("No reruns profiled yet.")
+    else:
+        st.metric("Baseline per rerun (median)", f"{baseline_ms:.1f} ms",
+                  delta=f"{baseline_ms - profile.budget_ms:+.1f} ms vs {profile.budget_ms:.0f} ms budget",
+                  delta_color="inverse")
+        if profile.over_budget():
+            st.warning("Rerun baseline is over budget; see the slowest sections below.")
+        st.dataframe(profile.stats().round(2))
+    rerun.finish("page: Analytics", get_rerun_profile())
     st.stop()
 
 elif nav == "Sign In" or st.session_state.get("page") == "Sign In":
@@ -214,9 +441,8 @@ elif nav == "Sign In" or st.session_state.get("page") == "Sign In":
         signin_email = st.text_input("Email", key="signin_email")
         signin_password = st.text_input("Password", type="password", key="signin_password")
         if st.button("Sign In", key="signin_btn"):
-            users = load_users_from_csv()
-            user = users.get(signin_email)
-            if user and bcrypt.checkpw(signin_password.encode(), user["password"].encode()):
+            user = sign_in(signin_email, signin_password)
+            if user:
                 st.session_state.current_user = user["user_id"]
                 st.session_state.current_username = signin_email
                 st.session_state.page = "home"
@@ -228,110 +454,47 @@ elif nav == "Sign In" or st.session_state.get("page") == "Sign In":
         signup_email = st.text_input("Email", key="signup_email")
         signup_password = st.text_input("Password", type="password", key="signup_password")
         if st.button("Sign Up", key="signup_btn"):
-            users = load_users_from_csv()
-            if signup_email in users:
+            new_user_id = sign_up(signup_email, signup_password)
+            if new_user_id is None:
                 st.error("Email already registered. Please sign in.")
-            else:
-                new_user_id = max([u["user_id"] for u in users.values()], default=0) + 1
-                save_user_to_csv(signup_email, signup_password, new_user_id)
+            elif new_user_id:
                 st.success("Account created! Please sign in.")
+    rerun.finish("page: Sign In", get_rerun_profile())
     st.stop()
 
 # ...existing code for other sections (Home, Discover, Mood-Based, Watchlist, History)...
-import streamlit as st
-import pandas as pd
-import pickle
-import requests
-import os
-import csv
-from datetime import datetime
-import uuid
-import numpy as np
-import scipy.sparse as sp
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-import bcrypt
 
-# TMDB API Key (use environment variable for security)
-TMDB_API_KEY = os.getenv("TMDB_API_KEY", "9ef5ae6fc8b8f484e9295dc97d8d32ea")
+HISTORY_LIMIT = 60
 
 
-@st.cache_resource
-def load_pickles():
-    import time
-    def robust_pickle_load(filename, url):
-        # Check file exists and is not empty
-        if not os.path.exists(filename) or os.path.getsize(filename) < 1000:
-            # record silently for diagnostics
-            try:
-                st.session_state.setdefault('model_load_errors', []).append(f"{filename} missing or too small, attempting to download...")
-            except Exception:
-                pass
-            download_from_gdrive(url, filename)
-            time.sleep(1)
-        # Read first bytes to detect which module the pickle references.
-        try:
-            with open(filename, 'rb') as f:
-                first_bytes = f.read(512)
-        except Exception as e:
-            try:
-                st.session_state.setdefault('model_load_errors', []).append(f"Failed to read {filename}: {e}")
-            except Exception:
-                pass
-            return None
+movies = model_set.movies
 
-        # Quick heuristic: if the pickle references the 'surprise' package but
-        # scikit-surprise isn't installed, avoid attempting to unpickle because
-        # it will raise a ModuleNotFoundError and clutter logs.
-        if b'surprise' in first_bytes:
-            try:
-                import importlib
-                if importlib.util.find_spec('surprise') is None:
-                    try:
-                        st.session_state.setdefault('model_load_errors', []).append(f"{filename} appears to be a Surprise model (needs scikit-surprise). 'surprise' is not installed; skipping load.")
-                    except Exception:
-                        pass
-                    return None
-            except Exception:
-                # If importlib check fails for any reason, fall through to try unpickling
-                pass
 
-        # Attempt actual unpickle
-        try:
-            with open(filename, 'rb') as f:
-                return pickle.load(f)
-        except ModuleNotFoundError as e:
-            # Common case: pickle references a missing package (like surprise)
-            try:
-                st.session_state.setdefault('model_load_errors', []).append(f"Module required to unpickle {filename} is missing: {e}. Skipping load.")
-            except Exception:
-                pass
-            return None
-        except Exception as e:
-            # Save debug info to session_state instead of printing
-            try:
-                st.session_state.setdefault('model_load_errors', []).append(f"Failed to load {filename}: {e}. First bytes: {first_bytes[:200]}")
-            except Exception:
-                pass
-            return None
+def current_catalog():
+    """The catalog of the registry's current model set (None if it isn't a frame)."""
+    catalog = get_model_registry().current().movies
+    return catalog if isinstance(catalog, pd.DataFrame) else None
 
-    files = [
-        ("movie_list.pkl", "https://drive.google.com/file/d/1aUNbwWu3gOhb2rPQJacu1yAJoNZfHfAC/view?usp=sharing"),
-        ("similarity.pkl", "https://drive.google.com/file/d/1vNeQkY_GfAh6xfWLydssSvh6ErRSi4Ep/view?usp=sharing"),
-        ("svd_model.pkl", "https://drive.google.com/file/d/1ILsFbv8WWf-5ElXV7B37oj3PwJR3-gPJ/view?usp=sharing"),
-    ]
-    loaded = [robust_pickle_load(fname, url) for fname, url in files]
-    # keep silent on missing model files; errors collected in st.session_state['model_load_errors']
-    return tuple(loaded)
 
-movies, similarity, svd_model = load_pickles()
+@st.cache_resource
+def start_notification_job():
+    """Background matching of new movies against users' genre profiles (once per process).
+
+    Each pass reads the current catalog, so it follows model hot reloads.
+    """
+    return notifications.start_job(get_movie_genres(), current_catalog, engine=init_storage())
+
+
+start_notification_job()
 
 # Keep a silent flag in session_state for diagnostics (not shown to users)
 try:
-    st.session_state['svd_loaded'] = bool(svd_model is not None)
+    st.session_state['svd_loaded'] = model_set.handles["svd_model"].stats().state == "loaded"
 except Exception:
     pass
 
+rerun.lap("models")
+
 # Custom CSS for dark theme, styling, and watchlist/history cards
 st.markdown("""
 <style>
@@ -455,487 +618,152 @@ h1, h2, h3 {
 </style>
 """, unsafe_allow_html=True)
 
-# Cache TMDB API calls for performance
-@st.cache_data
-def fetch_popular_movies():
-    url = f"https://api.themoviedb.org/3/movie/popular?api_key={TMDB_API_KEY}&language=en-US&page=1"
-    try:
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[204, 429, 500, 502, 503, 504])
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        response = session.get(url, timeout=5)
-        if response.status_code != 200:
-            st.warning(f"Failed to fetch popular movies: HTTP {response.status_code}")
-            return []
-        data = response.json()
-        if not isinstance(data, dict) or "results" not in data:
-            st.warning("Invalid popular movies response")
-            return []
-        movies_list = []
-        for movie in data.get("results", []):
-            movies_list.append({
-                "id": movie.get("id", 0),
-                "title": movie.get("title", "Unknown"),
-                "rating": movie.get("vote_average", 0.0),
-                "description": movie.get("overview", "No description available"),
-                "poster": f"https://image.tmdb.org/t/p/w500/{movie.get('poster_path')}" if movie.get("poster_path") else "https://via.placeholder.com/200x300?text=No+Poster",
-                "runtime": movie.get("runtime", 120),
-                "release_date": movie.get("release_date", "2000-01-01"),
-                "genres": movie.get("genre_ids", [])
-            })
-        return movies_list
-    except requests.exceptions.RequestException as e:
-        st.warning(f"Network error fetching popular movies: {e}")
-        return []
-    except Exception as e:
-        st.warning(f"Error fetching popular movies: {e}")
-        return []
-
-@st.cache_data
-def fetch_genres():
-    url = f"https://api.themoviedb.org/3/genre/movie/list?api_key={TMDB_API_KEY}&language=en-US"
-    try:
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[204, 429, 500, 502, 503, 504])
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        response = session.get(url, timeout=5)
-        if response.status_code != 200:
-            st.warning(f"Failed to fetch genres: HTTP {response.status_code}")
-            return {}
-        data = response.json()
-        if not isinstance(data, dict) or "genres" not in data:
-            st.warning("Invalid genres response")
-            return {}
-        return {genre["id"]: genre["name"] for genre in data.get("genres", [])}
-    except Exception as e:
-        st.warning(f"Error fetching genres: {e}")
-        return {}
-
-@st.cache_data
-def fetch_movies_by_genre(genre_id):
-    url = f"https://api.themoviedb.org/3/discover/movie?api_key={TMDB_API_KEY}&with_genres={genre_id}&language=en-US&page=1"
-    try:
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[204, 429, 500, 502, 503, 504])
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        response = session.get(url, timeout=5)
-        if response.status_code != 200:
-            st.warning(f"Failed to fetch movies for genre: HTTP {response.status_code}")
-            return []
-        data = response.json()
-        if not isinstance(data, dict) or "results" not in data:
-            st.warning("Invalid genre movies response")
-            return []
-        movies_list = []
-        for movie in data.get("results", []):
-            movies_list.append({
-                "id": movie.get("id", 0),
-                "title": movie.get("title", "Unknown"),
-                "rating": movie.get("vote_average", 0.0),
-                "description": movie.get("overview", "No description available"),
-                "poster": f"https://image.tmdb.org/t/p/w500/{movie.get('poster_path')}" if movie.get("poster_path") else "https://via.placeholder.com/200x300?text=No+Poster",
-                "runtime": movie.get("runtime", 120),
-                "release_date": movie.get("release_date", "2000-01-01"),
-                "genres": movie.get("genre_ids", [])
-            })
-        return movies_list
-    except Exception as e:
-        st.warning(f"Error fetching movies for genre: {e}")
-        return []
-
-@st.cache_data
-def fetch_poster(movie_id):
-    try:
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[204, 429, 500, 502, 503, 504])
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={TMDB_API_KEY}&language=en-US"
-        response = session.get(url, timeout=5)
-        
-        if response.status_code == 204:
-            st.warning(f"No poster available for movie ID {movie_id} (HTTP 204)")
-            return "https://via.placeholder.com/200x300?text=No+Poster"
-        elif response.status_code != 200:
-            st.warning(f"Failed to fetch poster for movie ID {movie_id}: HTTP {response.status_code}")
-            return "https://via.placeholder.com/200x300?text=Error"
-        
-        data = response.json()
-        if not isinstance(data, dict):
-            st.warning(f"Invalid poster response for movie ID {movie_id}")
-            return "https://via.placeholder.com/200x300?text=Error"
-        
-        poster_path = data.get('poster_path')
-        return f"https://image.tmdb.org/t/p/w500/{poster_path}" if poster_path else "https://via.placeholder.com/200x300?text=No+Poster"
-    except requests.exceptions.ConnectionError as e:
-        st.warning(f"Network error fetching poster for movie ID {movie_id}: {e}")
-        return "https://via.placeholder.com/200x300?text=Network+Error"
-    except requests.exceptions.Timeout:
-        st.warning(f"Request timed out fetching poster for movie ID {movie_id}")
-        return "https://via.placeholder.com/200x300?text=Timeout"
-    except requests.exceptions.RequestException as e:
-        st.warning(f"Error fetching poster for movie ID {movie_id}: {e}")
-        return "https://via.placeholder.com/200x300?text=Error"
-    except Exception as e:
-        st.warning(f"Unexpected error fetching poster for movie ID {movie_id}: {e}")
-        return "https://via.placeholder.com/200x300?text=Error"
-
-@st.cache_data
-def fetch_trailer(movie_id):
-    try:
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[204, 429, 500, 502, 503, 504])
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        url = f"https://api.themoviedb.org/3/movie/{movie_id}/videos?api_key={TMDB_API_KEY}&language=en-US"
-        response = session.get(url, timeout=5)
-        
-        if response.status_code == 204:
-            st.warning(f"No trailer available for movie ID {movie_id} (HTTP 204)")
-            return None
-        elif response.status_code != 200:
-            st.warning(f"Failed to fetch trailer for movie ID {movie_id}: HTTP {response.status_code}")
-            return None
-        
-        data = response.json()
-        if not isinstance(data, dict) or "results" not in data:
-            st.warning(f"Invalid trailer response for movie ID {movie_id}")
-            return None
-        
-        for video in data.get('results', []):
-            if video.get('type') == 'Trailer' and video.get('site') == 'YouTube':
-                return f"https://www.youtube.com/watch?v={video['key']}"
-        return None
-    except requests.exceptions.ConnectionError as e:
-        st.warning(f"Network error fetching trailer for movie ID {movie_id}. Please check internet connection.")
-        return None
-    except requests.exceptions.Timeout:
-        st.warning(f"Request timed out fetching trailer for movie ID {movie_id}. Please try again later.")
-        return None
-    except requests.exceptions.RequestException as e:
-        st.warning(f"Error fetching trailer for movie ID {movie_id}: {e}")
+rerun.lap("styles")
+
+# Recommenders return lists of recommenders.Recommendation (movie_id, score,
+# source); titles, posters and trailers are resolved by resolve_cards() only
+# for the cards that are actually rendered.
+
+# TMDB list results (popular/mood fallbacks) already carry title, poster and
+# rating; remember them so resolve_cards() doesn't look them up again
+def tmdb_recommendations(movies_list, source):
+    details = st.session_state.setdefault("recommendation_details", {})
+    for movie in movies_list:
+        details[movie['id']] = movie
+    return [recommenders.Recommendation(int(m['id']), float(m.get('rating') or 0.0), source) for m in movies_list]
+
+# Precomputed per-user lists (see precompute.py); dirty or missing users are
+# recomputed inline and written back so the next read is a primary-key lookup.
+# Only the signed-in user's own lists are stored: the anonymous default user
+# on Discover gets None, so the pipeline computes its picks inline.
+def precomputed_recommendations(user_id, kind):
+    if user_id is None or user_id != st.session_state.get("current_user"):
         return None
-    except Exception as e:
-        st.warning(f"Unexpected error fetching trailer for movie ID {movie_id}: {e}")
-        return None
-
-@st.cache_data
-def fetch_movie_details(movie_id):
+    with precompute_store() as conn:
+        recs = precompute.read_recommendations(conn, user_id, kind)
+    if recs is None:
+        started_at = time.time()
+        rows = precompute.compute_user(user_id, movies, get_similarity(), get_svd_model(),
+                                       get_review_index().frame())
+        with precompute_store() as conn:
+            precompute.write_recommendations(conn, rows, started_at)
+        recs = {k: v for _, k, v in rows}[kind]
+    return recs
+
+def mark_recommendations_dirty(user_id):
+    st.session_state.candidate_cache.clear()
     try:
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[204, 429, 500, 502, 503, 504])
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={TMDB_API_KEY}&language=en-US"
-        response = session.get(url, timeout=5)
-        
-        if response.status_code == 204:
-            st.warning(f"No details available for movie ID {movie_id} (HTTP 204)")
-            return {"rating": 0.0, "description": "No description available"}
-        elif response.status_code != 200:
-            st.warning(f"Failed to fetch details for movie ID {movie_id}: HTTP {response.status_code}")
-            return {"rating": 0.0, "description": "No description available"}
-        
-        data = response.json()
-        if not isinstance(data, dict):
-            st.warning(f"Invalid details response for movie ID {movie_id}")
-            return {"rating": 0.0, "description": "No description available"}
-        
-        return {
-            "rating": data.get("vote_average", 0.0),
-            "description": data.get("overview", "No description available")
-        }
+        with precompute_store() as conn:
+            precompute.mark_dirty(conn, user_id)
     except Exception as e:
-        st.warning(f"Error fetching movie details for movie ID {movie_id}: {e}")
-        return {"rating": 0.0, "description": "No description available"}
+        st.warning(f"Error updating recommendation store: {e}")
+
+# Resolve display fields for a batch of recommendations. TMDB lookups for the
+# cards run concurrently; everything else comes from the catalog or the
+# details remembered by tmdb_recommendations().
+def resolve_cards(recs):
+    known = st.session_state.get("recommendation_details", {})
+    catalog = catalog_by_id()
+    ctx = get_script_run_ctx()
+
+    def catalog_value(row, column):
+        if row is not None and column in row and pd.notna(row[column]):
+            return row[column]
+        return None
 
-@st.cache_data
-def fetch_movie_metadata(movie_id):
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={TMDB_API_KEY}&append_to_response=keywords"
-    try:
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[204, 429, 500, 502, 503, 504])
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        response = session.get(url, timeout=5)
-        if response.status_code != 200:
-            st.warning(f"Failed to fetch metadata for movie ID {movie_id}: HTTP {response.status_code}")
-            return {"genres": [], "keywords": [], "title": "Unknown"}
-        data = response.json()
+    def resolve(rec):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        movie_id = rec.movie_id
+        details = known.get(movie_id)
+        row = catalog.loc[movie_id] if movie_id in catalog.index else None
+        title = catalog_value(row, 'title') or (details['title'] if details else "Unknown")
+        rating = catalog_value(row, 'vote_average')
+        if rating is None:
+            rating = details['rating'] if details else tmdb.fetch_movie_details(movie_id)['rating']
+        description = catalog_value(row, 'overview')
+        if description is None:
+            description = details['description'] if details else tmdb.fetch_movie_details(movie_id)['description']
         return {
-            "genres": [g['id'] for g in data.get('genres', [])],
-            "keywords": [k['id'] for k in data.get('keywords', {}).get('keywords', [])[:5]],
-            "title": data.get('title', 'Unknown'),
-            "rating": data.get('vote_average', 0.0),
-            "description": data.get('overview', 'No description available')
+            "movie_id": movie_id,
+            "title": title,
+            "poster": details['poster'] if details else tmdb.fetch_poster(movie_id),
+            "trailer": tmdb.fetch_trailer(movie_id),
+            "rating": float(rating or 0.0),
+            "description": description or "No description available",
+            "score": rec.score,
+            "source": rec.source,
         }
-    except Exception as e:
-        st.warning(f"Error fetching metadata for movie ID {movie_id}: {e}")
-        return {"genres": [], "keywords": [], "title": "Unknown", "rating": 0.0, "description": "No description available"}
 
-@st.cache_data
-def fetch_mood_based_movies(_cache_key, genre_ids, max_runtime=None, min_year=None, max_year=None, keywords=None, adult=False):
-    movies_list = []
-    base_url = f"https://api.themoviedb.org/3/discover/movie?api_key={TMDB_API_KEY}&language=en-US&sort_by=vote_average.desc&vote_count.gte=100"
-    
-    # Construct query parameters
-    query_params = []
-    if genre_ids:
-        query_params.append(f"with_genres={','.join(map(str, genre_ids))}")
-    query_params.append(f"include_adult={adult}")
-    
-    # Try multiple query variations for diversity
-    attempts = [
-        # Full query
-        query_params + (
-            ([f"with_runtime.lte={max_runtime}"] if max_runtime else []) +
-            ([f"primary_release_date.gte={min_year}-01-01"] if min_year else []) +
-            ([f"primary_release_date.lte={max_year}-12-31"] if max_year else []) +
-            ([f"with_keywords={keywords}"] if keywords else []) +
-            ["page=1"]
-        ),
-        # Relax runtime and keywords
-        query_params + (
-            ([f"primary_release_date.gte={min_year}-01-01"] if min_year else []) +
-            ([f"primary_release_date.lte={max_year}-12-31"] if max_year else []) +
-            ["page=1"]
-        ),
-        # Random page for diversity
-        query_params + (
-            ([f"primary_release_date.gte={min_year}-01-01"] if min_year else []) +
-            ([f"primary_release_date.lte={max_year}-12-31"] if max_year else []) +
-            [f"page={np.random.randint(1, 5)}"]
-        ),
-        # Broad query
-        query_params + ["page=1"],
-    ]
-    
-    for params in attempts:
-        url = base_url + "&" + "&".join(params)
-        try:
-            session = requests.Session()
-            retries = Retry(total=3, backoff_factor=1, status_forcelist=[204, 429, 500, 502, 503, 504])
-            session.mount('https://', HTTPAdapter(max_retries=retries))
-            response = session.get(url, timeout=5)
-            if response.status_code != 200:
-                continue
-            data = response.json()
-            if not isinstance(data, dict) or "results" not in data:
-                continue
-            for movie in data.get("results", [])[:5]:
-                movies_list.append({
-                    "id": movie.get("id", 0),
-                    "title": movie.get("title", "Unknown"),
-                    "rating": movie.get("vote_average", 0.0),
-                    "description": movie.get("overview", "No description available"),
-                    "poster": f"https://image.tmdb.org/t/p/w500/{movie.get('poster_path')}" if movie.get("poster_path") else "https://via.placeholder.com/200x300?text=No+Poster",
-                    "runtime": movie.get("runtime", 120),
-                    "release_date": movie.get("release_date", "2000-01-01"),
-                    "genres": movie.get("genre_ids", [])
-                })
-            if movies_list:
-                # Shuffle for diversity
-                np.random.shuffle(movies_list)
-                return movies_list[:5]
-        except Exception as e:
-            continue
-    
-    # Fallback to popular movies with warning
-    st.warning("No movies found matching your mood-based criteria. Showing popular movies.")
-    return fetch_popular_movies()
-
-# Content-based recommendation
-def recommend_content_based(movie_title):
-    if similarity is None or movies.empty:
-        st.error("Content-based recommendations unavailable due to missing data.")
-        return [], []
-    try:
-        index = movies[movies['title'] == movie_title].index[0]
-        distances = sorted(list(enumerate(similarity[index])), reverse=True, key=lambda x: x[1])
-        recommended_names = []
-        recommended_posters = []
-        for i in distances[1:6]:
-            movie_id = movies.iloc[i[0]].id
-            recommended_names.append(movies.iloc[i[0]].title)
-            recommended_posters.append(fetch_poster(movie_id))
-        return recommended_names, recommended_posters
-    except IndexError:
-        st.error(f"Movie '{movie_title}' not found in the database.")
-        return [], []
-    except Exception as e:
-        st.error(f"Error generating content-based recommendations: {e}")
-        return [], []
-
-# Fallback content-based recommendation using TMDB genres
-def recommend_content_based_tmdb(movie_title, num_recommendations=5):
-    if movies.empty:
-        st.error("Content-based recommendations unavailable due to missing movie data.")
-        return [], []
-    
-    try:
-        movie_id = movies[movies['title'] == movie_title]['id'].iloc[0] if movie_title in movies['title'].values else None
-        if not movie_id:
-            st.error(f"Movie '{movie_title}' not found.")
-            return [], []
-        
-        # Fetch metadata for the target movie
-        target_metadata = fetch_movie_metadata(movie_id)
-        target_genres = set(target_metadata['genres'])
-        
-        # Compute similarities with other movies
-        similarities = []
-        for movie in movies.itertuples():
-            if movie.title == movie_title:
-                continue
-            metadata = fetch_movie_metadata(movie.id)
-            genres = set(metadata['genres'])
-            # Jaccard similarity for genres
-            intersection = len(target_genres & genres)
-            union = len(target_genres | genres)
-            sim = intersection / union if union > 0 else 0
-            similarities.append((movie.id, movie.title, sim))
-        
-        # Sort by similarity and select top recommendations
-        similarities = sorted(similarities, key=lambda x: x[2], reverse=True)[:num_recommendations]
-        recommended_names = [title for _, title, _ in similarities]
-        recommended_posters = [fetch_poster(movie_id) for movie_id, _, _ in similarities]
-        return recommended_names, recommended_posters
-    
-    except IndexError:
-        st.error(f"Movie '{movie_title}' not found in the database.")
-        return [], []
-    except Exception as e:
-        st.error(f"Error generating TMDB-based content recommendations: {e}")
-        return [], []
-
-# Collaborative filtering recommendation (using SVD)
-def recommend_collaborative(user_id):
-    if movies.empty:
-        st.error("Collaborative recommendations unavailable due to missing movie data.")
-        return [], []
-
-    # If SVD model isn't available (scikit-surprise not installed or svd_model missing),
-    # fall back to a popularity-based recommender.
-    if svd_model is None:
-        try:
-            # Use user reviews to compute popularity if available
-            if os.path.exists("user_reviews.csv"):
-                reviews_df = pd.read_csv("user_reviews.csv", header=0)
-                reviews_df['rating'] = reviews_df['rating'].astype(float)
-                pop = reviews_df.groupby('movie_id').agg({'rating': ['mean', 'count']})
-                pop.columns = ['avg_rating', 'count']
-                pop['score'] = pop['avg_rating'] * np.log1p(pop['count'])
-                pop = pop.reset_index().sort_values('score', ascending=False)
-                uid = str(user_id)
-                user_rated = set(reviews_df[reviews_df['user'].astype(str) == uid]['movie_id'].astype(int).tolist())
-                recommendations = []
-                for mid in pop['movie_id'].tolist():
-                    if mid in user_rated:
-                        continue
-                    try:
-                        title = movies[movies['id'] == int(mid)]['title'].iloc[0]
-                        recommendations.append((title, fetch_poster(int(mid))))
-                    except Exception:
-                        continue
-                    if len(recommendations) >= 3:
-                        break
-                if recommendations:
-                    names, posters = zip(*recommendations)
-                    return list(names), list(posters)
-
-            # Otherwise, return top movies from movies.csv
-            top_titles = movies['title'].head(3).tolist()
-            top_posters = [fetch_poster(mid) for mid in movies['id'].head(3).tolist()]
-            return top_titles, top_posters
-        except Exception as e:
-            st.error(f"Error in popularity fallback: {e}")
-            return [], []
+    if not recs:
+        return []
+    with ThreadPoolExecutor(max_workers=min(8, len(recs))) as pool:
+        return list(pool.map(resolve, recs))
+
+def set_recommendations(recs, recommendation_type):
+    st.session_state.show_recommendations = True
+    st.session_state.recommendations = recs
+    st.session_state.recommendation_type = recommendation_type
+
+# Recommendation strategies as pipelines (see pipeline.py). TMDB-backed
+# generators for the popular and mood fallbacks live here because they
+# remember card details in the session (tmdb_recommendations).
+def popular_candidates(ctx):
+    return tmdb_recommendations(tmdb.fetch_popular_movies(), "popular")
+
+def mood_candidates(ctx):
+    if not ctx.mood_answers:
+        return []
+    return tmdb_recommendations(recommend_mood_based(ctx.mood_answers, tmdb.fetch_genres()), "mood")
+
+def cold_start_recommendations(seed_ids, n):
+    with precompute_store() as conn:
+        return precompute.cold_start_recommendations(conn, seed_ids, n)
+
+def popular_pipeline(n):
+    return pipeline.Pipeline("popular", [pipeline.Generator("popularity", popular_candidates)],
+                             reranker=pipeline.first_n(n))
+
+def mood_pipeline(n):
+    return pipeline.Pipeline("mood", [pipeline.Generator("mood", mood_candidates, lambda ctx: str(ctx.mood_answers))],
+                             reranker=pipeline.first_n(n), fallback=popular_pipeline(n))
+
+def cold_start_pipeline(n):
+    return pipeline.Pipeline("cold_start", [pipeline.cold_start_generator(n)],
+                             filters=[pipeline.exclude_rated, pipeline.exclude_watchlist],
+                             reranker=pipeline.first_n(n), fallback=popular_pipeline(n))
+
+PIPELINES = {
+    "content": pipeline.Pipeline(
+        "content", [pipeline.content_generator(5)], reranker=pipeline.first_n(5)),
+    "collaborative": pipeline.Pipeline(
+        "collaborative", [pipeline.collaborative_generator()],
+        filters=[pipeline.exclude_rated], reranker=pipeline.top_n(3), fallback=cold_start_pipeline(3)),
+    "hybrid": pipeline.Pipeline(
+        "hybrid", [pipeline.content_generator(50), pipeline.collaborative_generator()],
+        filters=[pipeline.exclude_seed, pipeline.exclude_rated, pipeline.exclude_watchlist],
+        scorer=pipeline.blend_scorer(0.5), reranker=pipeline.top_n(3), fallback=mood_pipeline(3)),
+    "personalized": pipeline.Pipeline(
+        "personalized", [pipeline.personalized_generator()],
+        filters=[pipeline.exclude_rated, pipeline.exclude_watchlist],
+        reranker=pipeline.first_n(25), fallback=cold_start_pipeline(5)),
+}
 
-    try:
-        # Get movies already rated by the user
-        rated_movie_ids = set()
-        if os.path.exists("user_reviews.csv"):
-            reviews_df = pd.read_csv("user_reviews.csv", header=0)
-            reviews_df['user'] = reviews_df['user'].astype(str)
-            uid = str(user_id)
-            rated_movie_ids = set(reviews_df[reviews_df['user'] == uid]['movie_id'].astype(int).tolist())
-
-        # Predict ratings for movies not yet rated
-        predictions = [(movie_id, svd_model.predict(user_id, movie_id).est)
-                       for movie_id in movies['id'] if movie_id not in rated_movie_ids]
-        predictions = sorted(predictions, key=lambda x: x[1], reverse=True)
-        recommended_names = []
-        recommended_posters = []
-        for movie_id, _ in predictions[:3]:
-            movie_title = movies[movies['id'] == movie_id]['title'].iloc[0]
-            recommended_names.append(movie_title)
-            recommended_posters.append(fetch_poster(movie_id))
-        return recommended_names, recommended_posters
-    except Exception as e:
-        st.error(f"Error generating collaborative recommendations: {e}")
-        return [], []
-
-# Hybrid recommendation (combining content-based and SVD-based collaborative filtering)
-def recommend_hybrid(movie_title, user_id, num_recommendations=3, content_weight=0.5):
-    if movies.empty:
-        st.error("Hybrid recommendations unavailable due to missing movie data.")
-        return [], []
-    
-    try:
-        # Get content-based recommendations
-        if similarity is not None:
-            content_names, content_posters = recommend_content_based(movie_title)
-        else:
-            content_names, content_posters = recommend_content_based_tmdb(movie_title, num_recommendations * 2)
-        content_scores = {name: score for name, score in zip(content_names, np.linspace(1.0, 0.5, len(content_names)))}
-        
-        # Get collaborative recommendations (SVD-based)
-        collab_names, collab_posters = recommend_collaborative(user_id)
-        collab_scores = {name: score for name, score in zip(collab_names, np.linspace(1.0, 0.5, len(collab_names)))}
-        
-        # Combine scores
-        combined_scores = {}
-        all_names = set(content_names) | set(collab_names)
-        
-        for name in all_names:
-            content_score = content_scores.get(name, 0.0) * content_weight
-            collab_score = collab_scores.get(name, 0.0) * (1.0 - content_weight)
-            combined_scores[name] = content_score + collab_score
-        
-        # Sort by combined score and exclude the input movie
-        filtered_scores = [(name, score) for name, score in combined_scores.items() if name != movie_title]
-        top_movies = sorted(filtered_scores, key=lambda x: x[1], reverse=True)[:num_recommendations]
-        recommended_names = []
-        recommended_posters = []
-        for name, _ in top_movies:
-            if name in content_names:
-                idx = content_names.index(name)
-                recommended_names.append(name)
-                recommended_posters.append(content_posters[idx])
-            elif name in collab_names:
-                idx = collab_names.index(name)
-                recommended_names.append(name)
-                recommended_posters.append(collab_posters[idx])
-            else:
-                movie_id = movies[movies['title'] == name]['id'].iloc[0] if name in movies['title'].values else None
-                if movie_id:
-                    recommended_names.append(name)
-                    recommended_posters.append(fetch_poster(movie_id))
-        
-        if not recommended_names:
-            st.warning("No hybrid recommendations found. Falling back to mood-based or popular movies.")
-            if st.session_state.mood_answers:
-                movies_list = recommend_mood_based(st.session_state.mood_answers, fetch_genres())
-                return [m['title'] for m in movies_list[:num_recommendations]], [m['poster'] for m in movies_list[:num_recommendations]]
-            popular_movies = fetch_popular_movies()
-            return [m['title'] for m in popular_movies[:num_recommendations]], [m['poster'] for m in popular_movies[:num_recommendations]]
-        
-        return recommended_names, recommended_posters
-    
-    except IndexError:
-        st.error(f"Movie '{movie_title}' not found in the database.")
-        popular_movies = fetch_popular_movies()
-        return [m['title'] for m in popular_movies[:num_recommendations]], [m['poster'] for m in popular_movies[:num_recommendations]]
-    except Exception as e:
-        st.error(f"Error generating hybrid recommendations: {e}")
-        popular_movies = fetch_popular_movies()
-        return [m['title'] for m in popular_movies[:num_recommendations]], [m['poster'] for m in popular_movies[:num_recommendations]]
+def run_pipeline(strategy, user_id=None, movie_title=None):
+    ctx = pipeline.Context(
+        movies, get_similarity, get_svd_model, get_review_index().frame,
+        user_id=user_id, movie_title=movie_title,
+        watchlist_ids=st.session_state.watchlist.keys(),
+        mood_answers=st.session_state.mood_answers,
+        mood_movie_ids=[m["id"] for m in st.session_state.mood_recommendations],
+        precomputed=precomputed_recommendations,
+        clusters=cold_start_recommendations,
+    )
+    recs, timings = PIPELINES[strategy].run(ctx, st.session_state.candidate_cache)
+    st.session_state.pipeline_timings = timings
+    for timing in timings:
+        if timing.error:
+            st.error(f"{timing.pipeline} {timing.stage} '{timing.name}' failed: {timing.error}")
+    return recs
 
 # Mood-based recommendation
 def recommend_mood_based(answers, genre_map):
@@ -1024,116 +852,95 @@ def recommend_mood_based(answers, genre_map):
     # Unique cache key for diversity
     cache_key = str(uuid.uuid4()) + str(answers)
     
-    return fetch_mood_based_movies(cache_key, genre_ids, max_runtime, min_year, max_year, keywords, adult)
+    return tmdb.fetch_mood_based_movies(cache_key, genre_ids, max_runtime, min_year, max_year, keywords, adult)
 
 # Save user activity
 def save_user_activity(user_id, action, movie_title, movie_id, rating=None):
     try:
-        file_exists = os.path.exists("user_activity.csv")
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        activity_data = pd.DataFrame([[user_id, action, movie_title, movie_id, rating, timestamp]], 
-                                    columns=["user_id", "action", "title", "movie_id", "rating", "timestamp"])
-        activity_data.to_csv("user_activity.csv", mode='a', index=False, header=not file_exists, quoting=csv.QUOTE_NONNUMERIC)
+        get_event_writer().submit("activity", storage.activity_row(user_id, action, movie_title, movie_id, rating))
     except Exception as e:
         st.warning(f"Error saving user activity: {e}")
 
-# Save user to CSV
-def save_user_to_csv(username, password, user_id):
+# Save a rating and review (replaces the user's earlier rating of the movie)
+def submit_review(user_id, movie_id, movie_title, rating, review):
+    save_user_activity(user_id, "rated", movie_title, movie_id, rating)
     try:
-        file_exists = os.path.exists("users.csv")
-        hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-        user_data = pd.DataFrame([{
-            "username": str(username),
-            "password": hashed_password,
-            "user_id": int(user_id)
-        }])
-        user_data.to_csv("users.csv", mode='a', index=False, header=not file_exists, quoting=csv.QUOTE_NONNUMERIC)
+        previous = get_review_index().user_rating(user_id, movie_id)
+        get_review_index().add(user_id, movie_id, movie_title, rating, review)
     except Exception as e:
-        st.error(f"Error saving user to CSV: {e}")
+        st.error(f"Error saving review: {e}")
+        return
+    try:
+        for row in notifications.affinity_rows(user_id, movie_id, rating, get_movie_genres(), previous):
+            get_event_writer().submit("genre_affinity", row)
+    except Exception as e:
+        st.warning(f"Error updating genre profile: {e}")
+    mark_recommendations_dirty(user_id)
+    get_chart_cache().schedule()
+
+# Watchlist: st.session_state.watchlist is {movie_id: title} for the signed-in user
+def add_to_watchlist(movie_id, movie_title):
+    """Add a movie to the current user's watchlist; False if it was already there."""
+    movie_id = int(movie_id)
+    if movie_id in st.session_state.watchlist:
+        return False
+    st.session_state.watchlist[movie_id] = movie_title
+    user_id = st.session_state.current_user
+    try:
+        get_event_writer().submit("watchlist", storage.watchlist_row(user_id, movie_id, movie_title))
+    except Exception as e:
+        st.error(f"Error saving watchlist for user {user_id}: {e}")
+    save_user_activity(user_id, "added_to_watchlist", movie_title, movie_id)
+    return True
 
-# Load users from CSV
-def load_users_from_csv():
-    if os.path.exists("users.csv"):
-        try:
-            users_df = pd.read_csv(
-                "users.csv",
-                dtype={"username": str, "password": str, "user_id": int},
-                quoting=csv.QUOTE_NONNUMERIC
-            )
-            users = {}
-            for _, row in users_df.iterrows():
-                users[row['username']] = {"password": row['password'], "user_id": row['user_id']}
-            return users
-        except Exception as e:
-            st.warning(f"Error loading users: {e}. Starting with empty user list.")
-            return {}
-    return {}
-
-# Save watchlist to CSV
-def save_watchlist_to_csv(user_id, movie_title, movie_id):
-    filename = f"watchlist_{user_id}.csv"
-    file_exists = os.path.exists(filename)
+def remove_from_watchlist(movie_id):
+    movie_id = int(movie_id)
+    st.session_state.watchlist.pop(movie_id, None)
+    user_id = st.session_state.current_user
     try:
-        movie_id = int(movie_id)
-        watchlist_data = pd.DataFrame([[movie_title, movie_id]], columns=["title", "movie_id"])
-        watchlist_data.to_csv(filename, mode='a', index=False, header=not file_exists, quoting=csv.QUOTE_NONNUMERIC)
+        get_event_writer().submit("watchlist_remove", {"user_id": int(user_id), "movie_id": movie_id})
     except Exception as e:
         st.error(f"Error saving watchlist for user {user_id}: {e}")
 
-# Load watchlist from CSV
-def load_watchlist_from_csv(user_id):
-    filename = f"watchlist_{user_id}.csv"
-    if os.path.exists(filename):
-        try:
-            watchlist_df = pd.read_csv(
-                filename,
-                names=["title", "movie_id"],
-                skiprows=1 if os.path.getsize(filename) > 0 else 0,
-                on_bad_lines='skip',
-                quoting=csv.QUOTE_NONNUMERIC
-            )
-            watchlist_df = watchlist_df.dropna(subset=["title", "movie_id"])
-            watchlist_df["movie_id"] = pd.to_numeric(watchlist_df["movie_id"], errors='coerce', downcast='integer')
-            watchlist_df = watchlist_df.dropna(subset=["movie_id"])
-            return watchlist_df[["title", "movie_id"]].to_dict('records')
-        except Exception as e:
-            st.warning(f"Error loading watchlist for user {user_id}: {e}")
-            try:
-                corrupted_filename = f"watchlist_{user_id}_corrupted_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                os.rename(filename, corrupted_filename)
-                st.info(f"Corrupted watchlist file renamed to {corrupted_filename}. Starting with an empty watchlist.")
-            except Exception as rename_e:
-                st.error(f"Failed to rename corrupted watchlist file: {rename_e}")
-            return []
-    return []
-
-# Initialize session state
-if "page" not in st.session_state:
-    st.session_state.page = "home"
-if "selected_genre" not in st.session_state:
-    st.session_state.selected_genre = None
-if "show_recommendations" not in st.session_state:
-    st.session_state.show_recommendations = False
-if "recommendation_type" not in st.session_state:
-    st.session_state.recommendation_type = None
-if "genre_movies" not in st.session_state:
-    st.session_state.genre_movies = []
-if "users" not in st.session_state:
-    st.session_state.users = load_users_from_csv()
-if "current_user" not in st.session_state:
-    st.session_state.current_user = None
-if "current_username" not in st.session_state:
-    st.session_state.current_username = None
-if "watchlist" not in st.session_state:
-    st.session_state.watchlist = []
-if "mood_answers" not in st.session_state:
-    st.session_state.mood_answers = {}
-if "mood_recommendations" not in st.session_state:
-    st.session_state.mood_recommendations = []
+def load_watchlist(user_id):
+    try:
+        return storage.load_watchlist(user_id)
+    except Exception as e:
+        st.warning(f"Error loading watchlist for user {user_id}: {e}")
+        return {}
+
+rerun.lap("definitions")
+
+# Initialize session state (factories, so sessions never share a list or dict)
+SESSION_DEFAULTS = {
+    "page": lambda: "home",
+    "selected_genre": lambda: None,
+    "show_recommendations": lambda: False,
+    "recommendation_type": lambda: None,
+    "recommendations": list,
+    "candidate_cache": pipeline.CandidateCache,
+    "genre_movies": list,
+    "current_user": lambda: None,
+    "current_username": lambda: None,
+    "watchlist": dict,
+    "watchlist_user": lambda: None,
+    "mood_answers": dict,
+    "mood_recommendations": list,
+}
+for key, default in SESSION_DEFAULTS.items():
+    if key not in st.session_state:
+        st.session_state[key] = default()
+# Cached candidates came from the models of this version
+if st.session_state.get("model_version") != model_set.version:
+    st.session_state.candidate_cache.clear()
+    st.session_state.model_version = model_set.version
+
+rerun.lap("session state")
 
 # Load watchlist for the current user
-if st.session_state.current_user and not st.session_state.watchlist:
-    st.session_state.watchlist = load_watchlist_from_csv(st.session_state.current_user)
+if st.session_state.current_user and st.session_state.watchlist_user != st.session_state.current_user:
+    st.session_state.watchlist = load_watchlist(st.session_state.current_user)
+    st.session_state.watchlist_user = st.session_state.current_user
 
 # Navigation Bar
 st.markdown("<div class='nav-bar'>", unsafe_allow_html=True)
@@ -1163,7 +970,8 @@ with col_signin:
         if st.button(f"Sign Out ({st.session_state.current_username})", key="nav_signout"):
             st.session_state.current_user = None
             st.session_state.current_username = None
-            st.session_state.watchlist = []
+            st.session_state.watchlist = {}
+            st.session_state.watchlist_user = None
             st.session_state.mood_answers = {}
             st.session_state.mood_recommendations = []
             st.session_state.page = "home"
@@ -1172,6 +980,7 @@ with col_signin:
         if st.button("Sign In", key="nav_signin"):
             st.session_state.page = "signin"
 st.markdown("</div>", unsafe_allow_html=True)
+rerun.lap("navigation")
 
 # Page Content
 if st.session_state.page == "home":
@@ -1179,12 +988,12 @@ if st.session_state.page == "home":
     st.markdown("<p style='text-align: center; color: #b0b0b0;'>Let our AI find your perfect next watch based on your unique taste</p>", unsafe_allow_html=True)
     
     st.markdown("<h2 style='text-align: center;'>Popular Movies</h2>", unsafe_allow_html=True)
-    popular_movies = fetch_popular_movies()
+    popular_movies = tmdb.fetch_popular_movies()
     if popular_movies:
         cols = st.columns(3)
         for idx, movie in enumerate(popular_movies[:3]):
             with cols[idx % 3]:
-                trailer_url = fetch_trailer(movie['id'])
+                trailer_url = tmdb.fetch_trailer(movie['id'])
                 st.markdown(f"""
                     <div class="movie-card">
                         <img src="{movie['poster']}" style="width: 100%; border-radius: 10px;">
@@ -1206,10 +1015,7 @@ if st.session_state.page == "home":
                 with col2:
                     if st.button("Add to Watchlist", key=f"watchlist_pop_{movie['id']}"):
                         if st.session_state.current_user:
-                            if not any(item["title"] == movie['title'] for item in st.session_state.watchlist):
-                                st.session_state.watchlist.append({"title": movie['title'], "movie_id": movie['id']})
-                                save_watchlist_to_csv(st.session_state.current_user, movie['title'], movie['id'])
-                                save_user_activity(st.session_state.current_user, "added_to_watchlist", movie['title'], movie['id'])
+                            if add_to_watchlist(movie['id'], movie['title']):
                                 st.success(f"Added {movie['title']} to watchlist!")
                         else:
                             st.warning("Please sign in to add movies to your watchlist.")
@@ -1222,14 +1028,7 @@ if st.session_state.page == "home":
                     review = st.text_area(f"Write a review for {movie['title']}", key=f"review_pop_{movie['id']}")
                     if st.button("Submit Rating & Review", key=f"submit_rating_pop_{movie['id']}"):
                         if st.session_state.current_user:
-                            save_user_activity(st.session_state.current_user, "rated", movie['title'], movie['id'], rating)
-                            import csv, os
-                            file_exists = os.path.exists("user_reviews.csv")
-                            with open("user_reviews.csv", "a", newline='', encoding='utf-8') as f:
-                                writer = csv.writer(f)
-                                if not file_exists:
-                                    writer.writerow(["user","movie_id","title","rating","review"])
-                                writer.writerow([st.session_state.current_user, movie['id'], movie['title'], rating, review])
+                            submit_review(st.session_state.current_user, movie['id'], movie['title'], rating, review)
                             st.success(f"Rated {movie['title']} with {rating} stars and review submitted!")
                             st.session_state[f"show_rating_{movie['id']}"] = False
                         else:
@@ -1246,83 +1045,51 @@ elif st.session_state.page == "discover":
         with col1:
             if st.button("Get Content-Based Recommendations", key="content_based"):
                 if selected_movie in movie_list:
-                    recommended_names, recommended_posters = recommend_content_based(selected_movie)
-                    if recommended_names:
-                        st.session_state.show_recommendations = True
-                        st.session_state.recommended_names = recommended_names
-                        st.session_state.recommended_posters = recommended_posters
-                        st.session_state.recommendation_type = "content"
+                    recs = run_pipeline("content", user_id, selected_movie)
+                    if recs:
+                        set_recommendations(recs, "content")
                     else:
                         st.error("Could not generate content-based recommendations.")
                 else:
                     st.error(f"Movie '{selected_movie}' not found in the database.")
         with col2:
             if st.button("Get Collaborative Recommendations", key="collaborative"):
-                recommended_names, recommended_posters = recommend_collaborative(user_id)
-                if recommended_names:
-                    st.session_state.show_recommendations = True
-                    st.session_state.recommended_names = recommended_names
-                    st.session_state.recommended_posters = recommended_posters
-                    st.session_state.recommendation_type = "collaborative"
+                recs = run_pipeline("collaborative", user_id)
+                if recs:
+                    set_recommendations(recs, "collaborative")
                 else:
                     st.error("Could not generate collaborative recommendations.")
         with col3:
             if st.button("Get Hybrid Recommendations", key="hybrid"):
-                recommended_names, recommended_posters = recommend_hybrid(selected_movie, user_id)
-                if recommended_names:
-                    st.session_state.show_recommendations = True
-                    st.session_state.recommended_names = recommended_names
-                    st.session_state.recommended_posters = recommended_posters
-                    st.session_state.recommendation_type = "hybrid"
+                recs = run_pipeline("hybrid", user_id, selected_movie)
+                if recs:
+                    if recs[0].source != "hybrid":
+                        st.warning("No hybrid recommendations found. Falling back to mood-based or popular movies.")
+                    set_recommendations(recs, "hybrid")
                 else:
                     st.error("Could not generate hybrid recommendations.")
         with col4:
             if st.button("Get Personalized Recommendations", key="personalized"):
-                try:
-                    import pandas as pd
-                    import os
-                    top_rated = []
-                    csv_path = "user_reviews.csv"
-                    if os.path.exists(csv_path):
-                        reviews_df = pd.read_csv(csv_path, header=0)
-                        # Normalize user id comparison (string/int)
-                        reviews_df['user'] = reviews_df['user'].astype(str)
-                        uid = str(st.session_state.current_user) if st.session_state.get('current_user') is not None else None
-                        if uid:
-                            user_reviews = reviews_df[reviews_df['user'] == uid]
-                            if not user_reviews.empty:
-                                top_rated = user_reviews.sort_values('rating', ascending=False).head(5)['title'].tolist()
-
-                    if not top_rated:
+                recs = run_pipeline("personalized", st.session_state.get('current_user'))
+                if recs and recs[0].source == "popular":
+                    # An empty personalized list also means no similarity model, not only no ratings
+                    if not st.session_state.get('current_user'):
+                        st.warning("Sign in and rate some movies to get personalized recommendations.")
+                    elif storage.user_review_stats(st.session_state.current_user)[0] == 0:
                         st.warning("No ratings found for your account. Please rate some movies first.")
-                        st.session_state.show_recommendations = True
-                        popular = fetch_popular_movies()[:5]
-                        st.session_state.recommended_names = [m['title'] for m in popular]
-                        st.session_state.recommended_posters = [m['poster'] for m in popular]
-                        st.session_state.recommendation_type = "popular"
+                    elif get_similarity() is None:
+                        st.warning("Personalized recommendations are unavailable while the similarity model "
+                                   "isn't loaded. Showing popular movies instead.")
                     else:
-                        personalized_names = []
-                        personalized_posters = []
-                        for title in top_rated:
-                            names, posters = recommend_content_based(title)
-                            for n, p in zip(names, posters):
-                                if n not in personalized_names:
-                                    personalized_names.append(n)
-                                    personalized_posters.append(p)
-                        if personalized_names:
-                            st.session_state.show_recommendations = True
-                            st.session_state.recommended_names = personalized_names
-                            st.session_state.recommended_posters = personalized_posters
-                            st.session_state.recommendation_type = "personalized"
-                        else:
-                            st.warning("No personalized recommendations found. Showing popular movies instead.")
-                            st.session_state.show_recommendations = True
-                            popular = fetch_popular_movies()[:5]
-                            st.session_state.recommended_names = [m['title'] for m in popular]
-                            st.session_state.recommended_posters = [m['poster'] for m in popular]
-                            st.session_state.recommendation_type = "popular"
-                except Exception as e:
-                    st.error(f"Error loading ratings from CSV: {e}")
+                        st.warning("No new movies similar to the ones you rated were found. Showing popular movies instead.")
+                    set_recommendations(recs, "popular")
+                elif recs and recs[0].source == "cold_start":
+                    st.info("Picks from the taste cluster closest to your first ratings and mood answers.")
+                    set_recommendations(recs, "taste cluster")
+                elif recs:
+                    set_recommendations(recs, "personalized")
+                else:
+                    st.error("Could not generate personalized recommendations.")
     else:
         st.warning("No movies loaded from .pkl file. Please ensure the file is correct.")
 
@@ -1332,18 +1099,17 @@ elif st.session_state.page == "discover":
 
     search_query = st.text_input("", placeholder="Search movies...")
 
-    genre_map = fetch_genres()
-    genre_names = ["Action", "Comedy", "Drama", "Sci-Fi", "Horror", "Romance", "Thriller", "Adventure"]
-    genre_ids = {name: gid for gid, name in genre_map.items() if name in genre_names}
+    genre_map = tmdb.fetch_genres()
+    genre_ids = {name: gid for gid, name in genre_map.items() if name in DISCOVER_GENRES}
 
-    cols = st.columns(len(genre_names))
-    for idx, genre in enumerate(genre_names):
+    cols = st.columns(len(DISCOVER_GENRES))
+    for idx, genre in enumerate(DISCOVER_GENRES):
         with cols[idx]:
             if st.button(genre, key=f"genre_{genre}"):
                 genre_id = genre_ids.get(genre)
                 if genre_id:
                     st.session_state.selected_genre = genre
-                    st.session_state.genre_movies = fetch_movies_by_genre(genre_id)
+                    st.session_state.genre_movies = tmdb.fetch_movies_by_genre(genre_id)
                     st.session_state.show_recommendations = False
 
     if st.session_state.selected_genre and st.session_state.genre_movies:
@@ -1351,7 +1117,7 @@ elif st.session_state.page == "discover":
         cols = st.columns(3)
         for idx, movie in enumerate(st.session_state.genre_movies[:3]):
             with cols[idx % 3]:
-                trailer_url = fetch_trailer(movie['id'])
+                trailer_url = tmdb.fetch_trailer(movie['id'])
                 st.markdown(f"""
                     <div class='movie-card' style='padding-bottom: 0;'>
                         <img src='{movie['poster']}' style='width: 100%; border-radius: 10px;'>
@@ -1373,29 +1139,18 @@ elif st.session_state.page == "discover":
                     review = st.text_area(f"Write a review for {movie['title']}", key=f"review_genre_{movie['id']}")
                     if st.button("Submit Rating & Review", key=f"submit_rating_genre_{movie['id']}"):
                         if st.session_state.current_user:
-                            save_user_activity(st.session_state.current_user, "rated", movie['title'], movie['id'], rating)
-                            import csv
-                            import os
-                            file_exists = os.path.exists("user_reviews.csv")
-                            with open("user_reviews.csv", "a", newline='', encoding='utf-8') as f:
-                                writer = csv.writer(f)
-                                if not file_exists:
-                                    writer.writerow(["user","movie_id","title","rating","review"])
-                                writer.writerow([st.session_state.current_user, movie['id'], movie['title'], rating, review])
+                            submit_review(st.session_state.current_user, movie['id'], movie['title'], rating, review)
                             st.success(f"Rated {movie['title']} with {rating} stars and review submitted!")
                             st.session_state[f"show_rating_{movie['id']}"] = False
                         else:
                             st.warning("Please sign in to rate movies.")
                     # Display recent reviews and average rating
-                    import pandas as pd
                     try:
-                        reviews_df = pd.read_csv("user_reviews.csv", header=0)
-                        movie_reviews = reviews_df[reviews_df["movie_id"] == movie['id']]
-                        if not movie_reviews.empty:
-                            avg_rating = movie_reviews["rating"].astype(float).mean()
+                        review_count, avg_rating = storage.movie_rating_stats(movie['id'])
+                        if review_count:
                             st.markdown(f"**Average Rating:** {avg_rating:.1f} ⭐")
                             st.markdown("**Recent Reviews:**")
-                            for _, row in movie_reviews.tail(3).iterrows():
+                            for _, row in get_review_index().movie_reviews(movie['id'], limit=3).iterrows():
                                 st.markdown(f"- *{row['user']}*: {row['review']} ({row['rating']}⭐)")
                     except Exception:
                         pass
@@ -1410,10 +1165,10 @@ elif st.session_state.page == "discover":
             cols = st.columns(3)
             for idx, movie in enumerate(filtered_movies.head(3).itertuples()):
                 with cols[idx % 3]:
-                    trailer_url = fetch_trailer(movie.id)
-                    poster = fetch_poster(movie.id)
-                    rating = movie.vote_average if hasattr(movie, 'vote_average') and pd.notna(movie.vote_average) else fetch_movie_details(movie.id)['rating']
-                    description = movie.overview if hasattr(movie, 'overview') and pd.notna(movie.overview) else fetch_movie_details(movie.id)['description']
+                    trailer_url = tmdb.fetch_trailer(movie.id)
+                    poster = tmdb.fetch_poster(movie.id)
+                    rating = movie.vote_average if hasattr(movie, 'vote_average') and pd.notna(movie.vote_average) else tmdb.fetch_movie_details(movie.id)['rating']
+                    description = movie.overview if hasattr(movie, 'overview') and pd.notna(movie.overview) else tmdb.fetch_movie_details(movie.id)['description']
                     st.markdown(f"""
                         <div class='movie-card' style='padding-bottom: 0;'>
                             <img src='{poster}' style='width: 100%; border-radius: 10px;'>
@@ -1442,14 +1197,7 @@ elif st.session_state.page == "discover":
                         review = st.text_area(f"Write a review for {movie.title}", key=f"review_search_{movie.id}")
                         if st.button("Submit Rating & Review", key=f"submit_rating_search_{movie.id}"):
                             if st.session_state.current_user:
-                                save_user_activity(st.session_state.current_user, "rated", movie.title, movie.id, rating)
-                                import csv, os
-                                file_exists = os.path.exists("user_reviews.csv")
-                                with open("user_reviews.csv", "a", newline='', encoding='utf-8') as f:
-                                    writer = csv.writer(f)
-                                    if not file_exists:
-                                        writer.writerow(["user","movie_id","title","rating","review"])
-                                    writer.writerow([st.session_state.current_user, movie.id, movie.title, rating, review])
+                                submit_review(st.session_state.current_user, movie.id, movie.title, rating, review)
                                 st.success(f"Rated {movie.title} with {rating} stars and review submitted!")
                                 st.session_state[f"show_rating_{movie.id}"] = False
                             else:
@@ -1458,26 +1206,26 @@ elif st.session_state.page == "discover":
             # Generate recommendations based on first matched search result
             try:
                 first_title = filtered_movies.head(1)['title'].iloc[0]
-                names, posters = recommend_content_based(first_title)
-                if names:
-                    st.session_state.show_recommendations = True
-                    st.session_state.recommended_names = names
-                    st.session_state.recommended_posters = posters
-                    st.session_state.recommendation_type = "search"
+                recs = run_pipeline("content", st.session_state.current_user, first_title)
+                if recs:
+                    set_recommendations(recs, "search")
             except Exception:
                 pass
     if st.session_state.show_recommendations:
-        recommended_names = st.session_state.recommended_names
-        recommended_posters = st.session_state.recommended_posters
         recommendation_type = st.session_state.recommendation_type
         st.subheader(f"{recommendation_type.capitalize()}-Based Recommendations")
+        if st.session_state.get("pipeline_timings"):
+            with st.expander("Pipeline timings"):
+                st.dataframe(pd.DataFrame(st.session_state.pipeline_timings), hide_index=True)
         cols = st.columns(3)
-        for idx, (name, poster) in enumerate(zip(recommended_names, recommended_posters)):
+        for idx, card in enumerate(resolve_cards(st.session_state.recommendations)):
             with cols[idx % 3]:
-                movie_id = movies[movies['title'] == name]['id'].iloc[0] if not movies.empty and name in movies['title'].values else None
-                trailer_url = fetch_trailer(movie_id) if movie_id else None
-                rating = movies[movies['title'] == name]['vote_average'].iloc[0] if not movies.empty and name in movies['title'].values and 'vote_average' in movies and pd.notna(movies[movies['title'] == name]['vote_average'].iloc[0]) else fetch_movie_details(movie_id)['rating'] if movie_id else 0.0
-                description = movies[movies['title'] == name]['overview'].iloc[0] if not movies.empty and name in movies['title'].values and 'overview' in movies and pd.notna(movies[movies['title'] == name]['overview'].iloc[0]) else fetch_movie_details(movie_id)['description'] if movie_id else "No description available"
+                movie_id = card['movie_id']
+                name = card['title']
+                poster = card['poster']
+                trailer_url = card['trailer']
+                rating = card['rating']
+                description = card['description']
                 st.markdown(f"""
                     <div class="movie-card">
                         <img src="{poster}" style="width: 100%; border-radius: 10px;">
@@ -1502,10 +1250,7 @@ elif st.session_state.page == "discover":
                 with col2:
                     if st.button("Add to Watchlist", key=f"watchlist_rec_{idx}_{movie_id}"):
                         if st.session_state.current_user:
-                            if movie_id and not any(item["title"] == name for item in st.session_state.watchlist):
-                                st.session_state.watchlist.append({"title": name, "movie_id": movie_id})
-                                save_watchlist_to_csv(st.session_state.current_user, name, movie_id)
-                                save_user_activity(st.session_state.current_user, "added_to_watchlist", name, movie_id)
+                            if movie_id and add_to_watchlist(movie_id, name):
                                 st.success(f"Added {name} to watchlist!")
                             elif not movie_id:
                                 st.error("Cannot add to watchlist: Movie ID not found.")
@@ -1521,14 +1266,7 @@ elif st.session_state.page == "discover":
                     if st.button("Submit Rating & Review", key=f"submit_rating_rec_{movie_id}"):
                         if st.session_state.current_user:
                             if movie_id:
-                                save_user_activity(st.session_state.current_user, "rated", name, movie_id, rating)
-                                import csv, os
-                                file_exists = os.path.exists("user_reviews.csv")
-                                with open("user_reviews.csv", "a", newline='', encoding='utf-8') as f:
-                                    writer = csv.writer(f)
-                                    if not file_exists:
-                                        writer.writerow(["user","movie_id","title","rating","review"])
-                                    writer.writerow([st.session_state.current_user, movie_id, name, rating, review])
+                                submit_review(st.session_state.current_user, movie_id, name, rating, review)
                                 st.success(f"Rated {name} with {rating} stars and review submitted!")
                                 st.session_state[f"show_rating_{movie_id}"] = False
                             else:
@@ -1540,10 +1278,10 @@ elif st.session_state.page == "discover":
             cols = st.columns(3)
             for idx, movie in enumerate(movies.head(3).itertuples()):
                 with cols[idx % 3]:
-                    trailer_url = fetch_trailer(movie.id)
-                    poster = fetch_poster(movie.id)
-                    rating = movie.vote_average if hasattr(movie, 'vote_average') and pd.notna(movie.vote_average) else fetch_movie_details(movie.id)['rating']
-                    description = movie.overview if hasattr(movie, 'overview') and pd.notna(movie.overview) else fetch_movie_details(movie.id)['description']
+                    trailer_url = tmdb.fetch_trailer(movie.id)
+                    poster = tmdb.fetch_poster(movie.id)
+                    rating = movie.vote_average if hasattr(movie, 'vote_average') and pd.notna(movie.vote_average) else tmdb.fetch_movie_details(movie.id)['rating']
+                    description = movie.overview if hasattr(movie, 'overview') and pd.notna(movie.overview) else tmdb.fetch_movie_details(movie.id)['description']
                     st.markdown(f"""
                         <div class="movie-card">
                             <img src="{poster}" style="width: 100%; border-radius: 10px;">
@@ -1565,10 +1303,7 @@ elif st.session_state.page == "discover":
                     with col2:
                         if st.button("Add to Watchlist", key=f"watchlist_{movie.id}"):
                             if st.session_state.current_user:
-                                if not any(item["title"] == movie.title for item in st.session_state.watchlist):
-                                    st.session_state.watchlist.append({"title": movie.title, "movie_id": movie.id})
-                                    save_watchlist_to_csv(st.session_state.current_user, movie.title, movie.id)
-                                    save_user_activity(st.session_state.current_user, "added_to_watchlist", movie.title, movie.id)
+                                if add_to_watchlist(movie.id, movie.title):
                                     st.success(f"Added {movie.title} to watchlist!")
                             else:
                                 st.warning("Please sign in to add movies to your watchlist.")
@@ -1581,14 +1316,7 @@ elif st.session_state.page == "discover":
                         review = st.text_area(f"Write a review for {movie.title}", key=f"review_default_{movie.id}")
                         if st.button("Submit Rating & Review", key=f"submit_rating_default_{movie.id}"):
                             if st.session_state.current_user:
-                                save_user_activity(st.session_state.current_user, "rated", movie.title, movie.id, rating)
-                                import csv, os
-                                file_exists = os.path.exists("user_reviews.csv")
-                                with open("user_reviews.csv", "a", newline='', encoding='utf-8') as f:
-                                    writer = csv.writer(f)
-                                    if not file_exists:
-                                        writer.writerow(["user","movie_id","title","rating","review"])
-                                    writer.writerow([st.session_state.current_user, movie.id, movie.title, rating, review])
+                                submit_review(st.session_state.current_user, movie.id, movie.title, rating, review)
                                 st.success(f"Rated {movie.title} with {rating} stars and review submitted!")
                                 st.session_state[f"show_rating_{movie.id}"] = False
                             else:
@@ -1604,7 +1332,7 @@ elif st.session_state.page == "mood":
         watching_with = st.selectbox("Who are you watching with?", ["", "Alone", "Friends", "Family", "Partner", "Kids"], index=0)
         occasion = st.selectbox("Is this for a special occasion?", ["", "Date Night", "Casual", "Party", "Family Night", "None"], index=0)
         time = st.selectbox("How much time do you have?", ["", "Less than 1 hour", "1-2 hours", "2+ hours"], index=0)
-        genre = st.selectbox("What genre are you in the mood for?", [""] + list(fetch_genres().values()), index=0)
+        genre = st.selectbox("What genre are you in the mood for?", [""] + list(tmdb.fetch_genres().values()), index=0)
         tone = st.selectbox("What kind of tone do you prefer?", ["", "Light-hearted", "Serious", "Emotional", "Fun", "Epic", "Thought-provoking"], index=0)
         romantic = st.selectbox("Are you looking for something romantic?", ["", "Yes", "No", "Maybe"], index=0)
         pace = st.selectbox("Do you want something fast-paced or slow-paced?", ["", "Fast-paced", "Slow-paced", "Balanced"], index=0)
@@ -1628,7 +1356,7 @@ elif st.session_state.page == "mood":
                 "mature": mature if mature else None
             }
             st.session_state.mood_answers = answers
-            st.session_state.mood_recommendations = recommend_mood_based(answers, fetch_genres())
+            st.session_state.mood_recommendations = recommend_mood_based(answers, tmdb.fetch_genres())
             if st.session_state.mood_recommendations:
                 st.success("Recommendations generated based on your mood!")
             else:
@@ -1639,7 +1367,7 @@ elif st.session_state.page == "mood":
         cols = st.columns(3)
         for idx, movie in enumerate(st.session_state.mood_recommendations):
             with cols[idx % 3]:
-                trailer_url = fetch_trailer(movie['id'])
+                trailer_url = tmdb.fetch_trailer(movie['id'])
                 st.markdown(f"""
                     <div class="movie-card">
                         <img src="{movie['poster']}" style="width: 100%; border-radius: 10px;">
@@ -1661,10 +1389,7 @@ elif st.session_state.page == "mood":
                 with col2:
                     if st.button("Add to Watchlist", key=f"watchlist_mood_{movie['id']}"):
                         if st.session_state.current_user:
-                            if not any(item["title"] == movie['title'] for item in st.session_state.watchlist):
-                                st.session_state.watchlist.append({"title": movie['title'], "movie_id": movie['id']})
-                                save_watchlist_to_csv(st.session_state.current_user, movie['title'], movie['id'])
-                                save_user_activity(st.session_state.current_user, "added_to_watchlist", movie['title'], movie['id'])
+                            if add_to_watchlist(movie['id'], movie['title']):
                                 st.success(f"Added {movie['title']} to watchlist!")
                         else:
                             st.warning("Please sign in to add movies to your watchlist.")
@@ -1677,14 +1402,7 @@ elif st.session_state.page == "mood":
                     review = st.text_area(f"Write a review for {movie['title']}", key=f"review_mood_{movie['id']}")
                     if st.button("Submit Rating & Review", key=f"submit_rating_mood_{movie['id']}"):
                         if st.session_state.current_user:
-                            save_user_activity(st.session_state.current_user, "rated", movie['title'], movie['id'], rating)
-                            import csv, os
-                            file_exists = os.path.exists("user_reviews.csv")
-                            with open("user_reviews.csv", "a", newline='', encoding='utf-8') as f:
-                                writer = csv.writer(f)
-                                if not file_exists:
-                                    writer.writerow(["user","movie_id","title","rating","review"])
-                                writer.writerow([st.session_state.current_user, movie['id'], movie['title'], rating, review])
+                            submit_review(st.session_state.current_user, movie['id'], movie['title'], rating, review)
                             st.success(f"Rated {movie['title']} with {rating} stars and review submitted!")
                             st.session_state[f"show_rating_{movie['id']}"] = False
                         else:
@@ -1694,54 +1412,30 @@ elif st.session_state.page == "mood":
 
 elif st.session_state.page == "watchlist":
     st.markdown("<h2>Watchlist</h2>", unsafe_allow_html=True)
-    # Notification feature: alert for new movies matching interests
-    import pandas as pd
-    import os
+    # Notification feature: new movies matching the user's genre profile (filled by the notification job)
     if st.session_state.current_user:
-        # Get user's favorite genres from top-rated movies
         try:
-            reviews_df = pd.read_csv("user_reviews.csv", header=0)
-            user_reviews = reviews_df[reviews_df["user"] == st.session_state.current_user]
-            top_rated_ids = user_reviews.sort_values("rating", ascending=False).head(5)["movie_id"].tolist()
-            favorite_genres = set()
-            for mid in top_rated_ids:
-                details = fetch_movie_details(mid)
-                genre = details.get("genre")
-                if genre:
-                    favorite_genres.add(genre)
-            # Check for new movies in those genres
-            notified_file = f"notified_{st.session_state.current_user}.txt"
-            notified_ids = set()
-            if os.path.exists(notified_file):
-                with open(notified_file) as f:
-                    notified_ids = set(f.read().splitlines())
-            new_movies = movies[movies["genre"].isin(favorite_genres) & ~movies["id"].astype(str).isin(notified_ids)]
-            if not new_movies.empty:
-                st.info(f"New movies added in your favorite genres: {', '.join(new_movies['title'].head(3))}")
-                # Mark as notified
-                with open(notified_file, "a") as f:
-                    for mid in new_movies["id"].astype(str).head(3):
-                        f.write(mid + "\n")
+            pending = storage.pending_notifications(st.session_state.current_user)
+            if pending:
+                st.info(f"New movies added in your favorite genres: {', '.join(title for _, title in pending if title)}")
+                storage.mark_notifications_seen(st.session_state.current_user, [mid for mid, _ in pending])
         except Exception:
             pass
         if st.session_state.watchlist:
             st.markdown("<div class='watchlist-container'>", unsafe_allow_html=True)
             # Social sharing feature
-            watchlist_titles = [item["title"] for item in st.session_state.watchlist]
-            share_text = "My Watchlist: " + ", ".join(watchlist_titles)
+            share_text = "My Watchlist: " + ", ".join(st.session_state.watchlist.values())
             st.text_area("Share your watchlist:", value=share_text, height=50)
             st.button("Copy to Clipboard", on_click=lambda: st.session_state.update({"copied": True}))
             if st.session_state.get("copied"):
                 st.success("Watchlist copied! You can share it with friends.")
             cols = st.columns(3)
-            for idx, item in enumerate(st.session_state.watchlist):
+            for idx, (movie_id, movie) in enumerate(list(st.session_state.watchlist.items())):
                 with cols[idx % 3]:
-                    movie = item["title"]
-                    movie_id = item["movie_id"]
-                    poster = fetch_poster(movie_id) if movie_id else "https://via.placeholder.com/200x300?text=No+Poster"
-                    trailer_url = fetch_trailer(movie_id) if movie_id else None
-                    rating = movies[movies['id'] == movie_id]['vote_average'].iloc[0] if not movies.empty and movie_id in movies['id'].values and 'vote_average' in movies and pd.notna(movies[movies['id'] == movie_id]['vote_average'].iloc[0]) else fetch_movie_details(movie_id)['rating']
-                    description = movies[movies['id'] == movie_id]['overview'].iloc[0] if not movies.empty and movie_id in movies['id'].values and 'overview' in movies and pd.notna(movies[movies['id'] == movie_id]['overview'].iloc[0]) else fetch_movie_details(movie_id)['description']
+                    poster = tmdb.fetch_poster(movie_id) if movie_id else "https://via.placeholder.com/200x300?text=No+Poster"
+                    trailer_url = tmdb.fetch_trailer(movie_id) if movie_id else None
+                    rating = movies[movies['id'] == movie_id]['vote_average'].iloc[0] if not movies.empty and movie_id in movies['id'].values and 'vote_average' in movies and pd.notna(movies[movies['id'] == movie_id]['vote_average'].iloc[0]) else tmdb.fetch_movie_details(movie_id)['rating']
+                    description = movies[movies['id'] == movie_id]['overview'].iloc[0] if not movies.empty and movie_id in movies['id'].values and 'overview' in movies and pd.notna(movies[movies['id'] == movie_id]['overview'].iloc[0]) else tmdb.fetch_movie_details(movie_id)['description']
                     # Movie Details Link
                     if st.button(f"Details: {movie}", key=f"details_wl_{movie_id}_{idx}"):
                         st.session_state.selected_movie_details = movie_id
@@ -1762,13 +1456,7 @@ elif st.session_state.page == "watchlist":
                             st.session_state[f"rating_movie_id_{movie_id}"] = movie_id
                     with col2:
                         if st.button("Remove", key=f"remove_wl_{movie_id}_{idx}"):
-                            st.session_state.watchlist = [item for item in st.session_state.watchlist if item["movie_id"] != movie_id]
-                            filename = f"watchlist_{st.session_state.current_user}.csv"
-                            if st.session_state.watchlist:
-                                pd.DataFrame(st.session_state.watchlist).to_csv(filename, index=False, quoting=csv.QUOTE_NONNUMERIC)
-                            else:
-                                if os.path.exists(filename):
-                                    os.remove(filename)
+                            remove_from_watchlist(movie_id)
                             st.success(f"Removed {movie} from watchlist!")
                     with col3:
                         if trailer_url:
@@ -1778,42 +1466,32 @@ elif st.session_state.page == "watchlist":
                         rating = st.slider(f"Rate {movie} (1-5)", 1, 5, key=f"rating_wl_{movie_id}_{idx}")
                         review = st.text_area(f"Write a review for {movie}", key=f"review_wl_{movie_id}_{idx}")
                         if st.button("Submit Rating & Review", key=f"submit_rating_wl_{movie_id}_{idx}"):
-                            save_user_activity(st.session_state.current_user, "rated", movie, movie_id, rating)
-                            import csv, os
-                            file_exists = os.path.exists("user_reviews.csv")
-                            with open("user_reviews.csv", "a", newline='', encoding='utf-8') as f:
-                                writer = csv.writer(f)
-                                if not file_exists:
-                                    writer.writerow(["user","movie_id","title","rating","review"])
-                                writer.writerow([st.session_state.current_user, movie_id, movie, rating, review])
+                            submit_review(st.session_state.current_user, movie_id, movie, rating, review)
                             st.success(f"Rated {movie} with {rating} stars and review submitted!")
                             st.session_state[f"show_rating_{movie_id}"] = False
             st.markdown("</div>", unsafe_allow_html=True)
             # Movie Details Page
             if st.session_state.get("selected_movie_details"):
                 movie_id = st.session_state.selected_movie_details
-                details = fetch_movie_details(movie_id)
+                details = tmdb.fetch_movie_details(movie_id)
                 st.markdown(f"## Movie Details")
-                st.image(fetch_poster(movie_id), width=200)
+                st.image(tmdb.fetch_poster(movie_id), width=200)
                 st.markdown(f"**Title:** {details.get('title', '')}")
                 st.markdown(f"**Release Date:** {details.get('release_date', 'N/A')}")
                 st.markdown(f"**Director:** {details.get('director', 'N/A')}")
                 st.markdown(f"**Cast:** {details.get('cast', 'N/A')}")
                 st.markdown(f"**Description:** {details.get('description', '')}")
                 st.markdown(f"**Rating:** {details.get('rating', 'N/A')}")
-                trailer_url = fetch_trailer(movie_id)
+                trailer_url = tmdb.fetch_trailer(movie_id)
                 if trailer_url:
                     st.markdown(f'<a href="{trailer_url}" target="_blank">Watch Trailer</a>', unsafe_allow_html=True)
                 # Show reviews
-                import pandas as pd
                 try:
-                    reviews_df = pd.read_csv("user_reviews.csv", header=0)
-                    movie_reviews = reviews_df[reviews_df["movie_id"] == movie_id]
-                    if not movie_reviews.empty:
-                        avg_rating = movie_reviews["rating"].astype(float).mean()
+                    review_count, avg_rating = storage.movie_rating_stats(movie_id)
+                    if review_count:
                         st.markdown(f"**Average Rating:** {avg_rating:.1f} ⭐")
                         st.markdown("**Recent Reviews:**")
-                        for _, row in movie_reviews.tail(5).iterrows():
+                        for _, row in get_review_index().movie_reviews(movie_id, limit=5).iterrows():
                             st.markdown(f"- *{row['user']}*: {row['review']} ({row['rating']}⭐)")
                 except Exception:
                     pass
@@ -1827,46 +1505,41 @@ elif st.session_state.page == "watchlist":
 elif st.session_state.page == "history":
     st.markdown("<h2>Your Activity History</h2>", unsafe_allow_html=True)
     if st.session_state.current_user:
-        if os.path.exists("user_activity.csv"):
-            try:
-                activity_df = pd.read_csv("user_activity.csv")
-                user_activity = activity_df[activity_df['user_id'] == st.session_state.current_user]
-                user_activity = user_activity.sort_values(by="timestamp", ascending=False)
-                if user_activity.empty:
-                    st.info("No activity history found.")
-                else:
-                    st.markdown("<div class='history-container'>", unsafe_allow_html=True)
-                    cols = st.columns(3)
-                    for idx, row in user_activity.iterrows():
-                        with cols[idx % 3]:
-                            action = row['action']
-                            title = row['title']
-                            movie_id = row['movie_id']
-                            rating = row['rating'] if pd.notna(row['rating']) else None
-                            timestamp = row['timestamp']
-                            poster = fetch_poster(movie_id) if movie_id else "https://via.placeholder.com/200x300?text=No+Poster"
-                            description = fetch_movie_details(movie_id)['description']
-                            if action == "watched":
-                                action_text = f"Watched on {timestamp}"
-                            elif action == "rated":
-                                action_text = f"Rated {rating}/5 on {timestamp}"
-                            elif action == "added_to_watchlist":
-                                action_text = f"Added to watchlist on {timestamp}"
-                            else:
-                                action_text = f"Unknown action on {timestamp}"
-                            st.markdown(f"""
-                                <div class="movie-card">
-                                    <img src="{poster}" style="width: 100%; border-radius: 10px;">
-                                    <h3>{title}</h3>
-                                    <p>{action_text}</p>
-                                    <p>{description[:100]}...</p>
-                                </div>
-                            """, unsafe_allow_html=True)
-                    st.markdown("</div>", unsafe_allow_html=True)
-            except Exception as e:
-                st.warning(f"Error reading activity history: {e}")
-        else:
-            st.info("No activity history yet.")
+        try:
+            user_activity = activity_log.user_events(st.session_state.current_user, limit=HISTORY_LIMIT)
+            if user_activity.empty:
+                st.info("No activity history found.")
+            else:
+                st.markdown("<div class='history-container'>", unsafe_allow_html=True)
+                cols = st.columns(3)
+                for idx, row in user_activity.iterrows():
+                    with cols[idx % 3]:
+                        action = row['action']
+                        title = row['title']
+                        movie_id = row['movie_id']
+                        rating = row['rating'] if pd.notna(row['rating']) else None
+                        timestamp = row['timestamp']
+                        poster = tmdb.fetch_poster(movie_id) if movie_id else "https://via.placeholder.com/200x300?text=No+Poster"
+                        description = tmdb.fetch_movie_details(movie_id)['description']
+                        if action == "watched":
+                            action_text = f"Watched on {timestamp}"
+                        elif action == "rated":
+                            action_text = f"Rated {rating}/5 on {timestamp}"
+                        elif action == "added_to_watchlist":
+                            action_text = f"Added to watchlist on {timestamp}"
+                        else:
+                            action_text = f"Unknown action on {timestamp}"
+                        st.markdown(f"""
+                            <div class="movie-card">
+                                <img src="{poster}" style="width: 100%; border-radius: 10px;">
+                                <h3>{title}</h3>
+                                <p>{action_text}</p>
+                                <p>{description[:100]}...</p>
+                            </div>
+                        """, unsafe_allow_html=True)
+                st.markdown("</div>", unsafe_allow_html=True)
+        except Exception as e:
+            st.warning(f"Error reading activity history: {e}")
     else:
         st.warning("Please sign in to view your activity history.")
 elif st.session_state.page == "signin":
@@ -1879,9 +1552,8 @@ elif st.session_state.page == "signin":
         signin_password = st.text_input("Password", type="password", key="signin_password")
         login_failed = False
         if st.button("Sign In", key="signin_btn"):
-            users = load_users_from_csv()
-            user = users.get(signin_email)
-            if user and bcrypt.checkpw(signin_password.encode(), user["password"].encode()):
+            user = sign_in(signin_email, signin_password)
+            if user:
                 st.session_state.current_user = user["user_id"]
                 st.session_state.current_username = signin_email
                 st.session_state.page = "home"
@@ -1898,18 +1570,15 @@ elif st.session_state.page == "signin":
         signup_email = st.text_input("Email", key="signup_email")
         signup_password = st.text_input("Password", type="password", key="signup_password")
         if st.button("Sign Up", key="signup_btn"):
-            users = load_users_from_csv()
-            if signup_email in users:
+            new_user_id = sign_up(signup_email, signup_password)
+            if new_user_id is None:
                 st.error("Email already registered. Please sign in.")
-            else:
-                new_user_id = max([u["user_id"] for u in users.values()], default=0) + 1
-                save_user_to_csv(signup_email, signup_password, new_user_id)
+            elif new_user_id:
                 st.success("Account created! Please sign in.")
                 st.session_state.show_signup = False
         if st.button("Back to Sign In", key="back_to_signin"):
             st.session_state.show_signup = False
+    rerun.finish("page: signin", get_rerun_profile())
     st.stop()
 
-
-
-    
\ No newline at end of file
+rerun.finish(f"page: {st.session_state.page}", get_rerun_profile())
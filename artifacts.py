@@ -0,0 +1,190 @@
+"""Model artifact downloads checked against a manifest.
+
+``artifacts.json`` lists every artifact the app loads with its mirror URLs
+(tried in order), size and SHA-256. ``ensure`` fetches the missing or
+mismatching ones in parallel. Each download streams into ``<name>.part``;
+an interrupted one is resumed with an HTTP ``Range`` request (servers that
+ignore ranges just send the whole file again). A finished download is
+checked against the manifest and then renamed over the final path, so a
+reader never sees a truncated artifact. Google Drive share links go through
+Drive's download-confirmation flow.
+
+    python artifacts.py            # download whatever is missing
+    python artifacts.py update     # write sizes and hashes of the local files into the manifest
+
+An entry without a SHA-256 cannot be checked, so its downloads could be
+anything the mirror serves, and the app unpickles them: ``fetch`` and
+``ensure`` refuse to download such entries. Pin them with ``update`` next
+to known-good copies.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+import requests
+
+MANIFEST = "artifacts.json"
+CHUNK_SIZE = 1 << 20
+ATTEMPTS = 3
+TIMEOUT = 60
+
+
+class Artifact(NamedTuple):
+    name: str
+    urls: tuple
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def load_manifest(path=MANIFEST):
+    with open(path) as f:
+        entries = json.load(f)["artifacts"]
+    return [Artifact(e["name"], tuple(e["urls"]), e.get("size"), e.get("sha256")) for e in entries]
+
+
+def save_manifest(artifacts, path=MANIFEST):
+    entries = [{"name": a.name, "urls": list(a.urls), "size": a.size, "sha256": a.sha256} for a in artifacts]
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"artifacts": entries}, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def sha256_of(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def verify(artifact, path):
+    """None if ``path`` matches the manifest entry, else the reason it doesn't."""
+    if not os.path.exists(path):
+        return "missing"
+    size = os.path.getsize(path)
+    if artifact.size is not None and size != artifact.size:
+        return f"size {size} != {artifact.size}"
+    if artifact.sha256 is not None and sha256_of(path) != artifact.sha256:
+        return "sha256 mismatch"
+    return None
+
+
+def _open(session, url, offset):
+    """Streaming response for ``url`` starting at byte ``offset`` (if the server honours it)."""
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    match = re.search(r"/d/([\w-]+)", url) if "drive.google.com" in url or "docs.google.com" in url else None
+    if match is None:
+        return session.get(url, headers=headers, stream=True, timeout=TIMEOUT)
+    base_url = "https://drive.google.com/uc?export=download"
+    params = {"id": match.group(1)}
+    response = session.get(base_url, params=params, headers=headers, stream=True, timeout=TIMEOUT)
+    token = next((v for k, v in response.cookies.items() if k.startswith("download_warning")), None)
+    if token:
+        response.close()
+        response = session.get(base_url, params={**params, "confirm": token}, headers=headers, stream=True,
+                               timeout=TIMEOUT)
+    return response
+
+
+def _download(session, url, part):
+    """Bring ``part`` up to the full file at ``url``, resuming from its current size."""
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    with _open(session, url, offset) as response:
+        if response.status_code == 416:
+            return  # Range starts at the end: the part file is already complete
+        response.raise_for_status()
+        if response.status_code != 206:
+            offset = 0  # Range ignored; start over
+        with open(part, "r+b" if offset else "wb") as f:
+            f.seek(offset)
+            f.truncate()
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+
+
+def fetch(artifact, directory=".", session=None):
+    """Download one artifact into ``directory`` unless it is already valid; returns True if it downloaded.
+
+    Raises ``ArtifactError`` for an entry without a SHA-256 instead of downloading it.
+    """
+    path = os.path.join(directory, artifact.name)
+    if verify(artifact, path) is None:
+        return False
+    if artifact.sha256 is None:
+        raise ArtifactError(f"Not downloading {artifact.name}: no sha256 in {MANIFEST} to check it against; "
+                            f"pin it with `python artifacts.py update` next to a known-good copy")
+    session = session or requests.Session()
+    part = path + ".part"
+    errors = []
+    for url in artifact.urls:
+        for _ in range(ATTEMPTS):
+            try:
+                _download(session, url, part)
+            except requests.RequestException as e:
+                errors.append(f"{url}: {e}")
+                continue  # keep the part file and resume
+            problem = verify(artifact, part)
+            if problem is None:
+                os.replace(part, path)
+                return True
+            errors.append(f"{url}: {problem}")
+            os.remove(part)
+            break  # bad content from this mirror; try the next one
+    raise ArtifactError(f"Could not download {artifact.name}: " + "; ".join(errors))
+
+
+def ensure(artifacts, directory=".", workers=4, progress=print):
+    """Fetch all ``artifacts`` in parallel; returns ``{name: exception}`` for the ones that failed.
+
+    Entries without a checksum fail unless the local file is already there.
+    """
+    failures = {}
+    lock = threading.Lock()
+
+    def run(artifact):
+        session = requests.Session()
+        try:
+            if fetch(artifact, directory, session):
+                progress(f"Downloaded {artifact.name}")
+        except Exception as e:
+            with lock:
+                failures[artifact.name] = e
+            progress(f"Failed to download {artifact.name}: {e}")
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(run, artifacts))
+    return failures
+
+
+def update_manifest(path=MANIFEST, directory="."):
+    """Record the size and hash of every artifact present in ``directory``."""
+    updated = []
+    for artifact in load_manifest(path):
+        local = os.path.join(directory, artifact.name)
+        if os.path.exists(local):
+            artifact = artifact._replace(size=os.path.getsize(local), sha256=sha256_of(local))
+        updated.append(artifact)
+    save_manifest(updated, path)
+    return updated
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["update"]:
+        for a in update_manifest():
+            print(f"{a.name}: {a.size} bytes, sha256 {a.sha256}")
+    else:
+        failed = ensure(load_manifest())
+        sys.exit(1 if failed else 0)
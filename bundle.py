@@ -0,0 +1,359 @@
+"""Versioned model bundle: NumPy arrays plus JSON metadata, no pickle.
+
+A bundle is a directory holding ``bundle.json`` and one ``.npy`` file per
+array::
+
+    model_bundle/
+        bundle.json                 format, version, sections, array dtypes and shapes
+        catalog.<column>.npy        one array per catalog column (titles as unicode)
+        neighbors.indices.npy       int32 (movies, k): catalog rows of each movie's k nearest neighbours
+        neighbors.scores.npy        float32 (movies, k): their similarities, best first
+        factors.pu.npy, .qi, .bu, .bi   SVD user/item factors and biases
+        factors.users.npy, .items   raw user / movie ids in inner-id order
+
+``bundle.json`` looks like::
+
+    {"format": "movie-bundle", "version": 1,
+     "catalog": {"columns": ["id", "title"]},
+     "neighbors": {"k": 100},
+     "factors": {"global_mean": 3.5, "rating_scale": [0.5, 5.0], "biased": true},
+     "arrays": {"catalog.id": {"dtype": "<i4", "shape": [4803]}, ...}}
+
+Every section is optional. ``open_bundle`` checks the format name and
+version and that each listed array file exists with the declared dtype and
+shape (reading only the ``.npy`` headers) and that the sections agree on
+sizes; any mismatch raises ``BundleError``. Arrays are read with
+``allow_pickle=False`` and the loaders only need NumPy and pandas, so
+opening a bundle never imports a model library or runs code from the file.
+
+The similarity matrix is stored as a top-``k`` neighbour index rather than
+dense: ``NeighborIndex`` hands out dense rows (zero outside the
+neighbours), so ``similarity[i]`` callers work unchanged and the top
+``k`` of every row is exact. ``FactorModel`` answers ``predict`` and
+``trainset.to_inner_uid``/``to_inner_iid`` like a Surprise SVD.
+
+    python bundle.py build [--neighbors K]   # convert the legacy pickles
+    python bundle.py check                   # validate and time the loads
+"""
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+FORMAT = "movie-bundle"
+VERSION = 1
+BUNDLE_DIR = "model_bundle"
+METADATA = "bundle.json"
+NEIGHBORS = 100
+
+
+class BundleError(Exception):
+    pass
+
+
+# -----------------------------
+# Model objects
+# -----------------------------
+class NeighborIndex:
+    """Top-``k`` similarity rows that read like a dense ``(movies, movies)`` matrix."""
+
+    def __init__(self, indices, scores):
+        self.indices = indices
+        self.scores = scores
+
+    @property
+    def shape(self):
+        return (len(self.indices), len(self.indices))
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, row):
+        dense = np.zeros(len(self.indices), dtype=np.float32)
+        dense[self.indices[row]] = self.scores[row]
+        return dense
+
+    def __array__(self, dtype=None, copy=None):
+        dense = np.zeros(self.shape, dtype=dtype or np.float32)
+        np.put_along_axis(dense, self.indices.astype(np.intp), self.scores, axis=1)
+        return dense
+
+
+class Prediction(NamedTuple):
+    uid: object
+    iid: object
+    est: float
+
+
+class _Trainset:
+    def __init__(self, users, items):
+        self._users = {raw: inner for inner, raw in enumerate(users.tolist())}
+        self._items = {raw: inner for inner, raw in enumerate(items.tolist())}
+
+    def to_inner_uid(self, ruid):
+        try:
+            return self._users[ruid]
+        except (KeyError, TypeError):
+            raise ValueError(f"User {ruid} is not part of the trainset.")
+
+    def to_inner_iid(self, riid):
+        try:
+            return self._items[riid]
+        except (KeyError, TypeError):
+            raise ValueError(f"Item {riid} is not part of the trainset.")
+
+
+class FactorModel:
+    """SVD factors with Surprise's ``predict`` semantics (biases, unknown ids, clipping)."""
+
+    def __init__(self, pu, qi, bu, bi, users, items, global_mean, rating_scale, biased=True):
+        self.pu, self.qi, self.bu, self.bi = pu, qi, bu, bi
+        self.trainset = _Trainset(users, items)
+        self.global_mean = float(global_mean)
+        self.rating_scale = tuple(rating_scale)
+        self.biased = biased
+
+    def _inner(self, lookup, raw):
+        try:
+            return lookup(raw)
+        except ValueError:
+            return None
+
+    def predict(self, uid, iid):
+        u = self._inner(self.trainset.to_inner_uid, uid)
+        i = self._inner(self.trainset.to_inner_iid, iid)
+        if self.biased:
+            est = self.global_mean
+            if u is not None:
+                est += self.bu[u]
+            if i is not None:
+                est += self.bi[i]
+            if u is not None and i is not None:
+                est += float(np.dot(self.qi[i], self.pu[u]))
+        elif u is not None and i is not None:
+            est = float(np.dot(self.qi[i], self.pu[u]))
+        else:
+            est = self.global_mean
+        lower, upper = self.rating_scale
+        return Prediction(uid, iid, float(min(upper, max(lower, est))))
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+def _header(path):
+    with open(path, "rb") as f:
+        major, _ = np.lib.format.read_magic(f)
+        if major == 1:
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+    return dtype, shape
+
+
+class Bundle:
+    def __init__(self, directory, metadata):
+        self.directory = directory
+        self.metadata = metadata
+
+    def has(self, section):
+        return section in self.metadata
+
+    def array(self, name):
+        return np.load(os.path.join(self.directory, name + ".npy"), allow_pickle=False)
+
+    def catalog(self):
+        columns = self.metadata["catalog"]["columns"]
+        return pd.DataFrame({c: self.array(f"catalog.{c}") for c in columns})
+
+    def neighbors(self):
+        return NeighborIndex(self.array("neighbors.indices"), self.array("neighbors.scores"))
+
+    def factors(self):
+        meta = self.metadata["factors"]
+        return FactorModel(*(self.array(f"factors.{name}") for name in ("pu", "qi", "bu", "bi", "users", "items")),
+                           meta["global_mean"], meta["rating_scale"], meta.get("biased", True))
+
+
+REQUIRED = {
+    "catalog": lambda meta: [f"catalog.{c}" for c in meta["columns"]],
+    "neighbors": lambda meta: ["neighbors.indices", "neighbors.scores"],
+    "factors": lambda meta: [f"factors.{n}" for n in ("pu", "qi", "bu", "bi", "users", "items")],
+}
+
+
+def _validate(directory, metadata):
+    if metadata.get("format") != FORMAT:
+        raise BundleError(f"{directory}: not a {FORMAT} (format {metadata.get('format')!r})")
+    if metadata.get("version") != VERSION:
+        raise BundleError(f"{directory}: bundle version {metadata.get('version')!r}, expected {VERSION}")
+    arrays = metadata.get("arrays", {})
+    for section, names in REQUIRED.items():
+        if section in metadata:
+            missing = [n for n in names(metadata[section]) if n not in arrays]
+            if missing:
+                raise BundleError(f"{directory}: {section} lacks arrays {missing}")
+    for name, spec in arrays.items():
+        path = os.path.join(directory, name + ".npy")
+        if not os.path.exists(path):
+            raise BundleError(f"{directory}: missing {name}.npy")
+        dtype, shape = _header(path)
+        if dtype.hasobject:
+            raise BundleError(f"{directory}: {name} holds Python objects")
+        if dtype != np.dtype(spec["dtype"]) or list(shape) != list(spec["shape"]):
+            raise BundleError(f"{directory}: {name} is {dtype}{list(shape)}, "
+                              f"expected {spec['dtype']}{list(spec['shape'])}")
+
+    def rows(name):
+        return arrays[name]["shape"][0]
+
+    if "catalog" in metadata:
+        n = {rows(f"catalog.{c}") for c in metadata["catalog"]["columns"]}
+        if len(n) > 1:
+            raise BundleError(f"{directory}: catalog columns have different lengths {sorted(n)}")
+        if "neighbors" in metadata and n and rows("neighbors.indices") != n.pop():
+            raise BundleError(f"{directory}: neighbour index does not match the catalog")
+    if "neighbors" in metadata and arrays["neighbors.indices"]["shape"] != arrays["neighbors.scores"]["shape"]:
+        raise BundleError(f"{directory}: neighbour indices and scores differ in shape")
+    if "factors" in metadata:
+        if not rows("factors.pu") == rows("factors.bu") == rows("factors.users"):
+            raise BundleError(f"{directory}: user factors, biases and ids differ in length")
+        if not rows("factors.qi") == rows("factors.bi") == rows("factors.items"):
+            raise BundleError(f"{directory}: item factors, biases and ids differ in length")
+
+
+def open_bundle(directory=BUNDLE_DIR):
+    """The validated bundle in ``directory``; raises ``BundleError`` if it is missing or malformed."""
+    path = os.path.join(directory, METADATA)
+    try:
+        with open(path) as f:
+            metadata = json.load(f)
+    except FileNotFoundError:
+        raise BundleError(f"{directory}: no {METADATA}")
+    except ValueError as e:
+        raise BundleError(f"{path}: {e}")
+    _validate(directory, metadata)
+    return Bundle(directory, metadata)
+
+
+# -----------------------------
+# Writing
+# -----------------------------
+def _plain(values):
+    """A NumPy array of ``values`` that loads without pickle (text as fixed-width unicode)."""
+    values = np.asarray(values)
+    if values.dtype.hasobject:
+        values = pd.Series(values).fillna("").astype(str).to_numpy().astype(str)
+    return values
+
+
+def top_neighbors(similarity, k=NEIGHBORS, chunk_size=1024):
+    """``(indices, scores)`` of the ``k`` most similar movies per row, best first."""
+    similarity = np.asarray(similarity, dtype=np.float32)
+    k = min(k, similarity.shape[1])
+    indices = np.empty((len(similarity), k), dtype=np.int32)
+    scores = np.empty((len(similarity), k), dtype=np.float32)
+    for start in range(0, len(similarity), chunk_size):
+        block = similarity[start:start + chunk_size]
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(block, top, axis=1), axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        indices[start:start + len(block)] = top
+        scores[start:start + len(block)] = np.take_along_axis(block, top, axis=1)
+    return indices, scores
+
+
+def factor_arrays(svd_model):
+    """Arrays and metadata of a fitted Surprise SVD (read by attribute; Surprise itself isn't needed)."""
+    trainset = svd_model.trainset
+
+    def raw_ids(mapping):
+        raw = [r for r, _ in sorted(mapping.items(), key=lambda item: item[1])]
+        return np.asarray(raw, dtype=np.int64) if all(isinstance(r, (int, np.integer)) for r in raw) else _plain(raw)
+
+    arrays = {
+        "factors.pu": np.asarray(svd_model.pu, dtype=np.float64),
+        "factors.qi": np.asarray(svd_model.qi, dtype=np.float64),
+        "factors.bu": np.asarray(svd_model.bu, dtype=np.float64),
+        "factors.bi": np.asarray(svd_model.bi, dtype=np.float64),
+        "factors.users": raw_ids(trainset._raw2inner_id_users),
+        "factors.items": raw_ids(trainset._raw2inner_id_items),
+    }
+    meta = {"global_mean": float(trainset.global_mean), "rating_scale": list(trainset.rating_scale),
+            "biased": bool(getattr(svd_model, "biased", True))}
+    return arrays, meta
+
+
+def write_bundle(directory=BUNDLE_DIR, movies=None, similarity=None, svd_model=None, k=NEIGHBORS):
+    """Write a bundle of whichever artifacts are given, replacing ``directory`` as a whole."""
+    metadata = {"format": FORMAT, "version": VERSION}
+    arrays = {}
+    if movies is not None:
+        movies = movies.reset_index(drop=True)
+        metadata["catalog"] = {"columns": list(movies.columns)}
+        arrays.update({f"catalog.{c}": _plain(movies[c].to_numpy()) for c in movies.columns})
+    if similarity is not None:
+        indices, scores = top_neighbors(similarity, k)
+        metadata["neighbors"] = {"k": int(indices.shape[1])}
+        arrays.update({"neighbors.indices": indices, "neighbors.scores": scores})
+    if svd_model is not None:
+        factors, metadata["factors"] = factor_arrays(svd_model)
+        arrays.update(factors)
+    metadata["arrays"] = {name: {"dtype": a.dtype.str, "shape": list(a.shape)} for name, a in arrays.items()}
+
+    tmp = directory.rstrip("/\\") + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp, name + ".npy"), values, allow_pickle=False)
+    with open(os.path.join(tmp, METADATA), "w") as f:
+        json.dump(metadata, f, indent=2)
+        f.write("\n")
+    _validate(tmp, metadata)
+    old = directory.rstrip("/\\") + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(directory):
+        os.rename(directory, old)
+    os.rename(tmp, directory)
+    shutil.rmtree(old, ignore_errors=True)
+    return metadata
+
+
+def _load_pickle(filename):
+    try:
+        with open(filename, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"Could not load {filename}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--neighbors", type=int, default=NEIGHBORS)
+    parser.add_argument("--directory", default=BUNDLE_DIR)
+    args = parser.parse_args()
+    if args.command == "build":
+        written = write_bundle(args.directory, _load_pickle("movie_list.pkl"), _load_pickle("similarity.pkl"),
+                               _load_pickle("svd_model.pkl"), k=args.neighbors)
+        print(f"Wrote {args.directory} with {', '.join(s for s in REQUIRED if s in written) or 'nothing'}.")
+    else:
+        try:
+            start = time.perf_counter()
+            opened = open_bundle(args.directory)
+        except BundleError as e:
+            sys.exit(str(e))
+        print(f"{args.directory}: version {VERSION}, opened in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for section in REQUIRED:
+            if opened.has(section):
+                start = time.perf_counter()
+                getattr(opened, section)()
+                print(f"  {section}: loaded in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,74 @@
+"""Compact in-memory representation of the movie catalog.
+
+``optimize`` downcasts the catalog DataFrame column by column: integer
+columns (ids, counts) to the smallest integer type that holds them (int32
+for TMDB ids), floats such as ``vote_average`` to float32, repetitive text
+columns (genre, language, ...) to categoricals and the remaining text
+(title, overview, tags) to Arrow-backed strings, which also makes
+``str.contains`` searches run in Arrow's vectorised kernels.
+``memory_report`` shows the bytes per column before and after.
+
+``python catalog.py [movie_list.pkl]`` prints the report for a pickle.
+"""
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_RATIO = 0.5
+
+
+def optimize(movies, category_ratio=CATEGORY_RATIO):
+    """A copy of ``movies`` with compact dtypes and a fresh RangeIndex."""
+    out = {}
+    for column in movies.columns:
+        values = movies[column]
+        if pd.api.types.is_bool_dtype(values):
+            out[column] = values
+        elif pd.api.types.is_integer_dtype(values):
+            out[column] = _downcast_int(values)
+        elif pd.api.types.is_float_dtype(values):
+            out[column] = values.astype(np.float32)
+        elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            out[column] = _compact_text(values, category_ratio)
+        else:
+            out[column] = values
+    return pd.DataFrame(out).reset_index(drop=True)
+
+
+def _downcast_int(values):
+    smallest = pd.to_numeric(values, downcast="integer")
+    # Never go below int32 for ids; int8/int16 overflow easily once arithmetic is applied
+    return smallest.astype(np.int32) if smallest.dtype.itemsize < 4 else smallest
+
+
+def _compact_text(values, category_ratio):
+    non_null = values.dropna()
+    if not non_null.map(lambda v: isinstance(v, str)).all():
+        return values  # lists, dicts or mixed objects are left alone
+    if len(values) and values.nunique(dropna=True) <= category_ratio * len(values):
+        return values.astype("category")
+    return values.astype("string[pyarrow]")
+
+
+def memory_report(before, after=None):
+    """Deep memory usage per column (and savings when ``after`` is given)."""
+    report = pd.DataFrame({"dtype": before.dtypes.astype(str), "bytes": before.memory_usage(deep=True, index=False)})
+    if after is None:
+        report.loc["total"] = ["", report["bytes"].sum()]
+        return report
+    report = report.rename(columns={"dtype": "dtype_before", "bytes": "bytes_before"})
+    report["dtype_after"] = after.dtypes.astype(str)
+    report["bytes_after"] = after.memory_usage(deep=True, index=False)
+    report.loc["total"] = ["", report["bytes_before"].sum(), "", report["bytes_after"].sum()]
+    report["saved_pct"] = (100.0 * (1 - report["bytes_after"] / report["bytes_before"])).round(1)
+    return report
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "movie_list.pkl"
+    with open(path, "rb") as f:
+        raw = pickle.load(f)
+    print(memory_report(raw, optimize(raw)).to_string())
@@ -0,0 +1,102 @@
+"""Rendered Analytics charts, cached per aggregates version.
+
+``render`` draws every Analytics chart from the rating aggregate tables to
+PNG bytes. ``ChartCache`` keeps the charts of one
+``storage.aggregates_version``: reruns with unchanged data reuse the bytes
+without plotting, and a background thread re-renders as soon as the version
+moves (after ``schedule`` is called on a write, or within ``interval``
+seconds for writes from other processes), so the page usually finds the new
+charts ready. Figures are built with matplotlib's object API rather than
+pyplot, which is not thread-safe.
+"""
+import io
+import threading
+
+import seaborn as sns
+from matplotlib.figure import Figure
+
+import storage
+
+INTERVAL = 30.0
+
+
+def _png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def _bar(series, xlabel, ylabel, rotate=True):
+    fig = Figure()
+    ax = fig.subplots()
+    ax.bar(series.index.astype(str), series.values)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    if rotate:
+        ax.tick_params(axis="x", labelrotation=45)
+    return _png(fig)
+
+
+def render(engine=None):
+    """``{chart name: PNG bytes}`` for the current aggregates (charts without data are omitted)."""
+    charts = {}
+    rating_counts = storage.rating_counts(engine)
+    if rating_counts.empty:
+        return charts
+    fig = Figure()
+    ax = fig.subplots()
+    # A KDE needs at least two distinct values (e.g. not right after the first rating)
+    sns.histplot(x=rating_counts.index, weights=rating_counts.values, bins=5, kde=len(rating_counts) > 1, ax=ax)
+    ax.set_xlabel("Rating")
+    ax.set_ylabel("Count")
+    charts["ratings"] = _png(fig)
+    charts["top_users"] = _bar(storage.top_raters(10, engine), "User", "Number of Ratings")
+    charts["top_movies"] = _bar(storage.top_reviewed_movies(10, engine), "Movie Title", "Number of Reviews")
+    genre_stats = storage.genre_rating_stats(engine)
+    if not genre_stats.empty:
+        charts["genre_counts"] = _bar(genre_stats["count"], "Genre", "Number of Ratings")
+        charts["genre_means"] = _bar(genre_stats["mean"].sort_values(ascending=False, kind="stable"),
+                                     "Genre", "Average Rating")
+    return charts
+
+
+class ChartCache:
+    def __init__(self, engine=None, interval=INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._version = None
+        self._charts = {}
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="chart-renderer", daemon=True)
+        self._thread.start()
+
+    def charts(self):
+        """Charts for the current version, rendering them now if the background thread hasn't yet."""
+        version = storage.aggregates_version(self.engine)
+        if version != self._version:
+            self._render(version)
+        return self._charts
+
+    def schedule(self):
+        """Ask the background thread to render the new version after a write."""
+        self._wake.set()
+
+    def _render(self, version):
+        with self._lock:
+            if version == self._version:
+                return
+            # Read the version before the data: a write in between only causes one extra render
+            self._charts = render(self.engine)
+            self._version = version
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                version = storage.aggregates_version(self.engine)
+                if version != self._version:
+                    self._render(version)
+            except Exception as e:
+                print(f"Chart rendering failed: {e}")
@@ -0,0 +1,173 @@
+"""Batched background writer for reviews, activity, watchlist and genre-profile changes.
+
+Every session hands its writes to one process-wide ``EventWriter``. A single
+background thread drains the queue and inserts whatever has accumulated
+(up to ``batch_size`` events) in one transaction, so concurrent sessions
+never interleave partial writes and the database sees one commit per batch
+instead of one per event. ``submit`` returns a ``Future`` that resolves to
+the new row id (reviews) or None once the batch is committed; callers that
+need read-your-writes wait on it, fire-and-forget events don't.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import NamedTuple
+
+from sqlalchemy import insert
+
+import storage
+
+log = logging.getLogger(__name__)
+
+
+class WriterStats(NamedTuple):
+    queue_depth: int
+    batches: int
+    events: int
+    errors: int
+    last_flush_ms: float
+    avg_flush_ms: float
+    max_flush_ms: float
+
+
+def _write_reviews(conn, rows):
+    return storage.upsert_reviews(conn, rows)
+
+
+def _write_activity(conn, rows):
+    conn.execute(insert(storage.activity), rows)
+    return [None] * len(rows)
+
+
+def _write_watchlist(conn, rows):
+    storage.put_watchlist_rows(conn, rows)
+    return [None] * len(rows)
+
+
+def _remove_watchlist(conn, rows):
+    storage.delete_watchlist_rows(conn, rows)
+    return [None] * len(rows)
+
+
+def _write_genre_affinity(conn, rows):
+    storage.add_genre_affinity(conn, rows)
+    return [None] * len(rows)
+
+
+WRITERS = {"reviews": _write_reviews, "activity": _write_activity, "watchlist": _write_watchlist,
+           "watchlist_remove": _remove_watchlist, "genre_affinity": _write_genre_affinity}
+
+_STOP = object()
+
+
+class EventWriter:
+    def __init__(self, engine=None, batch_size=500, flush_interval=0.05):
+        self.engine = engine or storage.get_engine()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = self._events = self._errors = 0
+        self._last_ms = self._total_ms = self._max_ms = 0.0
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, table, row):
+        """Queue ``row`` for one of ``WRITERS`` ("reviews", "activity", "watchlist", ...)."""
+        if table not in WRITERS:
+            raise ValueError(f"Unknown event table '{table}'")
+        future = Future()
+        self._queue.put((table, row, future))
+        return future
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is written."""
+        future = Future()
+        self._queue.put((None, None, future))
+        future.result(timeout)
+
+    def close(self, timeout=5.0):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            return WriterStats(
+                self._queue.qsize(), self._batches, self._events, self._errors, self._last_ms,
+                self._total_ms / self._batches if self._batches else 0.0, self._max_ms,
+            )
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            stop = first is _STOP
+            batch = [] if stop else [first]
+            # Let concurrent submitters pile up for one interval, then take what's there
+            if not stop:
+                time.sleep(self.flush_interval)
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    continue
+                batch.append(item)
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        events = [item for item in batch if item[0] is not None]
+        try:
+            results = self._write_batch(events)
+        except Exception as e:
+            log.warning("Batch write of %d events failed (%s); retrying one by one", len(events), e)
+            results = []
+            for event in events:
+                try:
+                    results.extend(self._write_batch([event]))
+                except Exception as single_error:
+                    results.append(single_error)
+        for (_, _, future), result in zip(events, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        for table, _, future in batch:
+            if table is None:
+                future.set_result(None)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        with self._stats_lock:
+            self._batches += 1
+            self._events += len(events)
+            self._errors += sum(isinstance(r, Exception) for r in results)
+            self._last_ms = elapsed
+            self._total_ms += elapsed
+            self._max_ms = max(self._max_ms, elapsed)
+
+    def _write_batch(self, events):
+        """Write ``events`` in one transaction; returns one result per event in order.
+
+        Consecutive events for the same table go in one statement; runs are
+        written in submission order so an add followed by a remove stays that way.
+        """
+        runs = []
+        for table, row, _ in events:
+            if runs and runs[-1][0] == table:
+                runs[-1][1].append(row)
+            else:
+                runs.append((table, [row]))
+        results = []
+        with self.engine.begin() as conn:
+            for table, rows in runs:
+                results.extend(WRITERS[table](conn, rows))
+        return results
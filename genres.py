@@ -0,0 +1,60 @@
+"""Movie genres from the TMDB ``movies.csv`` export.
+
+The ``genres`` column holds a JSON list such as
+``[{"id": 28, "name": "Action"}, ...]`` per movie. ``load_movie_genres``
+parses it once into a long ``(movie_id, genre)`` table (mirrored to the
+database for the per-genre rating aggregates); ``genre_mask`` turns it
+into a movies x genres boolean matrix for vectorised matching.
+"""
+import ast
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+MOVIES_CSV = "movies.csv"
+
+
+def _parse(value):
+    if not isinstance(value, str) or not value:
+        return []
+    try:
+        items = json.loads(value)
+    except ValueError:
+        try:
+            items = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return []
+    return [item["name"] for item in items if isinstance(item, dict) and "name" in item]
+
+
+def load_movie_genres(path=MOVIES_CSV):
+    """One ``(movie_id, genre)`` row per movie and genre (empty without movies.csv)."""
+    if not os.path.exists(path):
+        return pd.DataFrame({"movie_id": pd.Series(dtype="int32"), "genre": pd.Series(dtype="category")})
+    movies = pd.read_csv(path, usecols=["id", "genres"])
+    movies["genre"] = movies["genres"].map(_parse)
+    exploded = movies[["id", "genre"]].explode("genre").dropna(subset=["genre"])
+    return pd.DataFrame({
+        "movie_id": pd.to_numeric(exploded["id"], errors="coerce").astype("int32"),
+        "genre": exploded["genre"].astype("category"),
+    }).drop_duplicates().reset_index(drop=True)
+
+
+def genres_of(movie_genres, movie_id):
+    return movie_genres.loc[movie_genres["movie_id"] == int(movie_id), "genre"].astype(str).tolist()
+
+
+def genre_mask(movie_genres, movie_ids=None):
+    """``(movie_ids, genres, mask)`` where ``mask[i, j]`` is True if movie i has genre j."""
+    genres = pd.Index(movie_genres["genre"].cat.categories if len(movie_genres) else [])
+    if movie_ids is None:
+        movie_ids = np.unique(movie_genres["movie_id"].to_numpy())
+    movie_ids = pd.Index(np.asarray(movie_ids, dtype=np.int64))
+    mask = np.zeros((len(movie_ids), len(genres)), dtype=bool)
+    rows = movie_ids.get_indexer(movie_genres["movie_id"].to_numpy())
+    cols = genres.get_indexer(movie_genres["genre"].astype(str).to_numpy())
+    keep = (rows >= 0) & (cols >= 0)
+    mask[rows[keep], cols[keep]] = True
+    return movie_ids, genres, mask
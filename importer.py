@@ -0,0 +1,89 @@
+"""Streaming bulk import of MovieLens-format rating dumps.
+
+Reads ``ratings.csv`` (``userId,movieId,rating,timestamp``) in fixed-size
+chunks, maps MovieLens movie ids to TMDB ids through ``links.csv``
+(``movieId,imdbId,tmdbId``), drops ratings of movies that aren't in the
+catalog and upserts the rest into the reviews table, one transaction per
+chunk. A re-imported (user, movie) pair replaces the older rating, so the
+table keeps one rating per pair, and the rating aggregates are adjusted
+chunk by chunk. Only the current chunk and the id map are in memory, so
+memory stays flat however large the dump is.
+
+External users are stored as ``userId + --user-offset`` so they never
+collide with app accounts; they have no login and are not precomputed.
+
+    python importer.py ml-25m/ratings.csv --links ml-25m/links.csv
+"""
+import argparse
+import os
+import pickle
+import time
+
+import pandas as pd
+
+import storage
+
+CHUNK_SIZE = 100_000
+USER_OFFSET = 10_000_000
+
+
+def load_links(path, catalog_ids):
+    """MovieLens movieId -> TMDB id for movies present in the catalog."""
+    links = pd.read_csv(path, usecols=["movieId", "tmdbId"]).dropna()
+    links["tmdbId"] = links["tmdbId"].astype("int64")
+    links = links[links["tmdbId"].isin(catalog_ids)]
+    return links.set_index("movieId")["tmdbId"]
+
+
+def import_ratings(ratings_path, links_path=None, catalog_path="movie_list.pkl", chunk_size=CHUNK_SIZE,
+                   user_offset=USER_OFFSET, engine=None, progress=print):
+    """Import one dump; returns ``(rows_read, rows_imported, seconds)``.
+
+    Without ``links_path`` the ``movieId`` column is taken to hold TMDB ids
+    already.
+    """
+    engine = engine or storage.get_engine()
+    with open(catalog_path, "rb") as f:
+        movies = pickle.load(f)
+    titles = movies.drop_duplicates("id").set_index("id")["title"]
+    id_map = load_links(links_path, titles.index) if links_path else None
+
+    start = time.perf_counter()
+    read = imported = 0
+    chunks = pd.read_csv(ratings_path, usecols=["userId", "movieId", "rating", "timestamp"], chunksize=chunk_size,
+                         dtype={"userId": "int64", "movieId": "int64", "rating": "float32", "timestamp": "int64"})
+    for chunk in chunks:
+        read += len(chunk)
+        movie_ids = chunk["movieId"].map(id_map) if id_map is not None else chunk["movieId"].where(chunk["movieId"].isin(titles.index))
+        keep = movie_ids.notna()
+        if keep.any():
+            chunk, movie_ids = chunk[keep], movie_ids[keep].astype("int64")
+            rows = pd.DataFrame({
+                "user_id": chunk["userId"] + user_offset,
+                "movie_id": movie_ids,
+                "title": titles.reindex(movie_ids).to_numpy(),
+                "rating": chunk["rating"].astype(float),
+                "review": None,
+                "created_at": pd.to_datetime(chunk["timestamp"], unit="s").dt.strftime("%Y-%m-%d %H:%M:%S"),
+            })
+            with engine.begin() as conn:
+                # A re-imported (user, movie) pair replaces the earlier rating; the aggregates follow each chunk
+                storage.upsert_reviews(conn, rows.to_dict("records"))
+            imported += len(rows)
+        elapsed = time.perf_counter() - start
+        progress(f"{read:,} read, {imported:,} imported, {read / elapsed:,.0f} rows/s")
+    return read, imported, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("ratings", help="MovieLens ratings.csv")
+    parser.add_argument("--links", help="MovieLens links.csv (omit if movieId already holds TMDB ids)")
+    parser.add_argument("--catalog", default="movie_list.pkl")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--user-offset", type=int, default=USER_OFFSET)
+    args = parser.parse_args()
+    if args.links is None and os.path.exists(os.path.join(os.path.dirname(args.ratings), "links.csv")):
+        print("Note: links.csv found next to the ratings; pass --links to map MovieLens ids to TMDB ids.")
+    read, imported, seconds = import_ratings(args.ratings, args.links, args.catalog, args.chunk_size, args.user_offset)
+    print(f"Imported {imported:,} of {read:,} ratings in {seconds:.1f}s ({read / seconds if seconds else 0:,.0f} rows/s)")
@@ -0,0 +1,213 @@
+"""Lazily loaded, hot-reloadable model artifacts.
+
+A ``LazyArtifact`` wraps the loader of one artifact (the similarity matrix,
+the SVD model) so it is read on first ``get`` instead of before the first
+page renders. ``warm`` starts the load on a daemon thread; a ``get`` that
+arrives while it runs waits for the same load rather than starting another.
+Each handle records how long its load took and roughly how much memory the
+loaded object holds, for the Analytics page.
+
+A ``ModelRegistry`` holds the current ``ModelSet`` (catalog plus handles,
+tagged with a fingerprint of the artifact files) and a thread that polls
+the fingerprint. When the files change it builds the next set in the
+background, loads every artifact and only then replaces the current set
+in one assignment. Readers take ``current()`` once per rerun and keep using
+that set, so a rerun in flight during a swap finishes on the old models,
+which are freed when the last such rerun drops them. Until then both sets
+are in memory; ``swaps()`` reports that cost and the load time per swap.
+"""
+import os
+import sys
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class LoadStats(NamedTuple):
+    name: str
+    state: str  # "not loaded", "loading", "loaded" or "failed"
+    seconds: Optional[float] = None
+    nbytes: Optional[int] = None
+    error: Optional[str] = None
+
+
+def sizeof(obj, _seen=None):
+    """Approximate bytes held by ``obj``: arrays and frames exactly, containers and attributes recursively."""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(obj, pd.DataFrame) else usage)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sizeof(k, seen) + sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += sizeof(vars(obj), seen)
+    return size
+
+
+class LazyArtifact:
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._value = None
+        self._state = "not loaded"
+        self._seconds = None
+        self._nbytes = None
+        self._error = None
+
+    @property
+    def loaded(self):
+        return self._state in ("loaded", "failed")
+
+    def get(self):
+        """The artifact (None if it could not be loaded), loading it now if needed."""
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self._load()
+        return self._value
+
+    def warm(self):
+        """Load in the background; returns the thread (None if already loaded)."""
+        if self.loaded:
+            return None
+        thread = threading.Thread(target=self.get, name=f"warm-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        return LoadStats(self.name, self._state, self._seconds, self._nbytes, self._error)
+
+    def _load(self):
+        self._state = "loading"
+        start = time.perf_counter()
+        try:
+            value = self._loader()
+        except Exception as e:
+            value, self._error = None, str(e)
+        self._seconds = time.perf_counter() - start
+        self._value = value
+        if value is None:
+            self._state = "failed"
+            self._error = self._error or "not available"
+        else:
+            self._nbytes = sizeof(value)
+            self._state = "loaded"
+        print(f"Loaded {self.name} in {self._seconds:.2f}s"
+              + (f" ({self._nbytes / 1e6:.1f} MB)" if self._nbytes is not None else f": {self._error}"))
+
+
+class ModelSet(NamedTuple):
+    version: tuple
+    movies: object
+    handles: dict
+
+    def get(self, name):
+        return self.handles[name].get()
+
+    def nbytes(self):
+        return sizeof(self.movies) + sum(h.stats().nbytes or 0 for h in self.handles.values())
+
+
+class SwapStats(NamedTuple):
+    at: float
+    seconds: float
+    nbytes: int
+    previous_nbytes: int
+    error: Optional[str] = None
+
+
+def fingerprint(paths):
+    """``(path, mtime_ns, size)`` per path (None for missing ones); changes whenever a file is replaced."""
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamps.append((path, None, None))
+    return tuple(stamps)
+
+
+class ModelRegistry:
+    """Current ``ModelSet`` plus a watcher that swaps in a fully loaded new one when ``paths`` change.
+
+    ``build()`` returns ``(movies, handles)``; the first set is built
+    synchronously with its handles warming in the background.
+    """
+
+    def __init__(self, build, paths, interval=30.0):
+        self._build = build
+        self.paths = list(paths)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._swaps = []
+        self._rejected = None
+        self._current = self._new_set()
+        for handle in self._current.handles.values():
+            handle.warm()
+        self._thread = threading.Thread(target=self._run, name="model-registry", daemon=True)
+        self._thread.start()
+
+    def current(self):
+        return self._current
+
+    def swaps(self):
+        return list(self._swaps)
+
+    def _new_set(self):
+        version = fingerprint(self.paths)
+        movies, handles = self._build()
+        return ModelSet(version, movies, handles)
+
+    def reload(self):
+        """Load the artifacts as they are now and swap them in; returns the new set, or None if rejected."""
+        with self._lock:
+            start = time.perf_counter()
+            previous = self._current
+            standby = self._new_set()
+            for handle in standby.handles.values():
+                handle.get()
+            error = self._problem(previous, standby)
+            stats = SwapStats(time.time(), time.perf_counter() - start, standby.nbytes(), previous.nbytes(), error)
+            self._swaps = (self._swaps + [stats])[-20:]
+            if error:
+                self._rejected = standby.version
+                print(f"Kept model version: {error}")
+                return None
+            self._current = standby
+            print(f"Swapped in new models in {stats.seconds:.2f}s "
+                  f"({stats.nbytes / 1e6:.1f} MB, previous {stats.previous_nbytes / 1e6:.1f} MB)")
+            return standby
+
+    @staticmethod
+    def _problem(previous, standby):
+        # A reload must not lose an artifact the running version has
+        if standby.movies is None and previous.movies is not None:
+            return "catalog failed to load"
+        for name, handle in standby.handles.items():
+            old = previous.handles.get(name)
+            if handle.stats().state == "failed" and old is not None and old.stats().state == "loaded":
+                return f"{name} failed to load: {handle.stats().error}"
+        return None
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                version = fingerprint(self.paths)
+                if version != self._current.version and version != self._rejected:
+                    self.reload()
+            except Exception as e:
+                print(f"Model reload failed: {e}")
@@ -0,0 +1,171 @@
+"""Genre-affinity profiles and new-movie notifications.
+
+A user's profile is the sum of their centred ratings (``rating - 3``) per
+genre, kept in the ``genre_affinity`` table. ``affinity_rows`` turns one
+new or changed rating into per-genre increments that the app queues on the
+event writer, so profiles stay current without rescanning reviews.
+
+``run`` is the notification job. It scores every catalog movie for the
+profiled app accounts (imported users can't log in, so they get neither
+profiles nor notifications) one user chunk at a time: a matrix product of
+positive affinities and the movie-genre mask, minus the movies the chunk's
+users have rated, saved or already been told about, which are looked up
+in SQL per chunk. The best matches go to ``notifications`` until each user
+has ``PER_USER`` unseen ones. The Watchlist page only reads a user's
+pending rows. Profiles are rebuilt from the reviews once per database, on
+the first run, which is recorded in ``meta``.
+
+The app runs the job on a background thread; ``python notifications.py``
+runs it once and ``python notifications.py rebuild`` recomputes all
+profiles from the reviews table first.
+"""
+import pickle
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, insert, select
+
+import genres
+import storage
+
+PER_USER = 3
+NEUTRAL_RATING = 3.0
+INTERVAL = 900.0
+# Users scored per matrix product; bounds the scores matrix to USER_CHUNK x catalog size
+USER_CHUNK = 1024
+REBUILT_KEY = "genre_affinity_rebuilt"
+
+
+def affinity_rows(user_id, movie_id, rating, movie_genres, previous=None):
+    """``genre_affinity`` increments for one rating (replacing ``previous`` if the movie was rated before)."""
+    if previous is None:
+        weight, ratings = float(rating) - NEUTRAL_RATING, 1
+    else:
+        weight, ratings = float(rating) - float(previous), 0
+    return [{"user_id": int(user_id), "genre": genre, "weight": weight, "ratings": ratings}
+            for genre in genres.genres_of(movie_genres, movie_id)]
+
+
+def _accounts():
+    return select(storage.users.c.user_id)
+
+
+def rebuild_profiles(movie_genres, engine=None):
+    """Recompute the app accounts' profiles from the reviews table; returns the profile frame."""
+    affinity, reviews, meta = storage.genre_affinity, storage.reviews, storage.meta
+    with (engine or storage.get_engine()).begin() as conn:
+        # Deleting first holds the write lock, so no rating lands between the read and the replace
+        conn.execute(delete(affinity))
+        ratings = pd.read_sql(select(reviews.c.user_id, reviews.c.movie_id, reviews.c.rating)
+                              .where(reviews.c.user_id.in_(_accounts())), conn)
+        joined = ratings.merge(movie_genres, on="movie_id")
+        joined["weight"] = joined["rating"] - NEUTRAL_RATING
+        profiles = (joined.groupby(["user_id", joined["genre"].astype(str)])
+                    .agg(weight=("weight", "sum"), ratings=("weight", "size")).reset_index())
+        if not profiles.empty:
+            conn.execute(insert(affinity), profiles.to_dict("records"))
+        conn.execute(delete(meta).where(meta.c.key == REBUILT_KEY))
+        conn.execute(insert(meta).values(key=REBUILT_KEY, value=storage.now()))
+    return profiles
+
+
+def _excluded(conn, user_ids):
+    """``(user_id, movie_id)`` pairs of ``user_ids`` that were rated, saved or already notified."""
+    queries = [select(table.c.user_id, table.c.movie_id).where(table.c.user_id.in_(user_ids))
+               for table in (storage.reviews, storage.watchlist, storage.notifications)]
+    return pd.read_sql(queries[0].union(*queries[1:]), conn)
+
+
+def run(movie_genres, movies=None, per_user=PER_USER, engine=None):
+    """Create pending notifications; returns the number created.
+
+    ``movies`` is the catalog (``id``, ``title``); only its movies are
+    suggested.
+    """
+    engine = engine or storage.get_engine()
+    affinity, meta = storage.genre_affinity, storage.meta
+    with engine.connect() as conn:
+        rebuilt = conn.execute(select(meta.c.value).where(meta.c.key == REBUILT_KEY)).first()
+    if not rebuilt:
+        rebuild_profiles(movie_genres, engine)
+    with engine.connect() as conn:
+        profiles = pd.read_sql(select(affinity).where(affinity.c.user_id.in_(_accounts())), conn)
+    if profiles.empty or movie_genres.empty:
+        return 0
+    if movies is not None:
+        titles = movies.drop_duplicates("id").set_index("id")["title"]
+        movie_genres = movie_genres[movie_genres["movie_id"].isin(titles.index)]
+    movie_ids, genre_names, mask = genres.genre_mask(movie_genres)
+    if movies is None:
+        titles = pd.Series(None, index=movie_ids, dtype=object)
+
+    weights = (profiles.pivot_table(index="user_id", columns="genre", values="weight", aggfunc="sum")
+               .reindex(columns=genre_names).fillna(0.0))
+    affinity = np.clip(weights.to_numpy(np.float32), 0.0, None)  # disliked genres don't earn a match
+    users = weights.index
+
+    notifications = storage.notifications
+    mask_t = mask.T.astype(np.float32)
+    created_at = storage.now()
+    rows = []
+    k = min(per_user, len(movie_ids))
+    for start in range(0, len(users) if k else 0, USER_CHUNK):
+        stop = min(start + USER_CHUNK, len(users))
+        chunk = [int(u) for u in users[start:stop]]
+        with engine.connect() as conn:
+            pending = dict(conn.execute(select(notifications.c.user_id, func.count())
+                                        .where(notifications.c.user_id.in_(chunk), notifications.c.seen_at.is_(None))
+                                        .group_by(notifications.c.user_id)).all())
+            excluded = _excluded(conn, chunk)
+        slots = per_user - np.array([pending.get(u, 0) for u in chunk])
+        scores = affinity[start:stop] @ mask_t
+        ex_rows = users[start:stop].get_indexer(excluded["user_id"])
+        ex_cols = movie_ids.get_indexer(excluded["movie_id"])
+        keep = (ex_rows >= 0) & (ex_cols >= 0)
+        scores[ex_rows[keep], ex_cols[keep]] = 0.0
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for offset, cols in enumerate(top):
+            n = slots[offset]
+            if n <= 0:
+                continue
+            cols = cols[np.argsort(-scores[offset, cols], kind="stable")][:n]
+            user_id = int(users[start + offset])
+            for col in cols:
+                score = float(scores[offset, col])
+                if score <= 0.0:
+                    break
+                movie_id = int(movie_ids[col])
+                rows.append({"user_id": user_id, "movie_id": movie_id, "title": titles.get(movie_id),
+                             "score": score, "created_at": created_at, "seen_at": None})
+    storage.add_notifications(rows, engine)
+    return len(rows)
+
+
+def start_job(movie_genres, movies=None, interval=INTERVAL, engine=None):
+    """Run the job once now and then every ``interval`` seconds on a daemon thread.
+
+    ``movies`` is called on every pass for the current catalog, so a
+    reloaded one is picked up.
+    """
+    def loop():
+        while True:
+            try:
+                run(movie_genres, movies() if movies else None, engine=engine)
+            except Exception as e:
+                print(f"Notification job failed: {e}")
+            stop.wait(interval)
+    stop = threading.Event()
+    thread = threading.Thread(target=loop, name="notification-job", daemon=True)
+    thread.start()
+    return stop
+
+
+if __name__ == "__main__":
+    movie_genres = genres.load_movie_genres()
+    with open("movie_list.pkl", "rb") as f:
+        catalog_movies = pickle.load(f)
+    if sys.argv[1:2] == ["rebuild"]:
+        print(f"Rebuilt {len(rebuild_profiles(movie_genres))} profile rows.")
+    print(f"Created {run(movie_genres, catalog_movies)} notifications.")
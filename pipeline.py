@@ -0,0 +1,254 @@
+"""Staged recommendation pipeline.
+
+A strategy is a ``Pipeline`` of candidate generators, filters, an optional
+scorer and a re-ranker. Every stage records its latency and candidate count
+in a ``StageTiming``, with the error if it raised. Generators and the
+re-ranker are best-effort: a failing one contributes nothing or leaves the
+order as it was. Filters and the scorer fail closed: candidates that were
+not filtered (already rated, on the watchlist) or not blended must not be
+shown, so the pipeline drops them. Generator output can be shared between
+strategies through a ``CandidateCache``, and a pipeline that ends up empty
+hands over to its ``fallback`` (e.g. hybrid -> mood -> popular).
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+import recommenders
+
+
+class StageTiming(NamedTuple):
+    pipeline: str
+    stage: str
+    name: str
+    ms: float
+    candidates: int
+    cached: bool = False
+    error: Optional[str] = None
+
+
+class Generator(NamedTuple):
+    name: str
+    fn: Callable
+    # Cache key for the generator's output given a Context
+    key: Callable = lambda ctx: None
+
+
+class Stage(NamedTuple):
+    name: str
+    fn: Callable
+
+
+class Context:
+    """Inputs shared by every stage of one pipeline run.
+
+    ``similarity``, ``svd_model`` and ``reviews`` are zero-argument loaders
+    so strategies that never use a model or the ratings never load them;
+    ``precomputed(user_id, kind)`` may serve collaborative and personalized
+    lists from the precompute store and ``clusters(seed_ids, n)`` cold-start
+    lists from the taste clusters.
+    """
+
+    def __init__(self, movies, similarity, svd_model, reviews, user_id=None, movie_title=None,
+                 watchlist_ids=(), mood_answers=None, mood_movie_ids=(), precomputed=None, clusters=None):
+        self.movies = movies
+        self._similarity = similarity
+        self._svd_model = svd_model
+        self.user_id = user_id
+        self.movie_title = movie_title
+        self.watchlist_ids = set(int(m) for m in watchlist_ids)
+        self.mood_answers = mood_answers or {}
+        self.mood_movie_ids = tuple(int(m) for m in mood_movie_ids)
+        self.precomputed = precomputed
+        self.clusters = clusters
+        self._reviews = reviews
+        self._reviews_df = None
+        self._pop = None
+
+    @property
+    def similarity(self):
+        return self._similarity()
+
+    @property
+    def svd_model(self):
+        return self._svd_model()
+
+    @property
+    def reviews_df(self):
+        if self._reviews_df is None:
+            self._reviews_df = self._reviews()
+        return self._reviews_df
+
+    @property
+    def pop(self):
+        if self._pop is None:
+            self._pop = recommenders.popularity_table(self.reviews_df)
+        return self._pop
+
+
+class CandidateCache:
+    """Small LRU of generator outputs keyed by ``(generator, key)``."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get_or_compute(self, key, compute):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key], True
+        value = compute()
+        self._entries[key] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value, False
+
+    def clear(self):
+        self._entries.clear()
+
+
+class Pipeline:
+    def __init__(self, name, generators, filters=(), scorer=None, reranker=None, fallback=None):
+        self.name = name
+        self.generators = list(generators)
+        self.filters = list(filters)
+        self.scorer = scorer
+        self.reranker = reranker
+        self.fallback = fallback
+
+    def run(self, ctx, cache=None):
+        """Return ``(recommendations, timings)`` for ``ctx``."""
+        timings = []
+        merged = OrderedDict()
+        for gen in self.generators:
+            start = time.perf_counter()
+            recs, cached, error = [], False, None
+            try:
+                if cache is not None:
+                    recs, cached = cache.get_or_compute((gen.name, gen.key(ctx)), lambda: gen.fn(ctx))
+                else:
+                    recs = gen.fn(ctx)
+            except Exception as e:
+                error = str(e)
+            for rec in recs:
+                merged.setdefault(rec.movie_id, rec)
+            timings.append(StageTiming(self.name, "generate", gen.name, _ms(start), len(recs), cached, error))
+
+        recs = list(merged.values())
+        failed = False
+        for kind, stages in (("filter", self.filters), ("score", [self.scorer]), ("rerank", [self.reranker])):
+            for stage in stages:
+                if stage is None or failed:
+                    continue
+                start = time.perf_counter()
+                error = None
+                try:
+                    recs = stage.fn(ctx, recs)
+                except Exception as e:
+                    error = str(e)
+                    failed = kind != "rerank"
+                    if failed:
+                        recs = []
+                timings.append(StageTiming(self.name, kind, stage.name, _ms(start), len(recs), False, error))
+
+        if not recs and self.fallback is not None:
+            fallback_recs, fallback_timings = self.fallback.run(ctx, cache)
+            return fallback_recs, timings + fallback_timings
+        return recs, timings
+
+
+def _ms(start):
+    return (time.perf_counter() - start) * 1000.0
+
+# -----------------------------
+# Stock generators
+# -----------------------------
+def content_generator(n=5):
+    def generate(ctx):
+        if ctx.similarity is None:
+            return []
+        if ctx.movie_title not in ctx.movies["title"].values:
+            raise ValueError(f"Movie '{ctx.movie_title}' not found in the database.")
+        return recommenders.content_based(ctx.movies, ctx.similarity, ctx.movie_title, n=n)
+    return Generator(f"content@{n}", generate, lambda ctx: ctx.movie_title)
+
+
+def collaborative_generator(n=25):
+    def generate(ctx):
+        if ctx.precomputed is not None:
+            recs = ctx.precomputed(ctx.user_id, "collaborative")
+            if recs is not None:
+                return recs[:n]
+        return recommenders.collaborative(ctx.user_id, ctx.movies, ctx.svd_model, ctx.reviews_df, n=n, pop=ctx.pop)
+    return Generator("collaborative", generate, lambda ctx: ctx.user_id)
+
+
+def personalized_generator(n=25):
+    def generate(ctx):
+        if ctx.user_id is None:
+            return []
+        if ctx.precomputed is not None:
+            recs = ctx.precomputed(ctx.user_id, "personalized")
+            if recs is not None:
+                return recs[:n]
+        return recommenders.personalized(ctx.user_id, ctx.movies, ctx.similarity, ctx.reviews_df, n=n)
+    return Generator("personalized", generate, lambda ctx: ctx.user_id)
+
+
+def cold_start_generator(n=25):
+    """Taste-cluster picks seeded by the user's first ratings and mood results."""
+    def generate(ctx):
+        if ctx.clusters is None:
+            return []
+        seeds = list(ctx.mood_movie_ids)
+        if ctx.user_id is not None:
+            seeds += sorted(recommenders.rated_movie_ids(ctx.reviews_df, ctx.user_id))
+        return ctx.clusters(seeds, n)
+    return Generator("taste_cluster", generate, lambda ctx: (ctx.user_id, ctx.mood_movie_ids))
+
+# -----------------------------
+# Stock filters, scorers and re-rankers
+# -----------------------------
+def _exclude_rated(ctx, recs):
+    rated = recommenders.rated_movie_ids(ctx.reviews_df, ctx.user_id) if ctx.user_id is not None else set()
+    return [r for r in recs if r.movie_id not in rated]
+
+
+def _exclude_watchlist(ctx, recs):
+    return [r for r in recs if r.movie_id not in ctx.watchlist_ids]
+
+
+def _exclude_seed(ctx, recs):
+    seed = ctx.movies.loc[ctx.movies["title"] == ctx.movie_title, "id"].astype(int).tolist()
+    return [r for r in recs if r.movie_id not in seed]
+
+
+exclude_rated = Stage("already_rated", _exclude_rated)
+exclude_watchlist = Stage("watchlist", _exclude_watchlist)
+exclude_seed = Stage("seed_movie", _exclude_seed)
+
+
+def blend_scorer(content_weight=0.5):
+    def score(ctx, recs):
+        if not recs:
+            return recs
+        ids = [r.movie_id for r in recs]
+        scores = recommenders.blend_scores(ctx.movie_title, ctx.user_id, ids, ctx.movies, ctx.similarity,
+                                           ctx.svd_model, ctx.reviews_df, content_weight=content_weight, pop=ctx.pop)
+        return [recommenders.Recommendation(mid, float(s), "hybrid") for mid, s in zip(ids, scores)]
+    return Stage(f"blend@{content_weight:g}", score)
+
+
+def top_n(n):
+    """Highest scores first (stable), cut to ``n``."""
+    def rerank(ctx, recs):
+        order = np.argsort(-np.array([r.score for r in recs], dtype=float), kind="stable")[:n]
+        return [recs[i] for i in order]
+    return Stage(f"top@{n}", rerank)
+
+
+def first_n(n):
+    """Keep generator order, cut to ``n``."""
+    return Stage(f"first@{n}", lambda ctx, recs: recs[:n])
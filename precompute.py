@@ -0,0 +1,266 @@
+"""Batch precompute of per-user top-N recommendations.
+
+Run ``python precompute.py`` to rebuild the taste clusters used for cold-start
+users and (re)compute collaborative and personalized lists for every user in
+the user table, or ``python precompute.py --dirty`` to only refresh users who
+submitted new ratings since their list was built. Results go to
+recommendations.db, which the app reads by primary key.
+"""
+import argparse
+import json
+import os
+import pickle
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+import bundle
+import catalog
+import recommenders
+import storage
+
+STORE_PATH = "recommendations.db"
+TOP_N = 25
+SCHEMA_VERSION = 2
+
+# -----------------------------
+# Indexed store
+# -----------------------------
+def open_store(path=STORE_PATH, check_same_thread=True):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=check_same_thread)
+    # The store only holds derived data, so an older layout is simply rebuilt
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS user_recommendations")
+            conn.execute("DROP TABLE IF EXISTS dirty_users")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_recommendations (
+            user_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            recommendations TEXT NOT NULL,
+            computed_at TEXT NOT NULL,
+            PRIMARY KEY (user_id, kind)
+        )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS dirty_users (user_id TEXT PRIMARY KEY, marked_at REAL NOT NULL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS taste_clusters (cluster_id INTEGER PRIMARY KEY, recommendations TEXT NOT NULL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS movie_clusters (movie_id INTEGER PRIMARY KEY, cluster_id INTEGER NOT NULL)")
+    return conn
+
+
+def write_recommendations(conn, rows, started_at):
+    """Upsert ``(user_id, kind, recommendations)`` rows in a single transaction.
+
+    Dirty marks are only cleared if they predate ``started_at`` so a rating
+    submitted while the lists were being computed keeps its user dirty.
+    """
+    computed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO user_recommendations VALUES (?, ?, ?, ?)",
+            [(str(uid), kind, json.dumps([[r.movie_id, r.score] for r in recs]), computed_at) for uid, kind, recs in rows],
+        )
+        conn.executemany(
+            "DELETE FROM dirty_users WHERE user_id = ? AND marked_at <= ?",
+            {(str(uid), started_at) for uid, _, _ in rows},
+        )
+
+
+def read_recommendations(conn, user_id, kind):
+    """Precomputed recommendations for one user, or None when missing or dirty."""
+    uid = str(user_id)
+    if conn.execute("SELECT 1 FROM dirty_users WHERE user_id = ?", (uid,)).fetchone():
+        return None
+    row = conn.execute(
+        "SELECT recommendations FROM user_recommendations WHERE user_id = ? AND kind = ?", (uid, kind)
+    ).fetchone()
+    if not row:
+        return None
+    return [recommenders.Recommendation(int(mid), float(score), kind) for mid, score in json.loads(row[0])]
+
+
+def mark_dirty(conn, user_id):
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO dirty_users VALUES (?, ?)", (str(user_id), time.time()))
+
+
+def dirty_user_ids(conn):
+    return [int(row[0]) for row in conn.execute("SELECT user_id FROM dirty_users")]
+
+
+def write_taste_clusters(conn, movie_ids, labels, tops):
+    with conn:
+        conn.execute("DELETE FROM taste_clusters")
+        conn.execute("DELETE FROM movie_clusters")
+        conn.executemany("INSERT INTO movie_clusters VALUES (?, ?)",
+                         [(int(mid), int(label)) for mid, label in zip(movie_ids, labels)])
+        conn.executemany("INSERT INTO taste_clusters VALUES (?, ?)",
+                         [(int(c), json.dumps(picks)) for c, picks in tops.items()])
+
+
+def cold_start_recommendations(conn, seed_ids, n=TOP_N):
+    """Top titles of the cluster most of ``seed_ids`` fall in (primary-key lookups only)."""
+    seeds = sorted({int(m) for m in seed_ids})
+    if not seeds:
+        return []
+    placeholders = ",".join("?" * len(seeds))
+    row = conn.execute(
+        f"SELECT cluster_id FROM movie_clusters WHERE movie_id IN ({placeholders}) "
+        "GROUP BY cluster_id ORDER BY COUNT(*) DESC, cluster_id LIMIT 1", seeds
+    ).fetchone()
+    if not row:
+        return []
+    picks = json.loads(conn.execute("SELECT recommendations FROM taste_clusters WHERE cluster_id = ?", row).fetchone()[0])
+    return [recommenders.Recommendation(int(mid), float(score), "cold_start")
+            for mid, score in picks if int(mid) not in seeds][:n]
+
+# -----------------------------
+# Computation
+# -----------------------------
+def load_artifacts():
+    """``(movies, similarity, svd_model)`` from the model bundle, falling back to the pickles."""
+    try:
+        opened = bundle.open_bundle()
+    except bundle.BundleError:
+        opened = None
+    loaded = []
+    for section, filename in (("catalog", "movie_list.pkl"), ("neighbors", "similarity.pkl"),
+                              ("factors", "svd_model.pkl")):
+        if opened is not None and opened.has(section):
+            loaded.append(getattr(opened, section)())
+            continue
+        try:
+            with open(filename, "rb") as f:
+                loaded.append(pickle.load(f))
+        except Exception as e:
+            print(f"Could not load {filename}: {e}")
+            loaded.append(None)
+    if loaded[0] is not None:
+        loaded[0] = catalog.optimize(loaded[0])
+    return tuple(loaded)
+
+
+def compute_user(user_id, movies, similarity, svd_model, reviews_df, pop=None, n=TOP_N):
+    """All precomputed kinds for one user as ``(user_id, kind, recommendations)`` rows."""
+    return [
+        (user_id, "collaborative", recommenders.collaborative(user_id, movies, svd_model, reviews_df, n=n, pop=pop)),
+        (user_id, "personalized", recommenders.personalized(user_id, movies, similarity, reviews_df, n=n)),
+    ]
+
+
+# -----------------------------
+# Taste clusters (cold start)
+# -----------------------------
+def item_vectors(movies, similarity, svd_model, dims=32):
+    """``(movie_ids, vectors)`` from SVD item factors, else a projection of the similarity matrix."""
+    ids = movies["id"].to_numpy().astype(int)
+    if svd_model is not None and hasattr(svd_model, "qi"):
+        known, vectors = [], []
+        for mid in ids:
+            for raw in (mid, str(mid)):
+                try:
+                    vectors.append(svd_model.qi[svd_model.trainset.to_inner_iid(raw)])
+                    known.append(mid)
+                    break
+                except ValueError:
+                    continue
+        return np.array(known, dtype=int), np.array(vectors)
+    if similarity is None:
+        return ids[:0], np.empty((0, dims))
+    return ids, TruncatedSVD(n_components=dims, random_state=0).fit_transform(np.asarray(similarity, dtype=np.float32))
+
+
+def build_taste_clusters(movie_ids, vectors, k=20, top=TOP_N):
+    """KMeans labels plus the ``top`` titles nearest each centroid as ``[movie_id, score]``."""
+    vectors = normalize(vectors)
+    km = KMeans(n_clusters=min(k, len(movie_ids)), n_init=10, random_state=0).fit(vectors)
+    distances = np.linalg.norm(vectors - km.cluster_centers_[km.labels_], axis=1)
+    tops = {}
+    for cluster in range(km.n_clusters):
+        members = np.flatnonzero(km.labels_ == cluster)
+        members = members[np.argsort(distances[members], kind="stable")][:top]
+        tops[cluster] = [[int(movie_ids[i]), float(1.0 - distances[i])] for i in members]
+    return km.labels_, tops
+
+
+def run_clusters(k=20, store_path=STORE_PATH):
+    start = time.perf_counter()
+    movies, similarity, svd_model = load_artifacts()
+    if movies is None:
+        print("No catalog loaded; skipping taste clusters.")
+        return
+    movie_ids, vectors = item_vectors(movies, similarity, svd_model)
+    if len(movie_ids) == 0:
+        print("No item vectors available; skipping taste clusters.")
+        return
+    labels, tops = build_taste_clusters(movie_ids, vectors, k=k)
+    conn = open_store(store_path)
+    write_taste_clusters(conn, movie_ids, labels, tops)
+    conn.close()
+    print(f"Built {len(tops)} taste clusters over {len(movie_ids)} movies in {time.perf_counter() - start:.1f}s")
+
+
+_worker = {}
+
+
+def _init_worker():
+    movies, similarity, svd_model = load_artifacts()
+    reviews_df = recommenders.load_reviews()
+    _worker.update(
+        movies=movies, similarity=similarity, svd_model=svd_model,
+        reviews_df=reviews_df, pop=recommenders.popularity_table(reviews_df),
+    )
+
+
+def _compute_chunk(user_ids):
+    rows = []
+    for uid in user_ids:
+        rows.extend(compute_user(uid, _worker["movies"], _worker["similarity"], _worker["svd_model"],
+                                 _worker["reviews_df"], _worker["pop"]))
+    return rows
+
+
+def load_user_ids():
+    return storage.user_ids()
+
+
+def run(user_ids, workers=None, chunk_size=64, store_path=STORE_PATH):
+    """Compute ``user_ids`` across a process pool and write them to the store."""
+    start = time.perf_counter()
+    started_at = time.time()
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    conn = open_store(store_path)
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for rows in pool.map(_compute_chunk, chunks):
+            write_recommendations(conn, rows, started_at)
+            written += len(rows)
+    conn.close()
+    print(f"Precomputed {written} lists for {len(user_ids)} users in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dirty", action="store_true", help="only recompute users marked dirty")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--clusters", type=int, default=20, help="number of taste clusters (0 to skip)")
+    args = parser.parse_args()
+    if args.dirty:
+        conn = open_store()
+        ids = dirty_user_ids(conn)
+        conn.close()
+    else:
+        if args.clusters:
+            run_clusters(k=args.clusters)
+        ids = load_user_ids()
+    if ids:
+        run(ids, workers=args.workers)
+    else:
+        print("No users to precompute.")
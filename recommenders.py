@@ -0,0 +1,212 @@
+"""Streamlit-free recommendation logic.
+
+Everything here works on movie ids and plain pandas/numpy objects so it can be
+shared by the Streamlit app and by offline jobs such as ``precompute.py``.
+Recommenders return lists of ``Recommendation``; titles, posters and trailers
+are resolved by the UI only for the cards it renders.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+
+class Recommendation(NamedTuple):
+    movie_id: int
+    score: float
+    source: str
+
+
+def load_reviews(engine=None):
+    """All reviews from the store with normalised dtypes (``user`` as str)."""
+    reviews_df = storage.reviews_frame(engine)
+    reviews_df["user"] = reviews_df["user"].astype(str)
+    return reviews_df.astype({"movie_id": int, "rating": float})
+
+
+def popularity_table(reviews_df):
+    """Movie ids ordered by ``avg_rating * log1p(count)`` (best first)."""
+    if reviews_df.empty:
+        return pd.DataFrame(columns=["movie_id", "avg_rating", "count", "score"])
+    pop = reviews_df.groupby("movie_id").agg({"rating": ["mean", "count"]})
+    pop.columns = ["avg_rating", "count"]
+    pop["score"] = pop["avg_rating"] * np.log1p(pop["count"])
+    return pop.reset_index().sort_values("score", ascending=False)
+
+
+def rated_movie_ids(reviews_df, user_id):
+    return set(reviews_df.loc[reviews_df["user"] == str(user_id), "movie_id"].astype(int).tolist())
+
+
+def trained_uid(svd_model, user_id):
+    """``user_id`` as the SVD training set knows it (as given or as a string), or None if it doesn't."""
+    for raw in (user_id, str(user_id)):
+        try:
+            svd_model.trainset.to_inner_uid(raw)
+            return raw
+        except (ValueError, AttributeError):
+            continue
+    return None
+
+
+def knows_user(svd_model, user_id):
+    """Whether ``user_id`` was in the SVD training set (unknown users only get the global mean)."""
+    return trained_uid(svd_model, user_id) is not None
+
+
+def _to_recommendations(ids, scores, source):
+    return [Recommendation(int(mid), float(score), source) for mid, score in zip(ids, scores)]
+
+
+def content_based(movies, similarity, movie_title, n=5):
+    """The ``n`` movies most similar to ``movie_title`` (excluding itself)."""
+    index = movies.index[movies["title"] == movie_title][0]
+    row = np.asarray(similarity[index], dtype=float)
+    order = np.argsort(-row, kind="stable")
+    order = order[order != index][:n]
+    return _to_recommendations(movies["id"].to_numpy()[order], row[order], "content")
+
+
+def collaborative(user_id, movies, svd_model, reviews_df, n=3, pop=None):
+    """Top-``n`` collaborative picks for ``user_id``.
+
+    Uses the SVD model when it is loaded, otherwise falls back to review
+    popularity and finally to the head of the catalog. Users the SVD model
+    has never seen get nothing, leaving them to the cold-start path.
+    """
+    rated = rated_movie_ids(reviews_df, user_id)
+    if svd_model is not None:
+        if not knows_user(svd_model, user_id):
+            return []
+        candidates = np.array([mid for mid in movies["id"].astype(int) if mid not in rated], dtype=int)
+        scores = collaborative_scores(user_id, candidates, svd_model, reviews_df)
+        order = np.argsort(-scores, kind="stable")[:n]
+        return _to_recommendations(candidates[order], scores[order], "collaborative")
+
+    if pop is None:
+        pop = popularity_table(reviews_df)
+    pop = pop[pop["movie_id"].isin(movies["id"]) & ~pop["movie_id"].isin(rated)].head(n)
+    if not pop.empty:
+        return _to_recommendations(pop["movie_id"], pop["score"], "collaborative")
+    head = movies["id"].head(n)
+    return _to_recommendations(head, np.zeros(len(head)), "collaborative")
+
+
+def personalized(user_id, movies, similarity, reviews_df, n=25, seeds=5):
+    """Content-based neighbours of the user's ``seeds`` best rated titles."""
+    user_reviews = reviews_df[reviews_df["user"] == str(user_id)]
+    if user_reviews.empty or similarity is None:
+        return []
+    top_rated = user_reviews.sort_values("rating", ascending=False).head(seeds)["title"].tolist()
+    picks = {}
+    for title in top_rated:
+        if title not in movies["title"].values:
+            continue
+        for rec in content_based(movies, similarity, title):
+            picks.setdefault(rec.movie_id, rec._replace(source="personalized"))
+    return list(picks.values())[:n]
+
+
+def _minmax(values):
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return values
+    lo, hi = values.min(), values.max()
+    if hi - lo <= 0:
+        return np.ones_like(values) if hi > 0 else np.zeros_like(values)
+    return (values - lo) / (hi - lo)
+
+
+def _inner_id(lookup, raw):
+    try:
+        return lookup(raw)
+    except ValueError:
+        return -1
+
+
+def svd_estimates(user_id, movie_ids, svd_model):
+    """``svd_model.predict(user_id, mid).est`` for all ``movie_ids`` at once, or None without factors.
+
+    Follows Surprise's SVD: ``global_mean + bu + bi + qi @ pu`` (only the dot
+    product when unbiased), dropping the terms of an unknown user or item
+    and clipping to the rating scale.
+    """
+    try:
+        pu, qi, bu, bi = svd_model.pu, svd_model.qi, svd_model.bu, svd_model.bi
+        trainset = svd_model.trainset
+        global_mean = getattr(svd_model, "global_mean", None)
+        global_mean = float(trainset.global_mean if global_mean is None else global_mean)
+        lower, upper = getattr(svd_model, "rating_scale", None) or trainset.rating_scale
+    except AttributeError:
+        return None
+    uid = trained_uid(svd_model, user_id)
+    u = trainset.to_inner_uid(uid) if uid is not None else -1
+    items = np.array([_inner_id(trainset.to_inner_iid, int(mid)) for mid in movie_ids], dtype=np.intp)
+    known = items >= 0
+    safe = np.where(known, items, 0)
+    both = known & (u >= 0)
+    dot = np.asarray(qi, dtype=float)[safe] @ np.asarray(pu[u], dtype=float) if u >= 0 else np.zeros(len(items))
+    if getattr(svd_model, "biased", True):
+        user_bias = float(bu[u]) if u >= 0 else 0.0
+        est = global_mean + user_bias + np.where(known, np.asarray(bi, dtype=float)[safe], 0.0) + np.where(both, dot, 0.0)
+    else:
+        est = np.where(both, dot, global_mean)
+    return np.clip(est, lower, upper)
+
+
+def collaborative_scores(user_id, movie_ids, svd_model, reviews_df, pop=None):
+    """Raw collaborative scores for ``movie_ids`` (SVD estimate or popularity)."""
+    movie_ids = np.asarray(movie_ids, dtype=int)
+    if svd_model is not None:
+        scores = svd_estimates(user_id, movie_ids, svd_model)
+        if scores is None:
+            uid = trained_uid(svd_model, user_id)
+            uid = user_id if uid is None else uid
+            scores = np.array([svd_model.predict(uid, int(mid)).est for mid in movie_ids], dtype=float)
+        return scores
+    if pop is None:
+        pop = popularity_table(reviews_df)
+    score = pop.set_index("movie_id")["score"] if not pop.empty else pd.Series(dtype=float)
+    return score.reindex(movie_ids).fillna(0.0).to_numpy(dtype=float)
+
+
+def blend_scores(movie_title, user_id, candidate_ids, movies, similarity, svd_model, reviews_df,
+                 content_weight=0.5, pop=None):
+    """Normalised content/collaborative blend for ``candidate_ids``.
+
+    Both scores are looked up for every candidate at once, scaled to [0, 1]
+    and combined with ``content_weight``. Without a similarity matrix the
+    blend is purely collaborative.
+    """
+    candidate_ids = np.asarray(candidate_ids, dtype=int)
+    if similarity is not None:
+        index = movies.index[movies["title"] == movie_title][0]
+        positions = pd.Index(movies["id"].to_numpy()).get_indexer(candidate_ids)
+        # Candidates missing from the catalog (-1) have no similarity; don't let them read the last column
+        content = _minmax(np.where(positions >= 0, np.asarray(similarity[index], dtype=float)[positions], 0.0))
+    else:
+        content, content_weight = np.zeros(candidate_ids.size), 0.0
+    collab = _minmax(collaborative_scores(user_id, candidate_ids, svd_model, reviews_df, pop=pop))
+    return content_weight * content + (1.0 - content_weight) * collab
+
+
+def hybrid(movie_title, user_id, movies, similarity, svd_model, reviews_df,
+           collab_ids=(), n=3, content_weight=0.5, pool=50, pop=None):
+    """Top-``n`` of the content/collaborative blend over one candidate set.
+
+    Candidates are the ``pool`` nearest content neighbours of ``movie_title``
+    plus ``collab_ids``.
+    """
+    all_ids = movies["id"].to_numpy().astype(int)
+    index = movies.index[movies["title"] == movie_title][0]
+    content_candidates = [r.movie_id for r in content_based(movies, similarity, movie_title, n=pool)] if similarity is not None else []
+    candidates = pd.unique(np.asarray(content_candidates + [int(m) for m in collab_ids], dtype=int))
+    candidates = candidates[candidates != all_ids[index]]
+    if candidates.size == 0:
+        return []
+    combined = blend_scores(movie_title, user_id, candidates, movies, similarity, svd_model, reviews_df,
+                            content_weight=content_weight, pop=pop)
+    order = np.argsort(-combined, kind="stable")[:n]
+    return _to_recommendations(candidates[order], combined[order], "hybrid")
@@ -0,0 +1,77 @@
+"""Per-section cost of Streamlit reruns.
+
+Streamlit executes the whole of app.py on every widget interaction, so
+whatever the script does before it reaches the page's own content is paid
+on every click. A ``RerunTimer`` is started at the top of the script and
+``lap(name)`` closes the section that just ran; ``finish(page, profile)``
+closes the page section and hands the laps to the process-wide
+``RerunProfile``. The baseline of a rerun is everything except the page:
+imports, cached accessors, styling, session defaults, navigation.
+
+``RerunProfile`` keeps the last ``WINDOW`` samples per section and reports
+last / mean / p95 milliseconds, and whether the median baseline is over
+``BUDGET_MS`` (``RERUN_BUDGET_MS`` in the environment).
+"""
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+import pandas as pd
+
+BUDGET_MS = float(os.getenv("RERUN_BUDGET_MS", "25"))
+WINDOW = 200
+BASELINE = "baseline"
+
+
+class RerunTimer:
+    def __init__(self):
+        self._last = time.perf_counter()
+        self.laps = []
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.laps.append((name, (now - self._last) * 1000.0))
+        self._last = now
+
+    def finish(self, page, profile):
+        """Close the page section and record this rerun; returns its baseline in ms."""
+        self.lap(page)
+        baseline = sum(ms for _, ms in self.laps[:-1])
+        profile.record(self.laps + [(BASELINE, baseline)])
+        return baseline
+
+
+class RerunProfile:
+    def __init__(self, window=WINDOW, budget_ms=BUDGET_MS):
+        self.budget_ms = budget_ms
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._order = []
+
+    def record(self, laps):
+        with self._lock:
+            for name, ms in laps:
+                if name not in self._samples:
+                    self._order.append(name)
+                self._samples[name].append(ms)
+
+    def stats(self):
+        """One row per section in script order: ``runs``, ``last_ms``, ``mean_ms``, ``p95_ms``."""
+        with self._lock:
+            rows = {name: list(self._samples[name]) for name in self._order}
+        frame = pd.DataFrame(
+            [(name, len(ms), ms[-1], float(np.mean(ms)), float(np.percentile(ms, 95))) for name, ms in rows.items()],
+            columns=["section", "runs", "last_ms", "mean_ms", "p95_ms"])
+        return frame.set_index("section")
+
+    def baseline_ms(self):
+        """Median baseline over the window (None before the first rerun)."""
+        with self._lock:
+            samples = list(self._samples.get(BASELINE, ()))
+        return float(np.median(samples)) if samples else None
+
+    def over_budget(self):
+        baseline = self.baseline_ms()
+        return baseline is not None and baseline > self.budget_ms
@@ -0,0 +1,165 @@
+"""Process-wide in-memory index of the reviews table.
+
+Reviews are held once per process as one column-oriented DataFrame, with
+lazily built per-user/per-movie row positions; rating counts and averages
+come from the SQL aggregates in storage.py, not from this index. Ratings
+submitted through ``add`` are written to the store (through the
+``events.EventWriter`` when one is given) and applied to the index in the
+same call; rows written by other processes (precompute jobs, importers,
+other app instances) are picked up incrementally by comparing the table's
+highest review id against the index's watermark, at most once per
+``check_interval`` seconds. New rows are applied column-wise, so bulk
+imports of millions of ratings load in seconds. The store keeps one review
+per ``(user, movie)`` and gives a replacement a new id, so a new row for a
+pair the index already holds replaces the old row.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+FRAME_COLUMNS = ["user", "movie_id", "title", "rating", "review"]
+
+
+class ReviewIndex:
+    def __init__(self, engine=None, check_interval=1.0, writer=None):
+        self.engine = engine
+        self.writer = writer
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._reset()
+        self.refresh(force=True)
+
+    def _reset(self):
+        self._frame = _to_frame(pd.DataFrame(columns=["user_id", "movie_id", "title", "rating", "review"]))
+        # (user, movie) pair key of every frame row, see _pair_keys
+        self._keys = np.empty(0, dtype=np.int64)
+        # Frames (and their keys) applied since the last read, concatenated on demand
+        self._pending_frames = []
+        self._pending_keys = []
+        # Row positions per user / movie, rebuilt lazily after writes
+        self._positions = None
+        self._watermark = 0
+        # Ids applied write-through above the watermark, skipped by the next sync
+        self._pending_ids = set()
+        self._checked_at = 0.0
+        self.version = 0
+
+    def _apply(self, rows):
+        """Apply a frame of ``id, user_id, movie_id, title, rating, review`` rows."""
+        if rows.empty:
+            return
+        rows = rows.drop_duplicates(["user_id", "movie_id"], keep="last")
+        keys = _pair_keys(rows["user_id"], rows["movie_id"])
+        self._drop_pairs(keys)
+        self._pending_frames.append(_to_frame(rows))
+        self._pending_keys.append(keys)
+        self._positions = None
+        self.version += 1
+
+    def _drop_pairs(self, keys):
+        """Remove rows for pairs about to be replaced."""
+        parts = [(self._frame, self._keys)] + list(zip(self._pending_frames, self._pending_keys))
+        kept = []
+        for frame, part_keys in parts:
+            hits = np.isin(part_keys, keys)
+            if hits.any():
+                frame, part_keys = frame[~hits].reset_index(drop=True), part_keys[~hits]
+            kept.append((frame, part_keys))
+        (self._frame, self._keys), pending = kept[0], kept[1:]
+        self._pending_frames = [frame for frame, _ in pending]
+        self._pending_keys = [part_keys for _, part_keys in pending]
+
+    def refresh(self, force=False):
+        """Apply rows other writers added since the last sync."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            latest = storage.max_review_id(self.engine)
+            if latest < self._watermark:
+                # Table was recreated underneath us
+                self._reset()
+                self._checked_at = now
+            if latest <= self._watermark:
+                return
+            rows = storage.reviews_after(self._watermark, self.engine)
+            self._apply(rows[~rows["id"].isin(self._pending_ids)])
+            self._watermark = max(latest, int(rows["id"].max()) if not rows.empty else latest)
+            self._pending_ids = {i for i in self._pending_ids if i > self._watermark}
+
+    def add(self, user_id, movie_id, title, rating, review):
+        """Write a review to the store and apply it to the index."""
+        if self.writer is not None:
+            review_id = self.writer.submit("reviews", storage.review_row(user_id, movie_id, title, rating, review)).result()
+        else:
+            review_id = storage.add_review(user_id, movie_id, title, rating, review, self.engine)
+        with self._lock:
+            # A sync that ran after the commit has already applied it
+            if review_id > self._watermark:
+                self._pending_ids.add(review_id)
+                self._apply(pd.DataFrame([{"id": review_id, "user_id": int(user_id), "movie_id": int(movie_id),
+                                           "title": title, "rating": float(rating), "review": review}]))
+        return review_id
+
+    def _consolidated(self):
+        with self._lock:
+            if self._pending_frames:
+                frames = [f for f in (self._frame, *self._pending_frames) if not f.empty]
+                if not frames:
+                    frames = [self._frame]
+                self._frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+                self._keys = np.concatenate([self._keys, *self._pending_keys])
+                self._pending_frames = []
+                self._pending_keys = []
+            return self._frame
+
+    def _rows(self, column, key):
+        with self._lock:
+            frame = self._consolidated()
+            if self._positions is None:
+                self._positions = {
+                    "user": frame.groupby("user", sort=False).indices,
+                    "movie_id": frame.groupby("movie_id", sort=False).indices,
+                }
+            return frame, self._positions[column].get(key, [])
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    def movie_reviews(self, movie_id, limit=None):
+        """Reviews of one movie, oldest first (the newest ``limit`` if given)."""
+        self.refresh()
+        frame, positions = self._rows("movie_id", int(movie_id))
+        return frame.iloc[positions[-limit:] if limit else positions].reset_index(drop=True)
+
+    def user_rating(self, user_id, movie_id):
+        """The user's current rating of a movie, or None."""
+        self.refresh()
+        frame, positions = self._rows("user", str(user_id))
+        ratings = frame["rating"].to_numpy()[positions][frame["movie_id"].to_numpy()[positions] == int(movie_id)]
+        return float(ratings[-1]) if len(ratings) else None
+
+    def frame(self):
+        """All reviews in the layout of ``recommenders.load_reviews``; shared, do not mutate."""
+        self.refresh()
+        return self._consolidated()
+
+
+def _pair_keys(user_ids, movie_ids):
+    """One int64 per ``(user, movie)``: user id in the high 32 bits, movie id in the low."""
+    return (user_ids.astype(np.int64).to_numpy() << 32) | movie_ids.astype(np.int64).to_numpy()
+
+
+def _to_frame(rows):
+    return pd.DataFrame({
+        "user": rows["user_id"].astype(int).astype(str),
+        "movie_id": rows["movie_id"].astype(int),
+        "title": rows["title"].astype(object),
+        "rating": rows["rating"].astype(float),
+        "review": rows["review"].astype(object),
+    }, columns=FRAME_COLUMNS)
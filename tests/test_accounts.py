@@ -0,0 +1,33 @@
+import pytest
+
+import accounts
+import storage
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return storage.get_engine(f"sqlite:///{tmp_path / 'accounts.db'}")
+
+
+def test_register_then_authenticate(engine):
+    users = accounts.Accounts(engine)
+
+    user_id = users.register("a@example.com", "secret")
+
+    assert user_id is not None
+    assert users.register("a@example.com", "other") is None
+    assert users.authenticate("a@example.com", "secret")["user_id"] == user_id
+    assert users.authenticate("a@example.com", "wrong") is None
+    assert users.authenticate("b@example.com", "secret") is None
+
+
+def test_accounts_created_by_another_process_are_found(engine):
+    users = accounts.Accounts(engine)
+    other = accounts.Accounts(engine)
+
+    user_id = other.register("a@example.com", "secret")
+
+    # Not in the first cache yet; the miss falls through to the database
+    assert users.authenticate("a@example.com", "secret")["user_id"] == user_id
+    assert users.register("a@example.com", "secret") is None
+    assert other.register("b@example.com", "secret") == user_id + 1
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert, select
+
+import activity_log
+import storage
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return storage.get_engine(f"sqlite:///{tmp_path / 'activity.db'}")
+
+
+def add_events(engine, *events):
+    with engine.begin() as conn:
+        conn.execute(insert(storage.activity), [storage.activity_row(user_id, "watched", title, 10, timestamp=timestamp)
+                                                for user_id, title, timestamp in events])
+
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def test_compaction_keeps_user_events_complete(engine, tmp_path):
+    directory = str(tmp_path / "archive")
+    add_events(engine, (1, "March", "2024-03-05 10:00:00"), (1, "January", "2024-01-10 10:00:00"),
+               (2, "Other user", "2024-01-11 10:00:00"), (1, "Recent", days_ago(1)))
+    before = activity_log.user_events(1, directory=directory, engine=engine)
+
+    assert activity_log.compact(directory=directory, engine=engine) == 3
+
+    assert activity_log.segments(directory) == ["2024-01", "2024-03"]
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(storage.activity)).scalar() == 1
+    after = activity_log.user_events(1, directory=directory, engine=engine)
+    assert after["title"].tolist() == before["title"].tolist() == ["Recent", "March", "January"]
+    assert activity_log.user_events(1, limit=2, directory=directory, engine=engine)["title"].tolist() == \
+        ["Recent", "March"]
+    assert activity_log.user_events(2, directory=directory, engine=engine)["title"].tolist() == ["Other user"]
+
+
+def test_compacting_a_month_again_merges_into_its_segment(engine, tmp_path):
+    directory = str(tmp_path / "archive")
+    add_events(engine, (1, "First", "2024-01-10 10:00:00"))
+    activity_log.compact(directory=directory, engine=engine)
+    # SQLite reuses the compacted event's id once the hot table is empty
+    add_events(engine, (1, "Late arrival", "2024-01-20 10:00:00"))
+    assert activity_log.user_events(1, directory=directory, engine=engine)["title"].tolist() == \
+        ["Late arrival", "First"]
+
+    assert activity_log.compact(directory=directory, engine=engine) == 1
+
+    events = activity_log.user_events(1, directory=directory, engine=engine)
+    assert events["title"].tolist() == ["Late arrival", "First"]
+
+
+def test_archived_months_are_skipped(engine, tmp_path):
+    directory = str(tmp_path / "archive")
+    add_events(engine, (1, "January", "2024-01-10 10:00:00"), (1, "March", "2024-03-05 10:00:00"))
+    activity_log.compact(directory=directory, engine=engine)
+
+    assert activity_log.archive("2024-02", directory=directory) == ["2024-01"]
+
+    assert activity_log.user_events(1, directory=directory, engine=engine)["title"].tolist() == ["March"]
@@ -0,0 +1,44 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import insert
+
+import activity_log
+import activity_stats
+import storage
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return storage.get_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+
+
+def add_events(engine, *events):
+    with engine.begin() as conn:
+        conn.execute(insert(storage.activity), [storage.activity_row(user_id, action, "Ten", 10, timestamp=timestamp)
+                                                for user_id, action, timestamp in events])
+
+
+def test_window_covers_whole_days():
+    assert activity_stats.window(3, today=date(2024, 3, 1)) == ("2024-02-28 00:00:00", "2024-03-02 00:00:00")
+
+
+def test_daily_and_funnel_read_segments_and_the_hot_table(engine, tmp_path):
+    directory = str(tmp_path / "archive")
+    add_events(engine,
+               (3, "watched", "2024-01-30 09:00:00"), (1, "watched", "2024-01-31 08:00:00"),
+               (1, "added_to_watchlist", "2024-01-31 09:00:00"), (2, "rated", "2024-01-31 07:00:00"),
+               (2, "watched", "2024-01-31 10:00:00"), (2, "watched", "2024-01-31 11:00:00"))
+    # January goes to a segment; February stays hot
+    activity_log.compact(hot_days=0, directory=directory, engine=engine)
+    add_events(engine, (1, "rated", "2024-02-01 09:00:00"), (3, "watched", "2024-02-02 09:00:00"))
+    start, end = "2024-01-31 00:00:00", "2024-02-03 00:00:00"
+
+    table = activity_stats.daily(start, end, rolling_days=2, chunk_size=2, directory=directory, engine=engine)
+
+    assert table["watched"].tolist() == [3, 0, 1]
+    assert table["active_users"].tolist() == [2, 1, 1]
+    # The day before the window still counts towards its first trailing total
+    assert table["active_users_2d"].tolist() == [3, 2, 2]
+    # User 2 rated before watching and never saved, so only user 1 completes the funnel
+    assert activity_stats.funnel(start, end, chunk_size=2, directory=directory, engine=engine).tolist() == [3, 1, 1]
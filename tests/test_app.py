@@ -0,0 +1,199 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import pytest
+import requests
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import numpy as np
+import pandas as pd
+
+import artifacts
+import bundle
+import precompute
+import storage
+import tmdb
+from recommenders import Recommendation
+from conftest import ROOT
+
+APP = os.path.join(ROOT, "app.py")
+CATALOG_ID = 19995  # Avatar, in movie_list.pkl
+DETAILS_ID = 900001  # Known only from TMDB recommendation details
+UNKNOWN_ID = 900002
+
+
+@pytest.fixture
+def app_dir(tmp_path, monkeypatch):
+    """Run the app offline from a scratch directory with its own database and the bundled catalog."""
+    shutil.copy(os.path.join(ROOT, "movie_list.pkl"), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    # Process-wide resources (models, storage, warm-up) start afresh for every test
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    monkeypatch.setattr("storage.DATABASE_URL", f"sqlite:///{tmp_path / 'movie_app.db'}")
+    monkeypatch.setattr("storage._engine", None)
+
+    def offline(self, url, *args, **kwargs):
+        raise requests.exceptions.ConnectionError(f"offline: {url}")
+    monkeypatch.setattr(requests.Session, "get", offline)
+
+    calls = []
+    def fake(name, value):
+        def fetch(*args, **kwargs):
+            calls.append((name,) + args)
+            return value(*args) if callable(value) else value
+        monkeypatch.setattr(tmdb, name, fetch)
+    fake("fetch_popular_movies", [])
+    fake("fetch_genres", {})
+    fake("fetch_movies_by_genre", [])
+    fake("fetch_poster", lambda movie_id: f"https://posters.test/{movie_id}.jpg")
+    fake("fetch_trailer", lambda movie_id: f"https://trailers.test/{movie_id}")
+    fake("fetch_movie_details", {"rating": 6.5, "description": "Fetched description"})
+    return calls
+
+
+def test_resolve_cards_renders_known_and_unknown_movies(app_dir):
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.session_state.page = "discover"
+    at.session_state.show_recommendations = True
+    at.session_state.recommendation_type = "content"
+    at.session_state.recommendations = [
+        Recommendation(CATALOG_ID, 1.0, "content"),
+        Recommendation(DETAILS_ID, 0.8, "content"),
+        Recommendation(UNKNOWN_ID, 0.5, "content"),
+    ]
+    at.session_state.recommendation_details = {
+        DETAILS_ID: {"title": "From TMDB", "rating": 7.9, "description": "Known description",
+                     "poster": "https://posters.test/known.jpg"},
+    }
+    at.run()
+
+    assert not at.exception
+    cards = [m.value for m in at.markdown if '<div class="movie-card">' in m.value]
+    assert len(cards) == 3
+    catalog_card, details_card, unknown_card = cards
+    assert "<h3>Avatar</h3>" in catalog_card
+    assert f"https://posters.test/{CATALOG_ID}.jpg" in catalog_card
+    assert "<h3>From TMDB</h3>" in details_card and "7.9" in details_card
+    assert "https://posters.test/known.jpg" in details_card
+    assert "<h3>Unknown</h3>" in unknown_card and "6.5" in unknown_card
+    assert f"https://posters.test/{UNKNOWN_ID}.jpg" in unknown_card
+    trailers = {args[0] for name, *args in app_dir if name == "fetch_trailer"}
+    assert {CATALOG_ID, DETAILS_ID, UNKNOWN_ID} <= trailers
+
+
+def test_warmup_starts_on_a_page_that_stops_early(app_dir):
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.session_state.nav_radio = "Sign In"
+    at.run()
+
+    assert not at.exception
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        fetched = {(name, args[0]) for name, *args in app_dir if args}
+        if {("fetch_poster", CATALOG_ID), ("fetch_trailer", CATALOG_ID),
+                ("fetch_movie_details", CATALOG_ID)} <= fetched:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail(f"catalog grid not warmed: {sorted(fetched)}")
+
+
+def test_first_render_does_not_wait_for_model_downloads(app_dir, tmp_path, monkeypatch):
+    catalog = next(a for a in artifacts.load_manifest(os.path.join(ROOT, artifacts.MANIFEST))
+                   if a.name == "movie_list.pkl")
+    similarity = artifacts.Artifact("similarity.pkl", ("https://mirror.test/similarity.pkl",), 10, "0" * 64)
+    artifacts.save_manifest([catalog, similarity], str(tmp_path / artifacts.MANIFEST))
+    release, fetched = threading.Event(), []
+
+    def slow_fetch(artifact, *args, **kwargs):
+        fetched.append(artifact.name)
+        release.wait(60)
+        raise artifacts.ArtifactError("offline")
+    monkeypatch.setattr(artifacts, "fetch", slow_fetch)
+
+    try:
+        at = AppTest.from_file(APP, default_timeout=30)
+        at.run()
+        assert not at.exception
+        # The similarity loader downloads in the background, after the page rendered
+        deadline = time.monotonic() + 30
+        while not fetched and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert fetched == ["similarity.pkl"]
+    finally:
+        release.set()
+
+
+def test_bundle_sections_replace_pickle_downloads(app_dir, tmp_path, monkeypatch):
+    movies = pd.DataFrame({"id": [CATALOG_ID, 285, 206647], "title": ["Avatar", "Pirates", "Spectre"]})
+    bundle.write_bundle(str(tmp_path / bundle.BUNDLE_DIR), movies=movies, similarity=np.eye(3), k=2)
+    urls = ("https://mirror.test/file",)
+    artifacts.save_manifest([artifacts.Artifact("similarity.pkl", urls, 10, "0" * 64),
+                             artifacts.Artifact("svd_model.pkl", urls)], str(tmp_path / artifacts.MANIFEST))
+    real_fetch, attempts = artifacts.fetch, []
+
+    def fetch(artifact, *args, **kwargs):
+        try:
+            return real_fetch(artifact, *args, **kwargs)
+        except artifacts.ArtifactError as e:
+            attempts.append((artifact.name, str(e)))
+            raise
+    monkeypatch.setattr(artifacts, "fetch", fetch)
+
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    assert not at.exception
+    for thread in threading.enumerate():
+        if thread.name.startswith("warm-"):
+            thread.join(30)
+
+    # The bundle covers the similarity matrix; the unpinned SVD pickle is refused, not downloaded
+    assert [name for name, _ in attempts] == ["svd_model.pkl"]
+    assert "no sha256" in attempts[0][1]
+    assert not (tmp_path / "svd_model.pkl").exists()
+
+
+def test_precompute_store_is_shared_and_skips_anonymous_users(app_dir, tmp_path, monkeypatch):
+    real_open, opened = precompute.open_store, []
+
+    def open_store(*args, **kwargs):
+        opened.append(args)
+        return real_open(*args, **kwargs)
+    monkeypatch.setattr(precompute, "open_store", open_store)
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.session_state.page = "discover"
+    at.run()
+    at.button(key="collaborative").click().run()
+    at.button(key="personalized").click().run()
+    assert not at.exception
+
+    assert len(opened) == 1
+    conn = real_open(str(tmp_path / precompute.STORE_PATH))
+    # The Discover page's anonymous default user 1 is computed inline, never stored
+    assert conn.execute("SELECT COUNT(*) FROM user_recommendations").fetchone() == (0,)
+    conn.close()
+
+
+def test_personalized_without_similarity_doesnt_claim_missing_ratings(app_dir, monkeypatch):
+    user_id = storage.add_user("rater@example.com", "x")
+    storage.add_review(user_id, CATALOG_ID, "Avatar", 5.0, "")
+    monkeypatch.setattr(tmdb, "fetch_popular_movies", lambda: [
+        {"id": DETAILS_ID, "title": "Popular", "rating": 8.0, "description": "", "poster": ""}])
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.session_state.page = "discover"
+    at.session_state.current_user = user_id
+    at.session_state.current_username = "rater@example.com"
+    at.run()
+    at.button(key="personalized").click().run()
+
+    assert not at.exception
+    warnings = [w.value for w in at.warning]
+    assert any("similarity model" in w for w in warnings), warnings
+    assert not any("No ratings found" in w for w in warnings)
@@ -0,0 +1,91 @@
+import hashlib
+import http.server
+import os
+import threading
+
+import pytest
+
+import artifacts
+
+CONTENT = os.urandom(3 * 1024 * 1024 + 17)
+
+
+class MirrorHandler(http.server.BaseHTTPRequestHandler):
+    """Serves ``server.files`` by path and honours ``Range: bytes=N-``; logs ``(path, range)`` per request."""
+
+    def do_GET(self):
+        data = self.server.files[self.path]
+        self.server.requests.append((self.path, self.headers.get("Range")))
+        start = int(self.headers["Range"].split("=")[1].rstrip("-")) if self.headers.get("Range") else 0
+        if start >= len(data):
+            self.send_response(416)
+            self.end_headers()
+            return
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+        self.wfile.write(data[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mirror():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), MirrorHandler)
+    server.files = {"/good/model.bin": CONTENT, "/bad/model.bin": CONTENT[:-1] + b"\0"}
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def pinned(*urls):
+    return artifacts.Artifact("model.bin", urls, len(CONTENT), hashlib.sha256(CONTENT).hexdigest())
+
+
+def test_resumes_a_partial_download(mirror, tmp_path):
+    offset = len(CONTENT) // 3
+    (tmp_path / "model.bin.part").write_bytes(CONTENT[:offset])
+
+    assert artifacts.fetch(pinned(f"{mirror.url}/good/model.bin"), str(tmp_path))
+
+    assert (tmp_path / "model.bin").read_bytes() == CONTENT
+    assert not (tmp_path / "model.bin.part").exists()
+    assert mirror.requests == [("/good/model.bin", f"bytes={offset}-")]
+
+
+def test_checksum_mismatch_downloads_again(mirror, tmp_path):
+    # A damaged local copy of the right size is only caught by the hash
+    (tmp_path / "model.bin").write_bytes(CONTENT[:-1] + b"\0")
+    artifact = pinned(f"{mirror.url}/bad/model.bin", f"{mirror.url}/good/model.bin")
+    assert artifacts.verify(artifact, str(tmp_path / "model.bin")) == "sha256 mismatch"
+
+    assert artifacts.fetch(artifact, str(tmp_path))
+
+    # The first mirror's bytes fail the same check, so the next mirror is used
+    assert (tmp_path / "model.bin").read_bytes() == CONTENT
+    assert [path for path, _ in mirror.requests] == ["/bad/model.bin", "/good/model.bin"]
+
+
+def test_unpinned_entries_are_not_downloaded(mirror, tmp_path):
+    unpinned = artifacts.Artifact("model.bin", (f"{mirror.url}/good/model.bin",))
+
+    with pytest.raises(artifacts.ArtifactError, match="no sha256"):
+        artifacts.fetch(unpinned, str(tmp_path))
+    failures = artifacts.ensure([unpinned], str(tmp_path), progress=lambda message: None)
+
+    assert isinstance(failures["model.bin"], artifacts.ArtifactError)
+    assert not (tmp_path / "model.bin").exists()
+    assert mirror.requests == []
+
+
+def test_unpinned_entries_already_present_are_kept(mirror, tmp_path):
+    (tmp_path / "model.bin").write_bytes(b"local copy")
+    unpinned = artifacts.Artifact("model.bin", (f"{mirror.url}/good/model.bin",))
+
+    assert artifacts.ensure([unpinned], str(tmp_path)) == {}
+    assert mirror.requests == []
@@ -0,0 +1,54 @@
+import json
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import bundle
+
+
+def svd_model():
+    rng = np.random.default_rng(1)
+    trainset = types.SimpleNamespace(_raw2inner_id_users={"7": 0, "9": 1}, _raw2inner_id_items={20: 1, 10: 0, 30: 2},
+                                     global_mean=3.4, rating_scale=(0.5, 5.0))
+    return types.SimpleNamespace(pu=rng.normal(size=(2, 4)), qi=rng.normal(size=(3, 4)), bu=rng.normal(size=2),
+                                 bi=rng.normal(size=3), trainset=trainset, biased=True)
+
+
+def test_round_trip(tmp_path):
+    directory = str(tmp_path / bundle.BUNDLE_DIR)
+    movies = pd.DataFrame({"id": np.array([10, 20, 30], dtype=np.int32), "title": ["Ten", "Twenty", None]})
+    similarity = np.array([[1.0, 0.2, 0.7], [0.2, 1.0, 0.4], [0.7, 0.4, 1.0]])
+    model = svd_model()
+
+    bundle.write_bundle(directory, movies=movies, similarity=similarity, svd_model=model, k=2)
+    opened = bundle.open_bundle(directory)
+
+    catalog = opened.catalog()
+    assert catalog["id"].tolist() == [10, 20, 30]
+    assert catalog["title"].tolist() == ["Ten", "Twenty", ""]
+    # Each row keeps its top 2 exactly and reads zero elsewhere
+    neighbors = opened.neighbors()
+    np.testing.assert_allclose(neighbors[0], [1.0, 0.0, 0.7])
+    np.testing.assert_allclose(np.asarray(neighbors), [[1.0, 0.0, 0.7], [0.0, 1.0, 0.4], [0.7, 0.0, 1.0]])
+    factors = opened.factors()
+    assert factors.trainset.to_inner_uid("9") == 1
+    assert factors.trainset.to_inner_iid(30) == 2
+    expected = 3.4 + model.bu[1] + model.bi[2] + model.qi[2] @ model.pu[1]
+    assert factors.predict("9", 30).est == pytest.approx(np.clip(expected, 0.5, 5.0))
+    assert factors.predict("unknown", 99).est == pytest.approx(3.4)
+
+
+def test_malformed_bundles_are_rejected(tmp_path):
+    directory = str(tmp_path / bundle.BUNDLE_DIR)
+    bundle.write_bundle(directory, movies=pd.DataFrame({"id": [10, 20]}), similarity=np.eye(2), k=2)
+    path = tmp_path / bundle.BUNDLE_DIR / bundle.METADATA
+    metadata = json.loads(path.read_text())
+    metadata["arrays"]["neighbors.scores"]["shape"] = [3, 2]
+    path.write_text(json.dumps(metadata))
+
+    with pytest.raises(bundle.BundleError, match="neighbors.scores"):
+        bundle.open_bundle(directory)
+    with pytest.raises(bundle.BundleError, match="no bundle.json"):
+        bundle.open_bundle(str(tmp_path / "missing"))
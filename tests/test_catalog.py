@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+import catalog
+
+
+def test_optimize_compacts_without_changing_values():
+    movies = pd.DataFrame({
+        "id": np.array([19995, 285, 206647, 49026], dtype=np.int64),
+        "title": ["Avatar", "Pirates", "Spectre", "The Dark Knight Rises"],
+        "vote_average": [7.2, 6.9, 6.3, 7.6],
+        "original_language": ["en", "en", "en", "en"],
+        "genres": [["Action"], ["Adventure"], ["Action"], ["Drama"]],
+    }, index=[3, 1, 2, 0])
+
+    optimized = catalog.optimize(movies)
+
+    assert optimized["id"].dtype == np.int32
+    assert optimized["vote_average"].dtype == np.float32
+    assert isinstance(optimized["original_language"].dtype, pd.CategoricalDtype)
+    assert optimized["title"].dtype == "string[pyarrow]"
+    assert optimized["genres"].dtype == object  # lists are left alone
+    assert list(optimized.index) == [0, 1, 2, 3]
+    assert optimized["id"].tolist() == movies["id"].tolist()
+    assert optimized["title"].tolist() == movies["title"].tolist()
+    np.testing.assert_allclose(optimized["vote_average"], movies["vote_average"], rtol=1e-6)
+    assert optimized["title"].str.contains("Dark").tolist() == [False, False, False, True]
@@ -0,0 +1,17 @@
+import charts
+import storage
+
+
+def test_render_with_a_single_distinct_rating(tmp_path):
+    engine = storage.get_engine(f"sqlite:///{tmp_path / 'charts.db'}")
+    storage.add_review(1, 10, "Ten", 4.0, "", engine)
+    storage.add_review(2, 11, "Eleven", 4.0, "", engine)
+
+    rendered = charts.render(engine)
+
+    assert rendered["ratings"].startswith(b"\x89PNG")
+    assert {"top_users", "top_movies"} <= set(rendered)
+
+
+def test_render_without_ratings(tmp_path):
+    assert charts.render(storage.get_engine(f"sqlite:///{tmp_path / 'charts.db'}")) == {}
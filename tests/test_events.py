@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import func, select
+
+import events
+import storage
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return storage.get_engine(f"sqlite:///{tmp_path / 'events.db'}")
+
+
+def count(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table)).scalar()
+
+
+def test_flush_waits_for_queued_events(engine):
+    writer = events.EventWriter(engine, flush_interval=0.01)
+    try:
+        futures = [writer.submit("activity", storage.activity_row(1, "watched", "Ten", 10)) for _ in range(5)]
+        review = writer.submit("reviews", storage.review_row(1, 10, "Ten", 4.0, ""))
+        writer.flush(timeout=10)
+
+        assert all(future.done() for future in futures)
+        assert review.result() > 0
+        assert count(engine, storage.activity) == 5
+        assert writer.stats().events == 6
+    finally:
+        writer.close()
+
+
+def test_one_bad_event_fails_alone(engine):
+    writer = events.EventWriter(engine, flush_interval=0.01)
+    try:
+        good = writer.submit("activity", storage.activity_row(1, "watched", "Ten", 10))
+        bad = writer.submit("activity", {"user_id": 1})  # action and timestamp are required
+        writer.flush(timeout=10)
+
+        assert good.result() is None
+        assert bad.exception() is not None
+        assert count(engine, storage.activity) == 1
+        assert writer.stats().errors == 1
+    finally:
+        writer.close()
+
+
+def test_close_writes_what_is_queued_and_stops(engine):
+    writer = events.EventWriter(engine, flush_interval=0.5)
+    futures = [writer.submit("watchlist", storage.watchlist_row(1, movie_id, "Movie")) for movie_id in range(3)]
+
+    writer.close(timeout=10)
+
+    assert not writer._thread.is_alive()
+    assert all(future.done() for future in futures)
+    assert count(engine, storage.watchlist) == 3
+
+
+def test_unknown_tables_are_rejected(engine):
+    writer = events.EventWriter(engine)
+    try:
+        with pytest.raises(ValueError):
+            writer.submit("ratings", {})
+    finally:
+        writer.close()
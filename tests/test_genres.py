@@ -0,0 +1,41 @@
+import pandas as pd
+
+import genres
+import storage
+
+
+def test_movie_genres_parse_json_and_python_literals(tmp_path):
+    path = tmp_path / "movies.csv"
+    pd.DataFrame({"id": [10, 20, 30], "genres": ['[{"id": 18, "name": "Drama"}, {"id": 35, "name": "Comedy"}]',
+                                                 "[{'id': 18, 'name': 'Drama'}]", "not a list"]}).to_csv(path)
+
+    movie_genres = genres.load_movie_genres(str(path))
+
+    assert sorted(zip(movie_genres["movie_id"], movie_genres["genre"].astype(str))) == \
+        [(10, "Comedy"), (10, "Drama"), (20, "Drama")]
+    assert genres.genres_of(movie_genres, 10) == ["Drama", "Comedy"]
+    assert genres.load_movie_genres(str(tmp_path / "missing.csv")).empty
+
+
+def test_genre_mask_rows_follow_the_requested_movies():
+    movie_genres = pd.DataFrame({"movie_id": [10, 10, 20], "genre": pd.Categorical(["Drama", "Comedy", "Drama"])})
+
+    movie_ids, names, mask = genres.genre_mask(movie_genres, [20, 99, 10])
+
+    assert list(movie_ids) == [20, 99, 10]
+    assert list(names) == ["Comedy", "Drama"]
+    assert mask.tolist() == [[False, True], [False, False], [True, True]]
+
+
+def test_genre_stats_follow_a_changed_genre_table(tmp_path):
+    engine = storage.get_engine(f"sqlite:///{tmp_path / 'genres.db'}")
+    storage.add_review(1, 10, "Ten", 4.0, "", engine)
+    storage.add_review(2, 10, "Ten", 2.0, "", engine)
+    storage.add_review(1, 20, "Twenty", 5.0, "", engine)
+    pairs = pd.DataFrame({"movie_id": [10, 10, 20], "genre": pd.Categorical(["Drama", "Comedy", "Drama"])})
+
+    assert storage.sync_movie_genres(pairs, engine)
+    assert not storage.sync_movie_genres(pairs, engine)
+
+    stats = storage.genre_rating_stats(engine)
+    assert stats.to_dict("index") == {"Drama": {"count": 3, "mean": 11 / 3}, "Comedy": {"count": 2, "mean": 3.0}}
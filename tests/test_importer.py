@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+from sqlalchemy import select
+
+import importer
+import storage
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return storage.get_engine(f"sqlite:///{tmp_path / 'import.db'}")
+
+
+@pytest.fixture
+def dump(tmp_path):
+    pd.DataFrame({"id": [100, 200], "title": ["Hundred", "Two Hundred"]}).to_pickle(tmp_path / "movie_list.pkl")
+    # MovieLens ids 1 and 2 map to the catalog; 3 maps to a movie outside it, 4 isn't linked
+    pd.DataFrame({"movieId": [1, 2, 3], "imdbId": [0, 0, 0], "tmdbId": [100, 200, 300]}).to_csv(
+        tmp_path / "links.csv", index=False)
+    pd.DataFrame({"userId": [1, 1, 2, 2, 1, 3], "movieId": [1, 2, 1, 3, 1, 4],
+                  "rating": [3.0, 4.0, 5.0, 2.0, 1.0, 4.0], "timestamp": [0, 60, 120, 180, 240, 300]}).to_csv(
+        tmp_path / "ratings.csv", index=False)
+    return tmp_path
+
+
+def test_imports_mapped_ratings_chunk_by_chunk(engine, dump):
+    read, imported, _ = importer.import_ratings(
+        str(dump / "ratings.csv"), str(dump / "links.csv"), str(dump / "movie_list.pkl"),
+        chunk_size=2, user_offset=1000, engine=engine, progress=lambda message: None)
+
+    assert (read, imported) == (6, 4)
+    with engine.connect() as conn:
+        rows = conn.execute(select(storage.reviews.c.user_id, storage.reviews.c.movie_id, storage.reviews.c.title,
+                                   storage.reviews.c.rating).order_by(storage.reviews.c.user_id,
+                                                                      storage.reviews.c.movie_id)).all()
+    # User 1's later rating of movie 1, in a later chunk, replaced the first
+    assert [tuple(row) for row in rows] == [(1001, 100, "Hundred", 1.0), (1001, 200, "Two Hundred", 4.0),
+                                            (1002, 100, "Hundred", 5.0)]
+    assert storage.movie_rating_stats(100, engine) == (2, 3.0)
+    assert storage.user_review_stats(1001, engine) == (2, 2.5)
+
+
+def test_without_links_movie_ids_are_tmdb_ids(engine, dump):
+    pd.DataFrame({"userId": [1, 1], "movieId": [100, 999], "rating": [4.0, 4.0], "timestamp": [0, 0]}).to_csv(
+        dump / "tmdb_ratings.csv", index=False)
+
+    read, imported, _ = importer.import_ratings(str(dump / "tmdb_ratings.csv"), None, str(dump / "movie_list.pkl"),
+                                                engine=engine, progress=lambda message: None)
+
+    assert (read, imported) == (2, 1)
+    assert storage.movie_rating_stats(100, engine) == (1, 4.0)
@@ -0,0 +1,91 @@
+import threading
+
+import numpy as np
+
+import models
+
+
+def test_concurrent_gets_share_one_load():
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(10)
+        return np.zeros(1000)
+    handle = models.LazyArtifact("similarity", loader)
+
+    thread = handle.warm()
+    started.wait(10)
+    assert handle.stats().state == "loading"
+    results = []
+    getter = threading.Thread(target=lambda: results.append(handle.get()))
+    getter.start()
+    release.set()
+    thread.join(10)
+    getter.join(10)
+
+    assert len(calls) == 1
+    assert results[0] is handle.get()
+    stats = handle.stats()
+    assert (stats.state, stats.nbytes) == ("loaded", 8000)
+    assert handle.warm() is None
+
+
+def test_a_failed_load_is_not_retried():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        raise OSError("missing file")
+    handle = models.LazyArtifact("svd_model", loader)
+
+    assert handle.get() is None
+    assert handle.get() is None
+    assert len(calls) == 1
+    assert handle.stats().state == "failed"
+    assert handle.stats().error == "missing file"
+
+
+def registry(tmp_path, build):
+    path = tmp_path / "similarity.pkl"
+    path.write_bytes(b"v1")
+    return models.ModelRegistry(build, [str(path)], interval=3600), path
+
+
+def test_reload_swaps_in_a_fully_loaded_set(tmp_path):
+    versions = iter(["v1", "v2"])
+
+    def build():
+        value = next(versions)
+        return f"movies {value}", {"similarity": models.LazyArtifact("similarity", lambda: value)}
+    models_registry, path = registry(tmp_path, build)
+    before = models_registry.current()
+    before.get("similarity")
+    path.write_bytes(b"v2 is longer")
+
+    after = models_registry.reload()
+
+    assert models_registry.current() is after
+    assert after.handles["similarity"].stats().state == "loaded"
+    assert (after.movies, after.get("similarity")) == ("movies v2", "v2")
+    assert after.version != before.version
+    # A rerun still holding the old set keeps its models
+    assert (before.movies, before.get("similarity")) == ("movies v1", "v1")
+    assert [swap.error for swap in models_registry.swaps()] == [None]
+
+
+def test_a_set_that_loses_an_artifact_is_rejected(tmp_path):
+    loads = iter([np.ones(3), None])
+
+    def build():
+        value = next(loads)
+        return "movies", {"similarity": models.LazyArtifact("similarity", lambda: value)}
+    models_registry, path = registry(tmp_path, build)
+    before = models_registry.current()
+    before.get("similarity")
+
+    assert models_registry.reload() is None
+
+    assert models_registry.current() is before
+    assert "similarity failed to load" in models_registry.swaps()[-1].error
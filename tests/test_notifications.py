@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+from sqlalchemy import select
+
+import notifications
+import storage
+
+MOVIE_GENRES = pd.DataFrame({"movie_id": [10, 20, 30, 40], "genre": ["Drama", "Drama", "Drama", "Comedy"]})
+MOVIE_GENRES["genre"] = MOVIE_GENRES["genre"].astype("category")
+CATALOG = pd.DataFrame({"id": [10, 20, 30, 40], "title": ["Ten", "Twenty", "Thirty", "Forty"]})
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return storage.get_engine(f"sqlite:///{tmp_path / 'notifications.db'}")
+
+
+def notified(engine):
+    with engine.connect() as conn:
+        query = select(storage.notifications.c.user_id, storage.notifications.c.movie_id)
+        return sorted(tuple(row) for row in conn.execute(query))
+
+
+def test_only_app_accounts_are_profiled_and_notified(engine):
+    account = storage.add_user("a@example.com", "x", engine)
+    imported = 10_000_001
+    storage.add_review(account, 10, "Ten", 5.0, "", engine)
+    storage.add_review(imported, 10, "Ten", 5.0, "", engine)
+    with engine.begin() as conn:
+        storage.put_watchlist_rows(conn, [storage.watchlist_row(account, 20, "Twenty")])
+
+    assert notifications.run(MOVIE_GENRES, CATALOG, engine=engine) == 1
+
+    # Rated (10) and saved (20) movies are skipped; the imported user gets nothing
+    assert notified(engine) == [(account, 30)]
+    with engine.connect() as conn:
+        profiled = conn.execute(select(storage.genre_affinity.c.user_id).distinct()).scalars().all()
+    assert imported not in profiled
+
+
+def test_first_run_rebuilds_profiles_despite_an_early_rating(engine):
+    first = storage.add_user("a@example.com", "x", engine)
+    second = storage.add_user("b@example.com", "x", engine)
+    # A rating from before profiles existed, and one that reached the profiles before the job ever ran
+    storage.add_review(first, 10, "Ten", 5.0, "", engine)
+    storage.add_review(second, 40, "Forty", 4.0, "", engine)
+    with engine.begin() as conn:
+        storage.add_genre_affinity(conn, notifications.affinity_rows(second, 40, 4.0, MOVIE_GENRES))
+
+    notifications.run(MOVIE_GENRES, CATALOG, engine=engine)
+
+    with engine.connect() as conn:
+        weights = {tuple(row[:2]): row[2] for row in conn.execute(select(
+            storage.genre_affinity.c.user_id, storage.genre_affinity.c.genre, storage.genre_affinity.c.weight))}
+        rebuilt = conn.execute(select(storage.meta.c.value)
+                               .where(storage.meta.c.key == notifications.REBUILT_KEY)).scalar()
+    assert weights == {(first, "Drama"): 2.0, (second, "Comedy"): 1.0}
+    assert rebuilt
+    assert [movie for user, movie in notified(engine) if user == first] == [20, 30]
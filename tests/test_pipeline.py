@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+import pipeline
+from recommenders import Recommendation
+
+
+def ctx():
+    movies = pd.DataFrame({"id": [1, 2, 3], "title": ["A", "B", "C"]})
+    return pipeline.Context(movies, lambda: None, lambda: None, lambda: pd.DataFrame())
+
+
+def generator(name, ids):
+    return pipeline.Generator(name, lambda ctx: [Recommendation(m, 1.0, name) for m in ids])
+
+
+def broken(ctx, recs):
+    raise RuntimeError("boom")
+
+
+popular = pipeline.Pipeline("popular", [generator("popular", [3])])
+
+
+@pytest.mark.parametrize("stages", [
+    {"filters": [pipeline.Stage("already_rated", broken)]},
+    {"scorer": pipeline.Stage("blend", broken)},
+])
+def test_failing_filter_or_scorer_switches_to_fallback(stages):
+    strategy = pipeline.Pipeline("hybrid", [generator("content", [1, 2])], fallback=popular, **stages)
+
+    recs, timings = strategy.run(ctx())
+
+    assert [(r.movie_id, r.source) for r in recs] == [(3, "popular")]
+    failed = [t for t in timings if t.error]
+    assert [(t.pipeline, t.error, t.candidates) for t in failed] == [("hybrid", "boom", 0)]
+
+
+def test_failing_filter_without_fallback_returns_nothing():
+    later = pipeline.Stage("watchlist", lambda ctx, recs: recs)
+    strategy = pipeline.Pipeline("hybrid", [generator("content", [1, 2])],
+                                 filters=[pipeline.Stage("already_rated", broken), later])
+
+    recs, timings = strategy.run(ctx())
+
+    assert recs == []
+    assert [t.name for t in timings] == ["content", "already_rated"]
+
+
+def test_generators_and_reranker_stay_best_effort():
+    strategy = pipeline.Pipeline("hybrid", [pipeline.Generator("broken", lambda ctx: broken(ctx, [])),
+                                            generator("content", [1, 2])],
+                                 reranker=pipeline.Stage("top", broken), fallback=popular)
+
+    recs, timings = strategy.run(ctx())
+
+    assert [r.movie_id for r in recs] == [1, 2]
+    assert [t.name for t in timings if t.error] == ["broken", "top"]
@@ -0,0 +1,77 @@
+import sqlite3
+import time
+
+import pytest
+
+import precompute
+from recommenders import Recommendation
+
+
+@pytest.fixture
+def store(tmp_path):
+    conn = precompute.open_store(str(tmp_path / "recommendations.db"))
+    yield conn
+    conn.close()
+
+
+def recs(*ids):
+    return [Recommendation(movie_id, 1.0 / (i + 1), "collaborative") for i, movie_id in enumerate(ids)]
+
+
+def test_round_trip_by_user_and_kind(store):
+    precompute.write_recommendations(store, [(7, "collaborative", recs(10, 20)), (7, "personalized", [])],
+                                     time.time())
+
+    assert precompute.read_recommendations(store, 7, "collaborative") == recs(10, 20)
+    assert precompute.read_recommendations(store, "7", "personalized") == []
+    assert precompute.read_recommendations(store, 8, "collaborative") is None
+
+
+def test_dirty_users_are_served_again_only_after_a_later_write(store):
+    precompute.write_recommendations(store, [(7, "collaborative", recs(10))], time.time())
+    precompute.mark_dirty(store, 7)
+    assert precompute.read_recommendations(store, 7, "collaborative") is None
+    assert precompute.dirty_user_ids(store) == [7]
+
+    # A list computed before the rating keeps the user dirty
+    precompute.write_recommendations(store, [(7, "collaborative", recs(20))], time.time() - 60)
+    assert precompute.read_recommendations(store, 7, "collaborative") is None
+
+    precompute.write_recommendations(store, [(7, "collaborative", recs(30))], time.time())
+    assert precompute.read_recommendations(store, 7, "collaborative") == recs(30)
+    assert precompute.dirty_user_ids(store) == []
+
+
+def test_an_older_layout_is_rebuilt(tmp_path):
+    path = str(tmp_path / "recommendations.db")
+    with sqlite3.connect(path) as old:
+        old.execute("CREATE TABLE user_recommendations (user_id TEXT PRIMARY KEY, recommendations TEXT)")
+        old.execute("INSERT INTO user_recommendations VALUES ('7', '[]')")
+
+    conn = precompute.open_store(path)
+    precompute.write_recommendations(conn, [(7, "collaborative", recs(10))], time.time())
+
+    assert precompute.read_recommendations(conn, 7, "collaborative") == recs(10)
+    conn.close()
+
+
+def test_cold_start_picks_come_from_the_seeds_majority_cluster(store):
+    movie_ids = [1, 2, 3, 4, 5, 6]
+    labels = [0, 0, 0, 1, 1, 1]
+    tops = {0: [[1, 0.9], [2, 0.8], [3, 0.7]], 1: [[4, 0.9], [5, 0.8], [6, 0.7]]}
+    precompute.write_taste_clusters(store, movie_ids, labels, tops)
+
+    picks = precompute.cold_start_recommendations(store, [4, 5, 1], n=2)
+
+    # Seeds are not suggested back
+    assert picks == [Recommendation(6, 0.7, "cold_start")]
+    assert precompute.cold_start_recommendations(store, [99]) == []
+
+
+def test_taste_clusters_group_similar_vectors():
+    vectors = [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.1, 0.9]]
+
+    labels, tops = precompute.build_taste_clusters([10, 11, 20, 21], vectors, k=2, top=2)
+
+    assert labels[0] == labels[1] != labels[2] == labels[3]
+    assert sorted(sorted(mid for mid, _ in picks) for picks in tops.values()) == [[10, 11], [20, 21]]
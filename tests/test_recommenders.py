@@ -0,0 +1,55 @@
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import bundle
+import recommenders
+
+
+def factor_model(biased):
+    rng = np.random.default_rng(0)
+    users, items = np.array(["1", "2", "3"]), np.arange(100, 140)
+    return bundle.FactorModel(rng.normal(0, 0.5, (3, 8)), rng.normal(0, 0.5, (40, 8)), rng.normal(0, 0.5, 3),
+                              rng.normal(0, 0.5, 40), users, items, 3.5, (1, 5), biased)
+
+
+@pytest.mark.parametrize("biased", [True, False])
+@pytest.mark.parametrize("user_id", ["2", "unknown"])
+def test_collaborative_scores_match_predict(biased, user_id):
+    model = factor_model(biased)
+    movie_ids = np.array([100, 7, 139, 120, 8])  # 7 and 8 are not in the trainset
+
+    scores = recommenders.collaborative_scores(user_id, movie_ids, model, reviews_df=None)
+
+    expected = [model.predict(user_id, int(mid)).est for mid in movie_ids]
+    np.testing.assert_allclose(scores, expected)
+
+
+def test_collaborative_scores_predict_without_factors():
+    model = types.SimpleNamespace(predict=lambda uid, iid: types.SimpleNamespace(est=iid / 10))
+
+    scores = recommenders.collaborative_scores("1", [10, 20], model, reviews_df=None)
+
+    np.testing.assert_allclose(scores, [1.0, 2.0])
+
+
+def test_integer_user_ids_resolve_like_knows_user():
+    model = factor_model(True)
+    movie_ids = np.array([100, 120])
+
+    assert recommenders.knows_user(model, 2)
+    np.testing.assert_allclose(recommenders.svd_estimates(2, movie_ids, model),
+                               recommenders.svd_estimates("2", movie_ids, model))
+
+
+def test_blend_ignores_similarity_of_candidates_missing_from_the_catalog():
+    movies = pd.DataFrame({"id": [100, 101, 102], "title": ["A", "B", "C"]})
+    similarity = np.array([[1.0, 0.2, 0.9], [0.2, 1.0, 0.1], [0.9, 0.1, 1.0]])
+
+    blend = recommenders.blend_scores("A", "1", [101, 999], movies, similarity, None, reviews_df=None,
+                                      content_weight=1.0, pop=pd.DataFrame(columns=["movie_id", "score"]))
+
+    # 999 would otherwise read the last column (0.9) and outrank 101
+    np.testing.assert_allclose(blend, [1.0, 0.0])
@@ -0,0 +1,31 @@
+import pytest
+
+import review_index
+import storage
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return storage.get_engine(f"sqlite:///{tmp_path / 'reviews.db'}")
+
+
+def test_replacement_keeps_one_review_per_pair(engine):
+    index = review_index.ReviewIndex(engine, check_interval=3600)
+    index.add(1, 10, "Ten", 4.0, "good")
+    index.add(2, 10, "Ten", 5.0, "great")
+    index.add(1, 10, "Ten", 2.0, "changed my mind")
+
+    reviews = index.movie_reviews(10)
+    assert list(zip(reviews["user"], reviews["rating"])) == [("2", 5.0), ("1", 2.0)]
+    assert index.movie_reviews(10, limit=1)["review"].tolist() == ["changed my mind"]
+    assert index.user_rating(1, 10) == 2.0
+    assert index.user_rating(1, 11) is None
+
+
+def test_picks_up_rows_from_other_writers(engine):
+    index = review_index.ReviewIndex(engine, check_interval=0)
+    storage.add_review(3, 20, "Twenty", 3.0, "", engine)
+    storage.add_review(3, 20, "Twenty", 4.0, "", engine)
+
+    assert index.user_rating(3, 20) == 4.0
+    assert len(index.frame()) == 1
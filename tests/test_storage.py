@@ -0,0 +1,139 @@
+import sqlite3
+import sys
+import threading
+
+import pandas as pd
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+import storage
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = storage.get_engine(f"sqlite:///{tmp_path / 'reviews.db'}")
+    storage.sync_movie_genres(pd.DataFrame({"movie_id": [10, 10, 20], "genre": ["Drama", "Comedy", "Drama"]}),
+                              engine)
+    return engine
+
+
+def aggregates(engine):
+    return {
+        "movie": (storage.movie_rating_stats(10, engine), storage.movie_rating_stats(20, engine)),
+        "user": (storage.user_review_stats(1, engine), storage.user_review_stats(2, engine)),
+        "histogram": storage.rating_counts(engine).to_dict(),
+        "genre": storage.genre_rating_stats(engine)["count"].to_dict(),
+    }
+
+
+def test_upsert_replaces_and_adjusts_aggregates(engine):
+    with engine.begin() as conn:
+        first = storage.upsert_reviews(conn, [storage.review_row(1, 10, "Ten", 4.0, ""),
+                                              storage.review_row(2, 10, "Ten", 2.0, ""),
+                                              storage.review_row(1, 20, "Twenty", 3.0, "")])
+    with engine.begin() as conn:
+        # The second row for (1, 10) in one batch wins over the first
+        second = storage.upsert_reviews(conn, [storage.review_row(1, 10, "Ten", 1.0, ""),
+                                               storage.review_row(1, 10, "Ten", 5.0, "")])
+
+    assert second[0] == second[1] > max(first)
+    assert aggregates(engine) == {
+        "movie": ((2, 3.5), (1, 3.0)),
+        "user": ((2, 4.0), (1, 2.0)),
+        "histogram": {2.0: 1, 3.0: 1, 5.0: 1},
+        "genre": {"Drama": 3, "Comedy": 2},
+    }
+    # Same numbers as recomputing from scratch
+    expected = aggregates(engine)
+    with engine.begin() as conn:
+        storage.rebuild_rating_stats(conn)
+    assert aggregates(engine) == expected
+
+
+def test_database_rejects_a_second_row_per_pair(engine):
+    storage.add_review(1, 10, "Ten", 4.0, "", engine)
+    with pytest.raises(IntegrityError):
+        with engine.begin() as conn:
+            conn.execute(insert(storage.reviews).values(storage.review_row(1, 10, "Ten", 2.0, "")))
+
+
+def test_concurrent_writers_keep_one_row_per_pair(engine):
+    # Switch threads often so unserialized read-then-write sequences would interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    barrier, errors = threading.Barrier(4), []
+
+    def write(rating):
+        barrier.wait()
+        for _ in range(30):
+            try:
+                storage.add_review(1, 10, "Ten", rating, "", engine)
+            except Exception as e:
+                errors.append(e)
+    threads = [threading.Thread(target=write, args=(float(r),)) for r in range(1, 5)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
+    with engine.connect() as conn:
+        stored = conn.execute(select(storage.reviews.c.rating)).scalars().all()
+    assert len(stored) == 1
+    assert storage.movie_rating_stats(10, engine) == (1, stored[0])
+
+
+def test_upgrade_dedupes_and_makes_the_pair_index_unique(tmp_path):
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE reviews (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, movie_id INTEGER NOT NULL,"
+                   " title VARCHAR(255), rating FLOAT NOT NULL, review TEXT, created_at VARCHAR(19))")
+        db.execute("CREATE INDEX ix_reviews_user_movie ON reviews (user_id, movie_id)")
+        db.executemany("INSERT INTO reviews (user_id, movie_id, rating) VALUES (?, ?, ?)",
+                       [(1, 10, 4.0), (1, 10, 2.0), (2, 10, 5.0)])
+        # An older version that had already run every earlier upgrade
+        db.execute("CREATE TABLE meta (key VARCHAR(64) PRIMARY KEY, value VARCHAR(255))")
+        db.executemany("INSERT INTO meta VALUES (?, 'x')",
+                       [("reviews_deduped",), ("rating_aggregates",), ("activity_time_index",)])
+
+    engine = storage.get_engine(f"sqlite:///{path}")
+
+    assert storage.movie_rating_stats(10, engine) == (2, 3.5)
+    with pytest.raises(IntegrityError):
+        with engine.begin() as conn:
+            conn.execute(insert(storage.reviews).values(storage.review_row(2, 10, "Ten", 1.0, "")))
+
+
+def test_csv_migration_runs_once(engine, tmp_path):
+    (tmp_path / "users.csv").write_text('"user_id","username","password"\n1,"a@example.com","hash"\n')
+    (tmp_path / "user_reviews.csv").write_text("user,movie_id,title,rating,review\n"
+                                               "1,10,Ten,2,first\n1,10,Ten,4,second\n1,20,Twenty,5,\n")
+    (tmp_path / "user_activity.csv").write_text('"user_id","action","title","movie_id","rating","timestamp"\n'
+                                                '1,"rated","Ten",10,4,"2024-01-01 10:00:00"\n')
+    (tmp_path / "watchlist_1.csv").write_text('"movie_id","title"\n20,"Twenty"\n20,"Twenty"\n')
+
+    counts = storage.migrate_from_csv(str(tmp_path), engine)
+
+    assert counts == {"users": 1, "reviews": 2, "activity": 1, "watchlist": 1}
+    assert storage.get_user("a@example.com", engine)["user_id"] == 1
+    # The later of two ratings of one movie wins, and the aggregates include the import
+    assert storage.user_review_stats(1, engine) == (2, 4.5)
+    assert storage.load_watchlist(1, engine) == {20: "Twenty"}
+    assert storage.migrate_from_csv(str(tmp_path), engine) is None
+
+
+def test_watchlists_are_per_user_sets(engine):
+    with engine.begin() as conn:
+        storage.put_watchlist_rows(conn, [storage.watchlist_row(1, 20, "Twenty"), storage.watchlist_row(1, 10, "Ten"),
+                                          storage.watchlist_row(1, 20, "Twenty"), storage.watchlist_row(2, 10, "Ten")])
+    with engine.begin() as conn:
+        # Adding an entry again replaces it rather than duplicating it
+        storage.put_watchlist_rows(conn, [storage.watchlist_row(1, 10, "Ten (1999)")])
+        storage.delete_watchlist_rows(conn, [{"user_id": 2, "movie_id": 10}])
+
+    assert storage.load_watchlist(1, engine) == {10: "Ten (1999)", 20: "Twenty"}
+    assert storage.load_watchlists([1, 2, 3], engine) == {1: {10: "Ten (1999)", 20: "Twenty"}}
@@ -0,0 +1,96 @@
+"""Background cache warm-up with progress.
+
+A ``Warmup`` runs a list of ``Step``s on a small thread pool, once. A step's
+function may return further steps that depend on it (the genre list yields
+one step per genre page, a page yields one step per trailer), which are
+queued as soon as it finishes. ``progress`` can be read at any time from
+any thread; ``total`` grows as follow-up steps are discovered.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, NamedTuple, Optional
+
+WORKERS = 4
+
+
+class Step(NamedTuple):
+    name: str
+    # May return follow-up Steps in a list; anything else it returns is ignored
+    fn: Callable
+
+
+class Progress(NamedTuple):
+    done: int
+    total: int
+    failed: int
+    seconds: float
+    finished: bool
+    slowest: Optional[str] = None
+
+
+class Warmup:
+    def __init__(self, workers=WORKERS):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._total = 0
+        self._done = 0
+        self._errors = {}
+        self._timings = {}
+        self._started = None
+        self._finished = None
+        self._thread = None
+
+    def start(self, steps):
+        """Run ``steps`` in the background; later calls are ignored."""
+        with self._lock:
+            if self._thread is not None:
+                return self._thread
+            self._started = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, args=(list(steps),), name="cache-warmup", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def progress(self):
+        with self._lock:
+            if self._started is None:
+                return Progress(0, 0, 0, 0.0, False)
+            end = self._finished or time.perf_counter()
+            slowest = max(self._timings, key=self._timings.get, default=None)
+            return Progress(self._done, self._total, len(self._errors), end - self._started,
+                            self._finished is not None, slowest)
+
+    def errors(self):
+        with self._lock:
+            return dict(self._errors)
+
+    def _step(self, step):
+        start = time.perf_counter()
+        follow_ups, error = [], None
+        try:
+            result = step.fn()
+            if isinstance(result, list):
+                follow_ups = [s for s in result if isinstance(s, Step)]
+        except Exception as e:
+            error = str(e)
+        with self._lock:
+            self._timings[step.name] = time.perf_counter() - start
+            self._done += 1
+            self._total += len(follow_ups)
+            if error is not None:
+                self._errors[step.name] = error
+        return follow_ups
+
+    def _run(self, steps):
+        with self._lock:
+            self._total += len(steps)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cache-warmup") as pool:
+            pending = {pool.submit(self._step, step) for step in steps}
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    pending.update(pool.submit(self._step, step) for step in future.result())
+        with self._lock:
+            self._finished = time.perf_counter()
+        progress = self.progress()
+        print(f"Cache warm-up: {progress.done} steps in {progress.seconds:.1f}s, {progress.failed} failed")